@@ -8,12 +8,13 @@ from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
 from sec_app.routing import websocket_urlpatterns
+from sec_app_2.routing import websocket_urlpatterns as valuation_websocket_urlpatterns
 
 application = ProtocolTypeRouter({
     "http": get_asgi_application(),
     "websocket": AuthMiddlewareStack(
         URLRouter(
-            websocket_urlpatterns
+            websocket_urlpatterns + valuation_websocket_urlpatterns
         )
     ),
 })
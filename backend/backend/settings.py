@@ -183,6 +183,19 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Server-side valuation model sessions (sec_app_2.model_sessions): "memory" or "redis"
+VALUATION_MODEL_SESSIONS = {
+    "BACKEND": os.environ.get('VALUATION_SESSION_BACKEND', 'memory'),
+    "MAX_SESSIONS": int(os.environ.get('VALUATION_SESSION_MAX_SESSIONS', 500)),
+    "MAX_CELLS": int(os.environ.get('VALUATION_SESSION_MAX_CELLS', 2_000_000)),
+    "TTL_SECONDS": int(os.environ.get('VALUATION_SESSION_TTL_SECONDS', 30 * 60)),
+    "CACHE_SESSIONS": int(os.environ.get('VALUATION_SESSION_CACHE_SESSIONS', 100)),
+    "LOCK_TIMEOUT_SECONDS": int(os.environ.get('VALUATION_SESSION_LOCK_TIMEOUT_SECONDS', 30)),
+    "REDIS_HOST": os.environ.get('REDIS_HOST', '127.0.0.1'),
+    "REDIS_PORT": int(os.environ.get('REDIS_PORT', 6379)),
+    "REDIS_PASSWORD": os.environ.get('REDIS_PASSWORD'),
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -204,6 +217,9 @@ SEC_API_KEY = os.getenv('SEC_API_KEY')
 SEC_API_BASE_URL = os.getenv('SEC_API_BASE_URL', 'https://api.sec-api.io')
 SEC_USER_AGENT = os.getenv('SEC_USER_AGENT', 'ValueAccel info@valueaccel.com')
 
+# Per-field calculator call counts and timings (sec_app_2.calculators.instrumentation)
+CALCULATOR_INSTRUMENTATION = os.getenv('CALCULATOR_INSTRUMENTATION', 'False') == 'True'
+
 # CORS Headers configuration
 CORS_ALLOW_CREDENTIALS = True
 CORS_ALLOW_HEADERS = [
@@ -0,0 +1,905 @@
+"""Shared pieces of the ``data_financials`` CSV ingest.
+
+``data_financials`` holds one folder per ticker with ``{TICKER}_{Kind}.csv``
+files.  ``scan_data_financials`` walks it once; each ``Kind`` has a parser
+registered in ``PARSERS`` that turns a file into rows for one of the bulk
+writers:
+
+* ``metrics`` parsers yield ``(period_label, metric_name, value)`` rows,
+  upserted into ``FinancialPeriod`` / ``FinancialMetric`` by ``MetricWriter``
+  (see ``upsert_metrics``)
+* ``multiples`` parsers return the ``CompanyMultiples`` fields, upserted by
+  ``MultiplesWriter``
+
+Parsers only read files, so they can run in a worker pool (see
+``parse_executor``); the writers run on the caller's thread.
+``IngestManifest`` records what each file looked like at its last load, so
+loaders can skip files that have not changed; ``IngestJournal`` checkpoints
+a run batch by batch, so an interrupted run can be resumed.
+"""
+
+from array import array
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import concurrent.futures
+import copy
+import csv
+import hashlib
+import logging
+import os
+import time
+
+import django
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from sec_app.models import Company, CompanyMultiples, FinancialMetric, FinancialPeriod, IngestBatch, IngestedFile, IngestRun
+from sec_app_2.periods import parse_period, period_attributes, quarter_label
+
+logger = logging.getLogger(__name__)
+
+_PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+DATA_FINANCIALS_PATHS: List[str] = [
+    os.path.join(_PROJECT_ROOT, 'backend', 'sec_app', 'data', 'data_financials'),
+    os.path.join(_PROJECT_ROOT, 'sec_app', 'data', 'data_financials'),
+    os.path.join(os.path.dirname(_PROJECT_ROOT), 'backend', 'sec_app', 'data', 'data_financials'),
+]
+
+# MasterFinancials year columns outside this range are index columns or typos, not fiscal years;
+# statement files load every year unless a loader is given --first-year / --last-year
+FIRST_YEAR, LAST_YEAR = 2005, 2035
+
+VALUATION_PERIOD = 'valuation'
+
+
+def find_data_financials_dir() -> Optional[str]:
+    """The first of ``DATA_FINANCIALS_PATHS`` that exists, or None."""
+    for path in DATA_FINANCIALS_PATHS:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def fetch_sec_company_names() -> Dict[str, str]:
+    """Ticker -> company name from the SEC ticker list (raises on HTTP errors)."""
+    import requests
+    from sec_app.api_client import COMPANY_TICKERS_URL, HEADERS
+
+    response = requests.get(COMPANY_TICKERS_URL, headers=HEADERS, timeout=30)
+    response.raise_for_status()
+    # SEC data structure: {numeric_key: {ticker: str, title: str, cik_str: int}}
+    names = {}
+    for company_data in response.json().values():
+        ticker = company_data.get('ticker', '').upper()
+        company_name = company_data.get('title', '')
+        if ticker and company_name:
+            names[ticker] = company_name
+    return names
+
+
+# ---------------------------------------------------------------------------
+# Parsers
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class Parser:
+    kind: str
+    writer: str
+    func: Callable[..., Any]
+
+
+# Kind (the part of the file name after ``{TICKER}_``) -> parser, in registration order.
+# Rows for the same cell from several files resolve to the last registered kind.
+PARSERS: Dict[str, Parser] = {}
+
+
+def register_parser(kind: str, writer: str = 'metrics') -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        PARSERS[kind] = Parser(kind, writer, func)
+        return func
+    return decorator
+
+
+def parse_number(text: str) -> Optional[float]:
+    """``'1,234.5'`` / ``'$12'`` -> float; None for blanks and text."""
+    text = (text or '').replace(',', '').replace('$', '').strip()
+    if not text:
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def metric_period_label(header: str, keep_window_columns: bool = False, years: Optional[Tuple[int, int]] = None) -> Optional[str]:
+    """Canonical period label for a statement column header, or None to skip the column.
+
+    Years and quarters are kept, within the inclusive ``years`` range when
+    one is given; ``LastNY_AVG`` / ``LastNY_CAGR`` columns only with
+    ``keep_window_columns``.
+    """
+    header = (header or '').strip()
+    parsed = parse_period(header)
+    if parsed is not None and parsed[0] != 'ttm':
+        period_type, year, quarter = parsed
+        if years is not None and not years[0] <= year <= years[1]:
+            return None
+        return str(year) if period_type == 'annual' else quarter_label(year, quarter)
+    if keep_window_columns and header.startswith('Last') and ('_AVG' in header or '_CAGR' in header):
+        return header
+    return None
+
+
+def read_statement_csv(path: str, keep_window_columns: bool = False, years: Optional[Tuple[int, int]] = None) -> Iterator[Tuple[str, str, float]]:
+    """Metric name in the first column, one column per period; yields ``(period, metric, value)``."""
+    with open(path, 'r', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        headers = next(reader, [])
+        columns = [(i, label) for i, label in ((i, metric_period_label(h, keep_window_columns, years)) for i, h in enumerate(headers) if i) if label]
+        for row in reader:
+            metric_name = row[0].strip() if row else ''
+            if not metric_name or metric_name == 'TableName':
+                continue
+            for i, label in columns:
+                if i < len(row):
+                    value = parse_number(row[i])
+                    if value is not None:
+                        yield label, metric_name, value
+
+
+# Metric names, and per column header one value per metric (NaN for blank cells)
+ColumnarCSV = Tuple[List[str], Dict[str, array]]
+
+
+def read_csv_columnar(path: str) -> ColumnarCSV:
+    """Read a statement CSV (metric name in the first column) as columns of floats.
+
+    Headers are returned as written, for the caller to interpret; the
+    ``TableName`` row and column are dropped.  Each column is a flat
+    ``array('d')``, so the result pickles as a handful of buffers and is
+    cheap to send back from a worker process.
+    """
+    nan = float('nan')
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        headers = next(reader, [])
+        # A repeated header keeps its last column
+        indexes = {h: i for i, h in enumerate(headers) if i and h != 'TableName'}
+        columns = {h: array('d') for h in indexes}
+        targets = [(i, columns[h]) for h, i in indexes.items()]
+        metrics: List[str] = []
+        for row in reader:
+            metric_name = row[0].strip() if row else ''
+            if not metric_name or metric_name == 'TableName':
+                continue
+            metrics.append(metric_name)
+            width = len(row)
+            for i, values in targets:
+                value = nan
+                cell = row[i] if i < width else ''
+                if cell:
+                    # Thousands separators are the common case; anything else goes through parse_number
+                    try:
+                        value = float(cell.replace(',', ''))
+                    except ValueError:
+                        parsed = parse_number(cell)
+                        if parsed is not None:
+                            value = parsed
+                values.append(value)
+    return metrics, columns
+
+
+@register_parser('MasterFinancials')
+def parse_master_financials(path: str, keep_window_columns: bool = False, years: Optional[Tuple[int, int]] = None, **options) -> List[Tuple[str, str, float]]:
+    return list(read_statement_csv(path, keep_window_columns, years or (FIRST_YEAR, LAST_YEAR)))
+
+
+@register_parser('IncomeStatementExpanded')
+def parse_income_statement(path: str, years: Optional[Tuple[int, int]] = None, **options) -> List[Tuple[str, str, float]]:
+    return list(read_statement_csv(path, years=years))
+
+
+@register_parser('BalanceSheetExpanded')
+def parse_balance_sheet(path: str, years: Optional[Tuple[int, int]] = None, **options) -> List[Tuple[str, str, float]]:
+    return list(read_statement_csv(path, years=years))
+
+
+@register_parser('CashFlowExpanded')
+def parse_cash_flow(path: str, years: Optional[Tuple[int, int]] = None, **options) -> List[Tuple[str, str, float]]:
+    return list(read_statement_csv(path, years=years))
+
+
+@register_parser('ValuationSummary')
+def parse_valuation_summary(path: str, **options) -> List[Tuple[str, str, float]]:
+    """Only ``EquityValue`` is kept, under the ``valuation`` period."""
+    with open(path, 'r', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for row in reader:
+            if len(row) >= 2 and row[0].strip() == 'EquityValue' and row[1].strip():
+                try:
+                    return [(VALUATION_PERIOD, 'EquityValue', float(row[1].strip()))]
+                except ValueError:
+                    raise ValueError(f"Invalid EquityValue: {row[1].strip()}")
+    return []
+
+
+@register_parser('MultiplesTable', writer='multiples')
+def parse_multiples_table(path: str, **options) -> Dict[str, Any]:
+    from sec_app.management.commands.load_multiples_data import Command as LoadMultiplesCommand
+
+    return LoadMultiplesCommand().parse_csv(path, None)
+
+
+PARSE_EXECUTORS: Tuple[str, ...] = ('processes', 'threads')
+
+
+def parse_executor(kind: str, workers: int) -> concurrent.futures.Executor:
+    """Pool for the CSV parsers, also used by ``compute_derived_metrics``.
+
+    Parsing is pure-Python tokenizing and ``float()`` calls, which hold the
+    GIL, so only ``processes`` scales with cores; ``threads`` avoids the
+    start-up and pickling cost for small runs.
+    """
+    if kind == 'processes':
+        # Spawned workers import this module, which needs the app registry
+        return concurrent.futures.ProcessPoolExecutor(max_workers=max(1, workers), initializer=django.setup)
+    return concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers))
+
+
+@dataclass(frozen=True)
+class DataFile:
+    ticker: str
+    kind: str
+    path: str
+
+
+def scan_data_financials(root: str, kinds: Optional[Iterable[str]] = None, tickers: Optional[Iterable[str]] = None) -> Tuple[List[str], List[DataFile]]:
+    """Walk ``root`` once: ``(ticker folders, files with a registered parser)``."""
+    kinds = set(kinds or PARSERS)
+    tickers = {t.upper() for t in tickers} if tickers else None
+    folders: List[str] = []
+    files: List[DataFile] = []
+    with os.scandir(root) as folder_entries:
+        for folder in sorted(folder_entries, key=lambda e: e.name):
+            if not folder.is_dir() or folder.name.startswith('__'):
+                continue
+            ticker = folder.name.upper()
+            if tickers is not None and ticker not in tickers:
+                continue
+            folders.append(ticker)
+            with os.scandir(folder.path) as file_entries:
+                for entry in file_entries:
+                    name, ext = os.path.splitext(entry.name)
+                    prefix, _, kind = name.partition('_')
+                    if ext.lower() == '.csv' and prefix.upper() == ticker and kind in kinds and entry.is_file():
+                        files.append(DataFile(ticker, kind, entry.path))
+    order = {kind: i for i, kind in enumerate(PARSERS)}
+    files.sort(key=lambda f: (f.ticker, order[f.kind]))
+    return folders, files
+
+
+# ---------------------------------------------------------------------------
+# Manifest
+# ---------------------------------------------------------------------------
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IngestManifest:
+    """Size, mtime and SHA-256 of each ``data_financials`` file as of its last successful load.
+
+    ``changed`` stats a file and hashes it only when size or mtime moved, so
+    an unchanged tree costs one query plus a stat per file; a file that was
+    touched but has the same content counts as unchanged.  Loaders
+    ``record`` files once their batch is journaled (see ``IngestJournal``);
+    ``changed`` itself writes nothing.  With ``force`` every file
+    counts as changed.  Entries are keyed by path under the root and
+    shared by all loaders, since every loader writes the same cells for a
+    file.
+    """
+
+    def __init__(self, root: str, force: bool = False):
+        self.root = root
+        self.force = force
+        self.entries: Dict[str, IngestedFile] = {entry.path: entry for entry in IngestedFile.objects.all()}
+        self.fingerprints: Dict[str, Tuple[int, float, str]] = {}
+        # Unchanged content under a new mtime; restamped by the next ``record``
+        self.restamped: List[str] = []
+
+    def key(self, path: str) -> str:
+        return os.path.relpath(path, self.root).replace(os.sep, '/')
+
+    def _fingerprint(self, path: str) -> Tuple[int, float, str]:
+        key = self.key(path)
+        if key not in self.fingerprints:
+            stat = os.stat(path)
+            self.fingerprints[key] = (stat.st_size, stat.st_mtime, file_sha256(path))
+        return self.fingerprints[key]
+
+    def changed(self, path: str) -> bool:
+        entry = self.entries.get(self.key(path))
+        if entry is None or self.force:
+            return True
+        stat = os.stat(path)
+        if entry.size == stat.st_size and entry.mtime == stat.st_mtime:
+            return False
+        if self._fingerprint(path)[2] != entry.sha256:
+            return True
+        self.restamped.append(path)
+        return False
+
+    def select(self, paths: Iterable[str]) -> List[str]:
+        """The ``paths`` whose content changed since they were last recorded."""
+        return [path for path in paths if self.changed(path)]
+
+    def record(self, paths: Iterable[str], batch_size: int = 1000) -> None:
+        """Store the fingerprints of ``paths``, and the new stat of any restamped file."""
+        paths, self.restamped = list(paths) + self.restamped, []
+        now = timezone.now()
+        entries = []
+        for path in paths:
+            key = self.key(path)
+            size, mtime, sha256 = self._fingerprint(path)
+            entries.append(IngestedFile(path=key, ticker=key.split('/')[0][:10].upper(), size=size, mtime=mtime, sha256=sha256, updated_at=now))
+        IngestedFile.objects.bulk_create(
+            entries,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['path'],
+            update_fields=['ticker', 'size', 'mtime', 'sha256', 'updated_at'],
+        )
+        for entry in entries:
+            self.entries[entry.path] = entry
+
+
+def add_manifest_arguments(parser) -> None:
+    """``--force`` / ``--changed-only`` for the commands that load ``data_financials`` files."""
+    parser.add_argument('--force', action='store_true', help='Load every file, even those unchanged since their last load')
+    parser.add_argument('--changed-only', action='store_true', help='Only list the files that changed since their last load, without loading them')
+
+
+def add_year_arguments(parser) -> None:
+    """``--first-year`` / ``--last-year`` for the commands that load statement files."""
+    parser.add_argument('--first-year', type=int, help='Skip year and quarter columns before this year (default: load every year)')
+    parser.add_argument('--last-year', type=int, help='Skip year and quarter columns after this year (default: load every year)')
+
+
+def year_range(options: Dict[str, Any]) -> Optional[Tuple[int, int]]:
+    """The ``years`` parser option for ``--first-year`` / ``--last-year``, or None when neither is given."""
+    first, last = options.get('first_year'), options.get('last_year')
+    if first is None and last is None:
+        return None
+    return (first if first is not None else 1, last if last is not None else 9999)
+
+
+def select_changed(command, manifest: IngestManifest, paths: Iterable[str], changed_only: bool = False) -> Optional[Set[str]]:
+    """The ``paths`` changed since their last load, or None once ``--changed-only`` listed them.
+
+    With ``changed_only`` the changed files' keys and a count go to the
+    management ``command``'s stdout, and the caller stops without loading.
+    """
+    paths = list(paths)
+    changed = set(manifest.select(paths))
+    if not changed_only:
+        return changed
+    for path in paths:
+        if path in changed:
+            command.stdout.write(manifest.key(path))
+    command.stdout.write(command.style.SUCCESS(f'{len(changed)} of {len(paths)} files changed since their last load'))
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Writers
+# ---------------------------------------------------------------------------
+
+def ensure_companies(tickers: Iterable[str], names: Optional[Dict[str, str]] = None, batch_size: int = 1000) -> Dict[str, int]:
+    """Ticker -> company id, creating missing companies in bulk.
+
+    New companies are named from ``names`` (falling back to the ticker);
+    existing companies get their name updated when ``names`` has one.
+    """
+    names = names or {}
+    tickers = sorted({t.upper() for t in tickers})
+    existing = {c.ticker: c for c in Company.objects.filter(ticker__in=tickers)}
+    missing = [Company(ticker=t, name=names.get(t, t)) for t in tickers if t not in existing]
+    renamed = [c for t, c in existing.items() if names.get(t) and c.name != names[t]]
+    for company in renamed:
+        company.name = names[company.ticker]
+    with transaction.atomic():
+        Company.objects.bulk_create(missing, batch_size=batch_size, ignore_conflicts=True)
+        Company.objects.bulk_update(renamed, ['name', 'updated_at'], batch_size=batch_size)
+    return dict(Company.objects.filter(ticker__in=tickers).values_list('ticker', 'id'))
+
+
+def _period_fields(label: str) -> Dict[str, Any]:
+    if label == VALUATION_PERIOD:
+        return {'period': label, 'period_type': 'valuation', 'start_date': date.today(), 'end_date': date.today()}
+    # LastNY_AVG / LastNY_CAGR window columns have no dates
+    return period_attributes(label) or {'period': label, 'start_date': None, 'end_date': None}
+
+
+@dataclass
+class UpsertResult:
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    # (company_id, period_id) pairs with at least one created or updated metric
+    changed_pairs: Set[Tuple[int, int]] = field(default_factory=set)
+
+    @property
+    def written(self) -> int:
+        return self.created + self.updated
+
+    def merge(self, other: 'UpsertResult') -> 'UpsertResult':
+        self.created += other.created
+        self.updated += other.updated
+        self.unchanged += other.unchanged
+        self.changed_pairs |= other.changed_pairs
+        return self
+
+    def __str__(self) -> str:
+        return f"{self.created:,} created, {self.updated:,} updated, {self.unchanged:,} unchanged"
+
+
+LOADERS: Tuple[str, ...] = ('auto', 'copy', 'insert')
+
+
+def _conflict_clause(table: str, update: bool) -> str:
+    if not update:
+        return 'DO NOTHING'
+    distinct = 'IS DISTINCT FROM' if connection.vendor == 'postgresql' else 'IS NOT'
+    return f'DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at WHERE {table}.value {distinct} excluded.value'
+
+
+def upsert_metrics(rows: Iterable[Tuple[int, int, str, float]], update: bool = True, batch_size: int = 5000, loader: str = 'auto') -> UpsertResult:
+    """Write ``(company_id, period_id, metric_name, value)`` rows with one statement per batch.
+
+    New cells are inserted.  With ``update`` an existing cell is rewritten
+    only when its value differs (``ON CONFLICT ... DO UPDATE ... WHERE``);
+    without it existing cells are left alone.  ``RETURNING`` reports the
+    rows actually written, so unchanged cells are neither touched nor
+    counted as dirty.
+
+    ``loader='copy'`` (the ``auto`` choice on PostgreSQL) streams the rows
+    through ``COPY`` instead of rendering multi-row INSERTs; see
+    ``copy_metrics``.
+    """
+    if loader == 'auto':
+        loader = 'copy' if connection.vendor == 'postgresql' else 'insert'
+    if loader == 'copy':
+        return copy_metrics(rows, update, batch_size)
+
+    # Later rows win; a statement may not hit the same conflict key twice
+    cells = {(company_id, period_id, metric_name): value for company_id, period_id, metric_name, value in rows}
+    result = UpsertResult()
+    if not cells:
+        return result
+
+    if connection.vendor not in ('postgresql', 'sqlite'):
+        FinancialMetric.objects.bulk_create(
+            [FinancialMetric(company_id=c, period_id=p, metric_name=m, value=v, unit='USD') for (c, p, m), v in cells.items()],
+            batch_size=batch_size,
+            update_conflicts=update,
+            ignore_conflicts=not update,
+            unique_fields=['metric_name', 'period', 'company'] if update else None,
+            update_fields=['value', 'updated_at'] if update else None,
+        )
+        result.updated = len(cells)
+        result.changed_pairs = {(c, p) for c, p, _ in cells}
+        return result
+
+    table = connection.ops.quote_name(FinancialMetric._meta.db_table)
+    conflict = _conflict_clause(table, update)
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    max_params = connection.features.max_query_params
+    per_statement = max(1, min(batch_size, max_params // 7 if max_params else batch_size))
+
+    items = list(cells.items())
+    with connection.cursor() as cursor:
+        for i in range(0, len(items), per_statement):
+            chunk = items[i:i + per_statement]
+            params: List[Any] = []
+            for (company_id, period_id, metric_name), value in chunk:
+                params.extend((company_id, period_id, metric_name, value, 'USD', now, now))
+            cursor.execute(
+                f'INSERT INTO {table} (company_id, period_id, metric_name, value, unit, created_at, updated_at) '
+                f'VALUES {", ".join(["(%s, %s, %s, %s, %s, %s, %s)"] * len(chunk))} '
+                f'ON CONFLICT (metric_name, period_id, company_id) {conflict} '
+                # Inserted rows carry this statement's timestamp in both columns
+                f'RETURNING company_id, period_id, created_at = updated_at',
+                params,
+            )
+            written = cursor.fetchall()
+            created = sum(1 for _, _, inserted in written if inserted)
+            result.created += created
+            result.updated += len(written) - created
+            result.unchanged += len(chunk) - len(written)
+            result.changed_pairs.update((company_id, period_id) for company_id, period_id, _ in written)
+    return result
+
+
+def _copy_text(text: str) -> str:
+    return text.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+class _CopyStream:
+    """Read-only file over ``COPY`` text lines, produced as the server asks for them."""
+
+    def __init__(self, lines: Iterable[str]):
+        self.lines = iter(lines)
+        self.buffer = ''
+
+    def read(self, size: int = -1) -> str:
+        parts, length = [self.buffer], len(self.buffer)
+        while size < 0 or length < size:
+            line = next(self.lines, None)
+            if line is None:
+                break
+            parts.append(line)
+            length += len(line)
+        data = ''.join(parts)
+        if size < 0:
+            self.buffer = ''
+            return data
+        self.buffer = data[size:]
+        return data[:size]
+
+    readline = read
+
+
+_STAGING_TABLE = 'financial_metric_staging'
+
+
+def copy_metrics(rows: Iterable[Tuple[int, int, str, float]], update: bool = True, batch_size: int = 50000) -> UpsertResult:
+    """PostgreSQL bulk path of ``upsert_metrics``.
+
+    Each batch is streamed with ``COPY`` into a temporary staging table and
+    merged into ``FinancialMetric`` with one ``INSERT ... SELECT ... ON
+    CONFLICT`` statement.  Rows are encoded as the server reads them, so no
+    model instances or SQL text are built and memory does not grow with the
+    batch size.  Duplicate cells within a batch resolve to the last row.
+    """
+    if connection.vendor != 'postgresql':
+        raise ValueError(f"COPY loading needs PostgreSQL, not {connection.vendor}")
+
+    table = connection.ops.quote_name(FinancialMetric._meta.db_table)
+    now = timezone.now()
+    result = UpsertResult()
+    rows = iter(rows)
+    exhausted = False
+
+    def batch_lines():
+        nonlocal exhausted
+        for _ in range(batch_size):
+            row = next(rows, None)
+            if row is None:
+                exhausted = True
+                return
+            company_id, period_id, metric_name, value = row
+            yield f'{int(company_id)}\t{int(period_id)}\t{_copy_text(metric_name)}\t{float(value)!r}\n'
+
+    copy_sql = f'COPY {_STAGING_TABLE} (company_id, period_id, metric_name, value) FROM STDIN'
+    merge_sql = (
+        f'WITH written AS ('
+        f'INSERT INTO {table} (company_id, period_id, metric_name, value, unit, created_at, updated_at) '
+        f'SELECT DISTINCT ON (metric_name, period_id, company_id) company_id, period_id, metric_name, value, %s, %s, %s '
+        f'FROM {_STAGING_TABLE} ORDER BY metric_name, period_id, company_id, seq DESC '
+        f'ON CONFLICT (metric_name, period_id, company_id) {_conflict_clause(table, update)} '
+        # Inserted rows carry this statement's timestamp in both columns
+        f'RETURNING company_id, period_id, created_at = updated_at AS inserted'
+        f') SELECT company_id, period_id, count(*), count(*) FILTER (WHERE inserted) FROM written GROUP BY company_id, period_id'
+    )
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TEMPORARY TABLE IF NOT EXISTS {_STAGING_TABLE} ('
+            f'seq bigserial, company_id bigint, period_id bigint, metric_name varchar(100), value double precision'
+            f') ON COMMIT DROP'
+        )
+        while not exhausted:
+            cursor.execute(f'TRUNCATE {_STAGING_TABLE}')
+            stream = _CopyStream(batch_lines())
+            if hasattr(cursor, 'copy_expert'):
+                cursor.copy_expert(copy_sql, stream)
+            else:
+                # psycopg 3
+                with cursor.copy(copy_sql) as copy:
+                    while True:
+                        data = stream.read(65536)
+                        if not data:
+                            break
+                        copy.write(data)
+            cursor.execute(f'SELECT count(*) FROM (SELECT DISTINCT metric_name, period_id, company_id FROM {_STAGING_TABLE}) cells')
+            staged = cursor.fetchone()[0]
+            if not staged:
+                continue
+            cursor.execute(merge_sql, ['USD', now, now])
+            written = 0
+            for company_id, period_id, count, created in cursor.fetchall():
+                written += count
+                result.created += created
+                result.updated += count - created
+                result.changed_pairs.add((company_id, period_id))
+            result.unchanged += staged - written
+    return result
+
+
+class FlushError(Exception):
+    """A writer flush failed and was rolled back, losing the rows buffered for
+    ``company_ids`` (``MetricWriter``) or ``tickers`` (``MultiplesWriter``)."""
+
+    def __init__(self, error: Exception, company_ids: Iterable[int] = (), tickers: Iterable[str] = ()):
+        super().__init__(str(error))
+        self.company_ids = set(company_ids)
+        self.tickers = set(tickers)
+
+
+def report_unwritten(command, error: FlushError, company_ids: Dict[str, int]) -> Set[str]:
+    """Tickers whose buffered rows ``error`` lost, after naming them on the management ``command``'s stdout.
+
+    ``company_ids`` maps ticker -> company id.  Loaders leave these tickers
+    out of the batch they journal, so ``--resume`` and the manifest retry them.
+    """
+    lost = error.tickers | {ticker for ticker, company_id in company_ids.items() if company_id in error.company_ids}
+    command.stdout.write(command.style.ERROR(f'Error writing {", ".join(sorted(lost))}: {error}'))
+    return lost
+
+
+class MetricWriter:
+    """Buffers ``(company, period, metric, value)`` cells and upserts them in bulk.
+
+    Periods are created as needed; an existing cell is overwritten when its
+    value changed (or left alone when ``update`` is off).  ``loader`` picks
+    the write path (see ``upsert_metrics``).  ``result`` holds
+    the running counts and ``dirty_pairs`` the ``(company_id, period_id)``
+    pairs actually written, for the derived-metric refresh.  With a
+    ``journal`` each flush notes its pairs in the same transaction as the
+    upsert (see ``IngestJournal.note``).  A failed flush drops its buffer
+    and raises ``FlushError``; later flushes carry on.
+    """
+
+    def __init__(self, batch_size: int = 5000, flush_rows: int = 100000, update: bool = True, loader: str = 'auto', journal: Optional['IngestJournal'] = None):
+        self.batch_size = batch_size
+        self.flush_rows = flush_rows
+        self.update = update
+        self.loader = loader
+        self.journal = journal
+        self.pending: Dict[Tuple[int, str, str], float] = {}
+        self.periods: Dict[Tuple[int, str], int] = {}
+        self.result = UpsertResult()
+
+    @property
+    def dirty_pairs(self) -> Set[Tuple[int, int]]:
+        return self.result.changed_pairs
+
+    @property
+    def written(self) -> int:
+        return self.result.written
+
+    def add(self, company_id: int, rows: Iterable[Tuple[str, str, float]]) -> None:
+        for period, metric_name, value in rows:
+            self.pending[(company_id, period, metric_name)] = value
+        if len(self.pending) >= self.flush_rows:
+            self.flush()
+
+    def _resolve_periods(self, keys: Set[Tuple[int, str]]) -> None:
+        missing = keys - self.periods.keys()
+        if not missing:
+            return
+        company_ids = {company_id for company_id, _ in missing}
+        labels = {label for _, label in missing}
+
+        def load():
+            rows = FinancialPeriod.objects.filter(company_id__in=company_ids, period__in=labels).values_list('company_id', 'period', 'id')
+            self.periods.update({(company_id, period): period_id for company_id, period, period_id in rows})
+
+        load()
+        new = [FinancialPeriod(company_id=company_id, **_period_fields(label)) for company_id, label in missing if (company_id, label) not in self.periods]
+        if new:
+            FinancialPeriod.objects.bulk_create(new, batch_size=self.batch_size, ignore_conflicts=True)
+            load()
+
+    def flush(self) -> UpsertResult:
+        if not self.pending:
+            return UpsertResult()
+        pending, self.pending = self.pending, {}
+        periods = dict(self.periods)
+        open_batch = copy.copy(self.journal.open_batch) if self.journal is not None else None
+        try:
+            with transaction.atomic():
+                self._resolve_periods({(company_id, period) for company_id, period, _ in pending})
+                result = upsert_metrics(
+                    ((company_id, self.periods[(company_id, period)], metric_name, value) for (company_id, period, metric_name), value in pending.items()),
+                    self.update,
+                    self.batch_size,
+                    self.loader,
+                )
+                if self.journal is not None:
+                    self.journal.note(result)
+        except Exception as e:
+            # Periods and journal notes from the rolled-back transaction no longer exist
+            self.periods = periods
+            if self.journal is not None:
+                self.journal.open_batch = open_batch
+            raise FlushError(e, company_ids={company_id for company_id, _, _ in pending}) from e
+        self.result.merge(result)
+        return result
+
+
+class MultiplesWriter:
+    """Buffers ``CompanyMultiples`` rows by ticker and upserts them in bulk."""
+
+    FIELDS = ('numerators', 'denominators', 'roic_metrics', 'revenue_growth')
+
+    def __init__(self, batch_size: int = 1000):
+        self.batch_size = batch_size
+        self.pending: Dict[str, Dict[str, Any]] = {}
+        self.written = 0
+
+    def add(self, ticker: str, data: Dict[str, Any]) -> None:
+        self.pending[ticker.upper()] = data
+
+    def flush(self) -> int:
+        if not self.pending:
+            return 0
+        pending, self.pending = self.pending, {}
+        try:
+            with transaction.atomic():
+                CompanyMultiples.objects.bulk_create(
+                    [CompanyMultiples(ticker=ticker, **{name: data.get(name, {}) for name in self.FIELDS}) for ticker, data in pending.items()],
+                    batch_size=self.batch_size,
+                    update_conflicts=True,
+                    unique_fields=['ticker'],
+                    update_fields=[*self.FIELDS, 'updated_at'],
+                )
+        except Exception as e:
+            raise FlushError(e, tickers=pending) from e
+        self.written += len(pending)
+        return len(pending)
+
+
+# ---------------------------------------------------------------------------
+# Journal
+# ---------------------------------------------------------------------------
+
+class IngestJournal:
+    """Checkpoints of one loader run, stored as ``IngestRun`` / ``IngestBatch`` rows.
+
+    Loaders call ``checkpoint`` once a batch is written: the tickers it
+    covered, its row counts, the ``(company_id, period_id)`` pairs it changed
+    and how long it took.  Opened with ``resume``, the journal continues the
+    latest interrupted run of the same command, so the loader can skip
+    ``done_tickers``.
+
+    Writers ``note`` the pairs of every flush in the transaction that
+    writes them, into the run's open batch, which the next ``checkpoint``
+    completes; so written rows never go unjournaled, even when a run dies
+    between flush and checkpoint.  Loaders record files in the manifest
+    only after their batch is journaled, so the pairs a skipped file wrote
+    are never lost either: besides
+    this run's, ``dirty_pairs`` carries those of every earlier run whose
+    derived refresh never ran, i.e. interrupted runs of the same command
+    and, for loaders opened with ``derived``, any run loaded with
+    ``--skip-derived``.  ``finish`` closes the run
+    and those earlier runs once the derived refresh is done, or marks them
+    ``loaded`` (refresh pending) when it was skipped.
+    """
+
+    def __init__(self, run: IngestRun, pending: Iterable[IngestRun] = ()):
+        self.run = run
+        self.pending = [other for other in pending if other.id != run.id]
+        batches = list(run.batches.all())
+        self.done_tickers: Set[str] = {ticker for batch in batches for ticker in batch.tickers}
+        self.dirty_pairs: Set[Tuple[int, int]] = {
+            (company_id, period_id)
+            for batch in batches + list(IngestBatch.objects.filter(run__in=self.pending))
+            for company_id, period_id in batch.dirty_pairs
+        }
+        self.next_number = max((batch.number for batch in batches), default=0) + 1
+        # Batch holding the pairs noted since the last checkpoint
+        self.open_batch: Optional[IngestBatch] = None
+        self.resumed = bool(batches)
+        # What this process has checkpointed so far, to turn running totals into per-batch counts
+        self.recorded = UpsertResult()
+        self.last_checkpoint = time.perf_counter()
+
+    @classmethod
+    def open(cls, command: str, options: Optional[Dict[str, Any]] = None, resume: bool = False, derived: bool = False) -> 'IngestJournal':
+        """Start a run of ``command``; ``derived`` loaders also take over the refresh pending from other runs."""
+        run = None
+        unrefreshed = Q(command=command, status='running')
+        if derived:
+            unrefreshed |= Q(status='loaded')
+        pending = list(IngestRun.objects.filter(unrefreshed).order_by('-id'))
+        if resume:
+            run = next((other for other in pending if other.status == 'running'), None)
+        if run is None:
+            options = {name: value for name, value in (options or {}).items() if isinstance(value, (str, int, float, bool, list, type(None)))}
+            run = IngestRun.objects.create(command=command, options=options)
+        return cls(run, pending)
+
+    def note(self, result: UpsertResult) -> None:
+        """Journal the pairs of one writer flush; call it inside the flush's transaction."""
+        if not result.changed_pairs:
+            return
+        if self.open_batch is None:
+            batch = IngestBatch(run=self.run, number=self.next_number, dirty_pairs=sorted(result.changed_pairs), seconds=0)
+        else:
+            batch = self.open_batch
+            batch.dirty_pairs = sorted({tuple(pair) for pair in batch.dirty_pairs} | result.changed_pairs)
+        batch.save()
+        self.open_batch = batch
+
+    def checkpoint(self, tickers: Iterable[str], files: int, result: UpsertResult) -> IngestBatch:
+        """Record a written batch; ``result`` is the loader's running total for this process."""
+        now = time.perf_counter()
+        pairs = result.changed_pairs - self.recorded.changed_pairs
+        batch = self.open_batch or IngestBatch(run=self.run, number=self.next_number)
+        if self.open_batch is not None:
+            pairs |= {tuple(pair) for pair in batch.dirty_pairs}
+        batch.tickers = sorted(set(tickers))
+        batch.files = files
+        batch.created = result.created - self.recorded.created
+        batch.updated = result.updated - self.recorded.updated
+        batch.unchanged = result.unchanged - self.recorded.unchanged
+        batch.dirty_pairs = sorted(pairs)
+        batch.seconds = now - self.last_checkpoint
+        batch.save()
+        self.open_batch = None
+        self.recorded = UpsertResult(result.created, result.updated, result.unchanged, set(result.changed_pairs))
+        self.done_tickers.update(batch.tickers)
+        self.dirty_pairs |= pairs
+        self.next_number += 1
+        self.last_checkpoint = now
+        return batch
+
+    def finish(self, refreshed: bool = True) -> None:
+        """Close the run; without ``refreshed`` its dirty pairs stay pending for the next run."""
+        now = timezone.now()
+        runs = [self.run] + self.pending
+        for run in runs:
+            run.status = 'finished' if refreshed else 'loaded'
+            run.finished_at = run.updated_at = now
+        IngestRun.objects.bulk_update(runs, ['status', 'finished_at', 'updated_at'])
+
+
+def add_journal_arguments(parser, checkpoint_every: bool = True) -> None:
+    """``--resume`` (and ``--checkpoint-every``) for the commands that load ``data_financials`` files."""
+    parser.add_argument('--resume', action='store_true', help='Continue the last unfinished run of this command, skipping the tickers it completed')
+    if checkpoint_every:
+        parser.add_argument('--checkpoint-every', type=int, default=500, help='Tickers written between journal checkpoints')
+
+
+def refresh_and_finish(command, journal: IngestJournal, dirty_pairs: Set[Tuple[int, int]], skip_derived: bool = False, batch_size: int = 5000) -> None:
+    """Refresh derived, window and TTM metrics for ``dirty_pairs``, then close ``journal``.
+
+    With ``skip_derived`` nothing is refreshed and the run is closed as
+    ``loaded``, so the pairs stay pending for the next load.  Progress goes
+    to the management ``command``'s stdout.
+    """
+    # Imported here so parse workers, which import this module, never load them
+    from sec_app_2.derived_metrics import refresh_dirty_pairs
+    from sec_app_2.rolling import refresh_window_metrics
+    from sec_app_2.ttm import refresh_dirty_ttm
+
+    if dirty_pairs and not skip_derived:
+        written = refresh_dirty_pairs(dirty_pairs, batch_size)
+        command.stdout.write(command.style.SUCCESS(f'✅ Refreshed {written:,} derived metrics for {len(dirty_pairs):,} company periods'))
+        company_ids = {company_id for company_id, _ in dirty_pairs}
+        written = refresh_window_metrics(company_ids, batch_size=batch_size)
+        command.stdout.write(command.style.SUCCESS(f'✅ Refreshed {written:,} window metrics for {len(company_ids):,} companies'))
+        written = refresh_dirty_ttm(dirty_pairs, batch_size)
+        if written:
+            command.stdout.write(command.style.SUCCESS(f'✅ Refreshed {written:,} TTM metrics'))
+    elif dirty_pairs:
+        command.stdout.write(f'Derived metrics for {len(dirty_pairs):,} company periods stay pending until the next load without --skip-derived')
+    journal.finish(refreshed=not (dirty_pairs and skip_derived))
@@ -0,0 +1,49 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sec_app_2.benchmarks import compare, run_benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the valuation calculators on synthetic statements and optionally gate on regressions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tickers', type=int, default=20, help='Synthetic tickers')
+        parser.add_argument('--years', type=int, default=15, help='Years per ticker')
+        parser.add_argument('--repeat', type=int, default=3, help='Rounds per benchmark')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the synthetic data')
+        parser.add_argument('--only', help='Only benchmarks whose name contains this')
+        parser.add_argument('--output', help='Write results as JSON to this file')
+        parser.add_argument('--baseline', help='Previous results JSON to compare against')
+        parser.add_argument('--max-regression', type=float, default=10.0, help='Fail when a median slows down by more than this percentage')
+
+    def handle(self, *args, **options):
+        if options['tickers'] < 1 or options['years'] < 2 or options['repeat'] < 1:
+            raise CommandError('--tickers and --repeat must be at least 1 and --years at least 2')
+
+        report = run_benchmarks(options['tickers'], options['years'], options['repeat'], options['seed'], options['only'])
+
+        self.stdout.write(f"{'benchmark':<60} {'ops/sec':>12} {'p50 us':>10} {'p99 us':>10}")
+        for name, result in sorted(report['benchmarks'].items()):
+            self.stdout.write(f"{name:<60} {result['ops_per_sec']:>12,.0f} {result['p50_us']:>10.1f} {result['p99_us']:>10.1f}")
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Could not read baseline {options['baseline']}: {e}")
+            regressions = compare(report, baseline, options['max_regression'])
+            for item in regressions:
+                self.stdout.write(self.style.ERROR(
+                    f"{item['name']}: p50 {item['baseline_p50_us']:.1f} -> {item['p50_us']:.1f} us (+{item['change_pct']:.1f}%)"
+                ))
+            if regressions:
+                raise CommandError(f"{len(regressions)} benchmarks regressed by more than {options['max_regression']}%")
+            self.stdout.write(self.style.SUCCESS(f"No benchmark regressed by more than {options['max_regression']}%"))
@@ -0,0 +1,47 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sec_app_2.parse_benchmarks import run_parse_benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Benchmark MasterFinancials CSV parsing with threads, processes and pandas engines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--files', type=int, default=200, help='Files to parse (synthetic, or the first N found in --data-dir)')
+        parser.add_argument('--metrics', type=int, default=300, help='Metric rows per synthetic file')
+        parser.add_argument('--years', type=int, default=20, help='Year columns per synthetic file')
+        parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8], help='Pool sizes to time for threads and processes')
+        parser.add_argument('--repeat', type=int, default=3, help='Rounds per benchmark')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the synthetic data')
+        parser.add_argument('--data-dir', help='Parse the MasterFinancials files of this data_financials directory instead of synthetic ones')
+        parser.add_argument('--only', help='Only benchmarks whose name contains this (serial always runs)')
+        parser.add_argument('--output', help='Write results as JSON to this file')
+
+    def handle(self, *args, **options):
+        if options['files'] < 1 or options['metrics'] < 1 or options['years'] < 1 or options['repeat'] < 1:
+            raise CommandError('--files, --metrics, --years and --repeat must be at least 1')
+        if any(n < 1 for n in options['workers']):
+            raise CommandError('--workers must be at least 1')
+
+        report = run_parse_benchmarks(
+            options['files'], options['metrics'], options['years'], options['workers'],
+            options['repeat'], options['seed'], options['data_dir'], options['only'],
+        )
+        meta = report['meta']
+        if not meta['files']:
+            raise CommandError(f"No MasterFinancials files found in {options['data_dir']}")
+        self.stdout.write(f"{meta['files']} files, {meta['bytes'] / 1e6:.1f} MB, {meta['cpus']} CPUs")
+
+        self.stdout.write(f"{'benchmark':<20} {'files/sec':>10} {'MB/sec':>8} {'p50 s':>8} {'speedup':>8}")
+        for name, result in report['benchmarks'].items():
+            self.stdout.write(
+                f"{name:<20} {result['files_per_sec']:>10,.0f} {result['mb_per_sec']:>8.1f} "
+                f"{result['p50_s']:>8.3f} {result['speedup']:>7.2f}x"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
@@ -0,0 +1,82 @@
+import copy
+import json
+import logging
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+from sec_app_2.calculators import instrumentation
+
+
+class Command(BaseCommand):
+    help = 'Per-field calculator call counts, timings and errors, from a running server or a synthetic workload'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help='Read stats from a running server (e.g. http://localhost:8000/api/sec/debug/calculator-stats/)')
+        parser.add_argument('--tickers', type=int, default=20, help='Synthetic tickers for the local workload')
+        parser.add_argument('--years', type=int, default=15, help='Years per synthetic ticker')
+        parser.add_argument('--repeat', type=int, default=1, help='Full recomputes per ticker')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the synthetic data')
+        parser.add_argument('--sort', choices=instrumentation.SORT_KEYS, default='total_ms', help='Column to rank fields by')
+        parser.add_argument('--top', type=int, default=30, help='Number of fields to show (0 for all)')
+        parser.add_argument('--statement', help='Only fields of this statement')
+        parser.add_argument('--output', help='Write the rows as JSON to this file')
+
+    def handle(self, *args, **options):
+        if options['url']:
+            rows = self._remote_stats(options)
+        else:
+            rows = self._workload_stats(options)
+
+        self.stdout.write(f"{'field':<78} {'calls':>9} {'total ms':>10} {'mean us':>9} {'errors':>7} {'none':>7}")
+        for row in rows:
+            self.stdout.write(
+                f"{row['statement'] + '.' + row['field']:<78} {row['calls']:>9,} {row['total_ms']:>10.1f} "
+                f"{row['mean_us']:>9.1f} {row['errors']:>7,} {row['none_results']:>7,}"
+            )
+        failing = [row for row in rows if row['errors']]
+        if failing:
+            self.stdout.write(self.style.WARNING(f'{len(failing)} of the fields shown logged or raised errors'))
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(rows, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Stats written to {options['output']}"))
+
+    def _remote_stats(self, options):
+        params = {'sort': options['sort'], 'top': options['top'] or None, 'statement': options['statement']}
+        try:
+            response = requests.get(options['url'], params={k: v for k, v in params.items() if v}, timeout=30)
+            response.raise_for_status()
+            payload = response.json()
+        except (requests.RequestException, ValueError) as e:
+            raise CommandError(f"Could not read stats from {options['url']}: {e}")
+        if not payload.get('enabled'):
+            self.stdout.write(self.style.WARNING('Instrumentation is disabled on that server; showing what was recorded before'))
+        return payload.get('fields', [])
+
+    def _workload_stats(self, options):
+        if options['tickers'] < 1 or options['years'] < 2 or options['repeat'] < 1:
+            raise CommandError('--tickers and --repeat must be at least 1 and --years at least 2')
+        from sec_app_2.benchmarks import synthetic_statements
+        from sec_app_2.calculators.graph import calculator_graph
+        from sec_app_2.calculators.valuation_model import build_model
+
+        companies = synthetic_statements(options['tickers'], options['years'], options['seed'])
+        was_enabled = instrumentation.instrumentation_enabled()
+        calculators_logger = logging.getLogger('sec_app_2.calculators')
+        level = calculators_logger.level
+        calculators_logger.setLevel(logging.WARNING)
+        instrumentation.reset_calculator_stats()
+        instrumentation.enable_instrumentation()
+        try:
+            for _ in range(options['repeat']):
+                for _, statements in companies:
+                    calculator_graph.recalculate_all(build_model(copy.deepcopy(statements)))
+        finally:
+            calculators_logger.setLevel(level)
+            if not was_enabled:
+                instrumentation.disable_instrumentation()
+
+        self.stdout.write(f"Scalar recompute of {options['tickers']} tickers x {options['years']} years, {options['repeat']} rounds")
+        return instrumentation.calculator_stats(options['sort'], options['top'] or None, options['statement'])
@@ -0,0 +1,92 @@
+import os
+import time
+import concurrent.futures
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.utils import timezone
+
+from sec_app.ingest import parse_executor
+from sec_app.models import Company, FinancialMetric
+from sec_app_2.derived_metrics import refresh_company
+
+
+class Command(BaseCommand):
+    help = 'Compute derived metrics (NOPAT, ROIC, FCF, financing health, common-size) for every company'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tickers', nargs='+', help='Only these tickers (space or comma separated)')
+        parser.add_argument('--workers', type=int, default=min(8, os.cpu_count() or 1), help='Worker processes (0 or 1 runs inline)')
+        parser.add_argument('--since', help='Only companies whose raw metrics changed on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--period-type', default='annual', choices=['annual', 'quarterly', 'ttm'], help='Periods to compute')
+        parser.add_argument('--db-batch-size', type=int, default=5000, help='Database batch size for bulk inserts')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        company_ids = self.select_companies(options)
+        total = len(company_ids)
+        self.stdout.write(f"Computing derived metrics for {total} companies with {options['workers']} workers")
+        if not total:
+            return
+
+        written = 0
+        failed = 0
+        for done, (company_id, count, error) in enumerate(self.refresh_all(company_ids, options), start=1):
+            if error is not None:
+                failed += 1
+                self.stdout.write(self.style.ERROR(f"Company {company_id}: {error}"))
+            else:
+                written += count
+            if done % 100 == 0 or done == total:
+                self.stdout.write(f"  {done}/{total} companies, {written:,} derived metrics written")
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"✅ Wrote {written:,} derived metrics for {total - failed} companies in {elapsed:.1f}s"))
+        if failed:
+            self.stdout.write(self.style.WARNING(f"Failed for {failed} companies"))
+
+    def select_companies(self, options):
+        companies = Company.objects.all()
+        if options['tickers']:
+            tickers = {t.strip().upper() for value in options['tickers'] for t in value.split(',') if t.strip()}
+            companies = companies.filter(ticker__in=tickers)
+        if options['since']:
+            try:
+                since = timezone.make_aware(datetime.strptime(options['since'], '%Y-%m-%d'))
+            except ValueError:
+                raise CommandError('--since must be a date in YYYY-MM-DD format')
+            changed = FinancialMetric.objects.filter(updated_at__gte=since).values('company_id')
+            companies = companies.filter(id__in=changed)
+        return list(companies.order_by('ticker').values_list('id', flat=True))
+
+    def refresh_all(self, company_ids, options):
+        """Yield ``(company_id, rows_written, error)`` as companies finish.
+
+        Each worker computes and writes its own companies, so both the
+        calculator chain and the inserts run in parallel.
+        """
+        args = (None, options['period_type'], options['db_batch_size'])
+        workers = options['workers']
+        if workers > 1 and connection.vendor == 'sqlite':
+            self.stdout.write(self.style.WARNING('SQLite allows a single writer; running inline'))
+            workers = 1
+
+        if workers <= 1:
+            for company_id in company_ids:
+                try:
+                    yield company_id, refresh_company(company_id, *args), None
+                except Exception as e:
+                    yield company_id, 0, e
+            return
+
+        # Forked workers must not share the parent's database connections;
+        # spawned ones need the app registry before unpickling refresh_company
+        connections.close_all()
+        with parse_executor('processes', workers) as executor:
+            futures = {executor.submit(refresh_company, company_id, *args): company_id for company_id in company_ids}
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    yield futures[future], future.result(), None
+                except Exception as e:
+                    yield futures[future], 0, e
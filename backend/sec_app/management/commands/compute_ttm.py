@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from sec_app.models import Company
+from sec_app_2.ttm import refresh_ttm
+
+
+class Command(BaseCommand):
+    help = 'Build trailing-twelve-month (TTM) periods from quarterly metrics for every company'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tickers', nargs='+', help='Only these tickers (space or comma separated)')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Companies loaded into memory per pass')
+        parser.add_argument('--db-batch-size', type=int, default=5000, help='Database batch size for bulk inserts')
+        parser.add_argument('--skip-derived', action='store_true', help='Do not refresh derived metrics for the TTM periods')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        companies = Company.objects.all()
+        if options['tickers']:
+            tickers = {t.strip().upper() for value in options['tickers'] for t in value.split(',') if t.strip()}
+            companies = companies.filter(ticker__in=tickers)
+        company_ids = list(companies.order_by('id').values_list('id', flat=True))
+        self.stdout.write(f"Computing TTM metrics for {len(company_ids)} companies")
+
+        written = 0
+        chunk_size = max(1, options['chunk_size'])
+        for i in range(0, len(company_ids), chunk_size):
+            chunk = company_ids[i:i + chunk_size]
+            written += refresh_ttm(chunk, batch_size=options['db_batch_size'], derived=not options['skip_derived'])
+            self.stdout.write(f"  {min(i + chunk_size, len(company_ids))}/{len(company_ids)} companies, {written:,} TTM metrics written")
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"✅ Wrote {written:,} TTM metrics in {elapsed:.1f}s"))
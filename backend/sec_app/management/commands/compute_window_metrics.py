@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sec_app.models import Company, FinancialPeriod
+from sec_app_2.rolling import STANDARD_WINDOWS, WINDOW_LABEL, refresh_window_metrics
+
+
+class Command(BaseCommand):
+    help = 'Compute trailing N-year averages and CAGRs of every raw metric for every company'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tickers', nargs='+', help='Only these tickers (space or comma separated)')
+        parser.add_argument('--windows', nargs='+', help='Window lengths in years, e.g. 3 5 7Y 12 (default: 1 2 3 4 5 10 15)')
+        parser.add_argument('--period-type', default='annual', choices=['annual', 'quarterly'], help='Periods to read')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Companies loaded into memory per pass')
+        parser.add_argument('--db-batch-size', type=int, default=5000, help='Database batch size for bulk inserts')
+        parser.add_argument('--purge-window-periods', action='store_true', help='Delete the LastNY_AVG/CAGR periods (and their metrics) loaded from CSV columns')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        windows = STANDARD_WINDOWS
+        if options['windows']:
+            try:
+                windows = sorted({int(w.upper().rstrip('Y')) for value in options['windows'] for w in value.split(',') if w.strip()})
+            except ValueError:
+                raise CommandError('--windows must be year counts such as 5 or 7Y')
+            if not windows or windows[0] < 1:
+                raise CommandError('--windows must be at least 1 year')
+
+        companies = Company.objects.all()
+        if options['tickers']:
+            tickers = {t.strip().upper() for value in options['tickers'] for t in value.split(',') if t.strip()}
+            companies = companies.filter(ticker__in=tickers)
+        company_ids = list(companies.order_by('id').values_list('id', flat=True))
+        self.stdout.write(f"Computing {', '.join(f'{w}Y' for w in windows)} windows for {len(company_ids)} companies")
+
+        written = 0
+        chunk_size = max(1, options['chunk_size'])
+        for i in range(0, len(company_ids), chunk_size):
+            chunk = company_ids[i:i + chunk_size]
+            written += refresh_window_metrics(chunk, windows, options['period_type'], options['db_batch_size'])
+            self.stdout.write(f"  {min(i + chunk_size, len(company_ids))}/{len(company_ids)} companies, {written:,} window metrics written")
+
+        if options['purge_window_periods']:
+            periods = FinancialPeriod.objects.filter(period__regex=WINDOW_LABEL.pattern)
+            if options['tickers']:
+                periods = periods.filter(company_id__in=company_ids)
+            deleted, by_model = periods.delete()
+            self.stdout.write(self.style.SUCCESS(
+                f"Deleted {by_model.get('sec_app.FinancialPeriod', 0):,} window periods and {by_model.get('sec_app.FinancialMetric', 0):,} of their metrics"
+            ))
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"✅ Wrote {written:,} window metrics in {elapsed:.1f}s"))
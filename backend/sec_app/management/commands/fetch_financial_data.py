@@ -1,15 +1,27 @@
 # backend/sec_app/management/commands/fetch_financial_data.py
 import os
-import csv
-from collections import defaultdict
 from django.core.management.base import BaseCommand
 from sec_app.models.company import Company
-from sec_app.models.metric import FinancialMetric
 from sec_app.models.period import FinancialPeriod
 from django.db.models import Q
 from tqdm import tqdm
 import concurrent.futures
 from django.db import transaction
+from sec_app.ingest import (
+    LOADERS,
+    PARSE_EXECUTORS,
+    IngestJournal,
+    IngestManifest,
+    UpsertResult,
+    add_journal_arguments,
+    add_manifest_arguments,
+    parse_executor,
+    read_csv_columnar,
+    refresh_and_finish,
+    select_changed,
+    upsert_metrics,
+)
+from sec_app_2.periods import parse_period, period_attributes, quarter_label
 
 class Command(BaseCommand):
     help = 'Import financial data from CSV files'
@@ -17,12 +29,21 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument('--batch-size', type=int, default=500, help='Number of files to process in each batch')
         parser.add_argument('--workers', type=int, default=12, help='Number of parallel workers for CSV reading')
-        parser.add_argument('--skip-existing', action='store_true', help='Skip individual metrics that already exist in database (recommended for incremental updates)')
+        parser.add_argument('--executor', choices=PARSE_EXECUTORS, default='processes', help='Parse CSVs in worker processes (scales with cores) or threads')
+        parser.add_argument('--skip-existing', action='store_true', help='Keep the stored value of metrics that already exist (insert new metrics only); by default changed values are updated')
         parser.add_argument('--db-batch-size', type=int, default=5000, help='Database batch size for bulk operations')
+        parser.add_argument('--loader', choices=LOADERS, default='auto', help='Metric write path: COPY through a staging table (auto on PostgreSQL) or multi-row INSERT')
         parser.add_argument('--turbo', action='store_true', help='Maximum speed mode with minimal logging')
         parser.add_argument('--turbo-visible', action='store_true', help='Turbo mode but with visible progress bars and key status updates')
+        parser.add_argument('--skip-derived', action='store_true', help='Do not refresh derived, window and TTM metrics for the loaded periods')
+        parser.add_argument('--keep-window-columns', action='store_true', help='Also store the CSV LastNY_AVG/CAGR columns as periods (windows are otherwise computed after the load)')
+        add_manifest_arguments(parser)
+        add_journal_arguments(parser, checkpoint_every=False)
 
     def handle(self, *args, **kwargs):
+        # (company_id, period_id) pairs written by this run; their derived metrics are refreshed at the end
+        self.dirty_pairs = set()
+        self.keep_window_columns = kwargs['keep_window_columns']
         # Find data_financials directory
         current_dir = os.path.dirname(os.path.abspath(__file__))
         project_root = os.path.abspath(os.path.join(current_dir, '..', '..', '..', '..'))
@@ -49,6 +70,8 @@ class Command(BaseCommand):
         max_workers = kwargs['workers']
         skip_existing = kwargs['skip_existing']
         db_batch_size = kwargs['db_batch_size']
+        self.loader = kwargs['loader']
+        self.executor = kwargs['executor']
         turbo_mode = kwargs['turbo']
         turbo_visible = kwargs['turbo_visible']
         
@@ -82,11 +105,30 @@ class Command(BaseCommand):
         companies_id_cache = {company.id: company for company in Company.objects.all()}
         
         if skip_existing:
-            self.stdout.write(f"Will skip individual metrics that already exist in database (not entire files)")
+            self.stdout.write(f"Will keep the stored value of metrics that already exist (new metrics only)")
+        else:
+            self.stdout.write(f"Will update metrics whose value changed")
         
         # Filter out files for companies that don't exist in our database
         csv_files = [(ticker, filepath, filename) for ticker, filepath, filename in csv_files if ticker in companies_cache]
         self.stdout.write(f"After filtering for existing companies: {len(csv_files)} files to process")
+
+        # Skip files unchanged since their last load (the manifest is updated as each batch is journaled)
+        self.manifest = IngestManifest(directory_path, force=kwargs['force'])
+        changed = select_changed(self, self.manifest, (filepath for _, filepath, _ in csv_files), kwargs['changed_only'])
+        if changed is None:
+            return
+        if len(changed) < len(csv_files):
+            self.stdout.write(f"Skipping {len(csv_files) - len(changed)} files unchanged since their last load")
+            csv_files = [(ticker, filepath, filename) for ticker, filepath, filename in csv_files if filepath in changed]
+
+        # Every written batch is checkpointed; --resume continues the last unfinished run
+        journal = self.journal = IngestJournal.open('fetch_financial_data', kwargs, resume=kwargs['resume'], derived=True)
+        if journal.resumed:
+            self.stdout.write(f"Resuming run #{journal.run.id}: {len(journal.done_tickers)} tickers already loaded")
+            csv_files = [(ticker, filepath, filename) for ticker, filepath, filename in csv_files if ticker not in journal.done_tickers]
+        # Pairs written by this run before an interruption, or by runs whose derived refresh never ran
+        self.dirty_pairs |= journal.dirty_pairs
         
         self.stdout.write(f"Pre-loaded {len(companies_cache)} companies.")
         if not turbo_mode:
@@ -96,42 +138,30 @@ class Command(BaseCommand):
         else:
             self.stdout.write(f"🚀 TURBO MODE: {batch_size} files/batch, {max_workers} workers, {db_batch_size} DB batch size")
 
-        total_metrics_created = 0
+        total = UpsertResult()
         for i in range(0, len(csv_files), batch_size):
             batch_files = csv_files[i:i + batch_size]
-            batch_metrics = self.process_batch(batch_files, i, len(csv_files), companies_cache, companies_id_cache, max_workers, db_batch_size, turbo_mode, turbo_visible, skip_existing)
-            total_metrics_created += batch_metrics
+            batch_result, read_paths = self.process_batch(batch_files, i, len(csv_files), companies_cache, companies_id_cache, max_workers, db_batch_size, turbo_mode, turbo_visible, skip_existing)
+            total.merge(batch_result)
+            # The batch's dirty pairs are journaled with the manifest entries, so a skipped file never hides a pending refresh
+            with transaction.atomic():
+                batch = journal.checkpoint([ticker for ticker, _, _ in batch_files], len(batch_files), total)
+                self.manifest.record(read_paths, db_batch_size)
             if not turbo_mode or turbo_visible or (i // batch_size + 1) % 5 == 0:  # Log every batch in turbo_visible, every 5th in turbo
-                self.stdout.write(f"Batch {i//batch_size + 1}/{(len(csv_files) + batch_size - 1) // batch_size}: Created {batch_metrics} metrics (Total: {total_metrics_created:,})")
+                self.stdout.write(f"Batch {i//batch_size + 1}/{(len(csv_files) + batch_size - 1) // batch_size}: {batch_result} in {batch.seconds:.1f}s (Total written: {total.written:,})")
         
-        self.stdout.write(f"✅ Completed! Total metrics created: {total_metrics_created:,}")
+        self.stdout.write(f"✅ Completed! Metrics: {total}")
+
+        refresh_and_finish(self, journal, self.dirty_pairs, kwargs['skip_derived'], db_batch_size)
 
     def process_batch(self, batch_files, batch_start, total_files, companies_cache, companies_id_cache, max_workers, db_batch_size, turbo_mode, turbo_visible, skip_existing):
         # batch_files is now list of tuples: (ticker, filepath, filename)
-        current_batch_tickers = {ticker for ticker, _, _ in batch_files}
-        companies_in_current_batch = [companies_cache[ticker] for ticker in current_batch_tickers if ticker in companies_cache]
-        company_ids_in_batch = [company.id for company in companies_in_current_batch]
-
-        # Get existing metrics for this batch more efficiently (only if skip_existing is True)
-        if skip_existing:
-            if not turbo_mode or turbo_visible:
-                self.stdout.write(f"🔍 Checking existing metrics for batch...")
-            existing_metrics_for_batch = set(
-                FinancialMetric.objects.filter(company_id__in=company_ids_in_batch)
-                .values_list('period__period', 'metric_name', 'company_id')
-            )
-            if not turbo_mode or turbo_visible:
-                self.stdout.write(f"Found {len(existing_metrics_for_batch)} existing metrics to skip")
-        else:
-            existing_metrics_for_batch = set()  # Empty set when not skipping existing
-            if not turbo_mode or turbo_visible:
-                self.stdout.write(f"🔄 Replacing all existing data (not skipping any metrics)")
-
         # Process CSV files in parallel
         file_data = {}
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        read_paths = []
+        with parse_executor(self.executor, max_workers) as executor:
             future_to_file = {
-                executor.submit(self.read_csv_fast, filepath): (ticker, filename) 
+                executor.submit(read_csv_columnar, filepath): (ticker, filepath, filename)
                 for ticker, filepath, filename in batch_files
             }
             
@@ -147,69 +177,20 @@ class Command(BaseCommand):
                 desc=progress_desc,
                 disable=turbo_mode and not turbo_visible  # Show progress in turbo_visible mode
             ):
-                ticker, filename = future_to_file[future]
+                ticker, filepath, filename = future_to_file[future]
                 try:
                     file_data[(ticker, filename)] = future.result()
+                    read_paths.append(filepath)
                 except Exception as e:
                     self.stdout.write(self.style.ERROR(f"Error reading {filename} for {ticker}: {str(e)}"))
 
         # Process all data and return metrics count
         if not turbo_mode or turbo_visible:
             self.stdout.write(f"💾 Processing data for database insertion...")
-        return self._process_batch_data(file_data, companies_cache, companies_id_cache, existing_metrics_for_batch, db_batch_size, turbo_mode, turbo_visible, skip_existing)
-
-    def read_csv_fast(self, filepath):
-        """Fast CSV reader for MasterFinancials format: metric name in first column, headers are years/AVG/CAGR"""
-        data = defaultdict(dict)
-        try:
-            with open(filepath, 'r', encoding='utf-8') as file:
-                reader = csv.reader(file)
-                headers = next(reader)  # First row: empty, then years, AVG, CAGR, TableName
-                
-                # Skip the first header (empty cell), process rest as column headers
-                column_headers = headers[1:] if len(headers) > 1 else []
-                
-                for row in reader:
-                    if not row or len(row) == 0:
-                        continue
-                    
-                    # First column is metric name
-                    metric_name = row[0].strip() if len(row) > 0 else None
-                    if not metric_name or metric_name == '':
-                        continue
-                    
-                    # Skip TableName column if present
-                    if metric_name == 'TableName':
-                        continue
-                    
-                    # Process values for each column header
-                    for i, col_header in enumerate(column_headers, 1):
-                        if i >= len(row):
-                            continue
-                        
-                        # Skip TableName column
-                        if col_header == 'TableName':
-                            continue
-                        
-                        cell_value = row[i].strip() if i < len(row) else ''
-                        
-                        # Skip empty cells
-                        if not cell_value or cell_value == '':
-                            continue
-                        
-                        try:
-                            # Parse numeric value (remove commas, $, handle scientific notation)
-                            val_str = str(cell_value).replace(',', '').replace('$', '').strip()
-                            val = float(val_str)
-                            data[metric_name][col_header] = val
-                        except (ValueError, TypeError):
-                            # Skip non-numeric values
-                            continue
-        except Exception as e:
-            raise Exception(f"Error reading CSV file {filepath}: {str(e)}")
-        return data
+        result = self._process_batch_data(file_data, companies_cache, companies_id_cache, db_batch_size, turbo_mode, turbo_visible, skip_existing)
+        return result, read_paths
 
-    def _process_batch_data(self, file_data, companies_cache, companies_id_cache, existing_metrics, db_batch_size, turbo_mode, turbo_visible, skip_existing):
+    def _process_batch_data(self, file_data, companies_cache, companies_id_cache, db_batch_size, turbo_mode, turbo_visible, skip_existing):
         """Process all batch data with chunked database operations"""
         periods_to_create = {}
         metrics_data = []  # Store metric data without period objects initially
@@ -225,7 +206,7 @@ class Command(BaseCommand):
                 continue
 
             # Collect periods and metric data separately
-            self.collect_periods_and_metric_data(csv_data, company, periods_to_create, metrics_data, existing_metrics, skip_existing)
+            self.collect_periods_and_metric_data(csv_data, company, periods_to_create, metrics_data)
 
         if not turbo_mode or turbo_visible:
             self.stdout.write(f"🔄 Collected {len(periods_to_create)} unique periods, {len(metrics_data)} metrics")
@@ -268,52 +249,57 @@ class Command(BaseCommand):
         else:
             periods_cache = {}
 
-        # Now create metrics with proper period objects
+        # Now resolve metric rows to their period ids
         if not turbo_mode or turbo_visible:
-            self.stdout.write(f"🔄 Building metrics objects...")
-        metrics_to_create = []
+            self.stdout.write(f"🔄 Building metric rows...")
+        metric_rows = []
         for metric_data in metrics_data:
             period_key = (metric_data['company_id'], metric_data['period_name'])
             if period_key in periods_cache:
-                metrics_to_create.append(FinancialMetric(
-                    company=metric_data['company'],
-                    period=periods_cache[period_key],
-                    metric_name=metric_data['metric_name'],
-                    value=metric_data['value']
-                ))
+                metric_rows.append((metric_data['company_id'], periods_cache[period_key].id, metric_data['metric_name'], metric_data['value']))
 
-        # Bulk create metrics in chunks with progress
-        total_created = 0
-        if metrics_to_create:
+        # Upsert metrics in chunks: new cells are inserted, changed values updated (unless --skip-existing),
+        # unchanged cells left alone; only written cells mark their period dirty
+        result = UpsertResult()
+        if metric_rows:
             if not turbo_mode or turbo_visible:
-                self.stdout.write(f"💾 Creating {len(metrics_to_create)} metrics in chunks of {db_batch_size}...")
-            for i in range(0, len(metrics_to_create), db_batch_size):
-                chunk = metrics_to_create[i:i + db_batch_size]
+                self.stdout.write(f"💾 Upserting {len(metric_rows)} metrics in chunks of {db_batch_size}...")
+            for i in range(0, len(metric_rows), db_batch_size):
+                chunk = metric_rows[i:i + db_batch_size]
                 with transaction.atomic():
-                    FinancialMetric.objects.bulk_create(chunk, batch_size=db_batch_size, ignore_conflicts=True)
-                total_created += len(chunk)
+                    chunk_result = upsert_metrics(chunk, update=not skip_existing, batch_size=db_batch_size, loader=self.loader)
+                    # Journaled with the rows, so a crash before the checkpoint cannot lose their refresh
+                    self.journal.note(chunk_result)
+                result.merge(chunk_result)
                 # Show detailed progress in turbo_visible mode or for large chunks in normal mode
-                if (not turbo_mode or turbo_visible) and len(metrics_to_create) > db_batch_size and i % (db_batch_size * 10) == 0:
-                    self.stdout.write(f"  📝 Created metrics {i+1}-{min(i+len(chunk), len(metrics_to_create))} of {len(metrics_to_create)}")
+                if (not turbo_mode or turbo_visible) and len(metric_rows) > db_batch_size and i % (db_batch_size * 10) == 0:
+                    self.stdout.write(f"  📝 Upserted metrics {i+1}-{min(i+len(chunk), len(metric_rows))} of {len(metric_rows)}")
+        self.dirty_pairs |= result.changed_pairs
         
-        return total_created
+        return result
 
-    def collect_periods_and_metric_data(self, csv_data, company, periods_to_create, metrics_data, existing_metrics, skip_existing):
-        """Collect periods and metric data from MasterFinancials format: years, AVG, and CAGR columns"""
-        
-        # Collect all unique column headers (periods) from all metrics
-        all_periods = set()
-        for metric_name, values in csv_data.items():
-            all_periods.update(values.keys())
+    def collect_periods_and_metric_data(self, csv_data, company, periods_to_create, metrics_data):
+        """Collect periods and metric data from MasterFinancials format: years, quarters, AVG, and CAGR columns"""
         
+        metric_names, columns = csv_data
+
         # Process each period (column header)
-        for period_name in all_periods:
+        for period_name, values in columns.items():
+            # Skip columns without a single value
+            if all(value != value for value in values):
+                continue
+
             # Skip TableName column
             if period_name == 'TableName':
                 continue
             
+            # Quarter columns ("2024Q1", "Q1 2024", ...) are stored under the canonical "2024Q1"
+            parsed = parse_period(period_name)
+            is_quarter = parsed is not None and parsed[0] == 'quarterly' and 2005 <= parsed[1] <= 2035
+            label = quarter_label(parsed[1], parsed[2]) if is_quarter else period_name
+            
             # Determine period type and create period object
-            period_key = (company.id, period_name)
+            period_key = (company.id, label)
             
             # Check if period is a year (2005-2035)
             is_year = False
@@ -333,7 +319,10 @@ class Command(BaseCommand):
                         start_date=f'{year_int}-01-01',
                         end_date=f'{year_int}-12-31'
                     )
-                elif period_name.startswith('Last') and ('_AVG' in period_name or '_CAGR' in period_name):
+                elif is_quarter:
+                    # Quarter period: period_type 'quarterly' with the quarter's dates
+                    periods_to_create[period_key] = FinancialPeriod(company=company, **period_attributes(label))
+                elif self.keep_window_columns and period_name.startswith('Last') and ('_AVG' in period_name or '_CAGR' in period_name):
                     # AVG or CAGR period: no specific dates, use period name as-is
                     periods_to_create[period_key] = FinancialPeriod(
                         company=company,
@@ -346,27 +335,16 @@ class Command(BaseCommand):
                     continue
             
             # Collect metric data for this period
-            for metric_name, values in csv_data.items():
-                if period_name not in values:
-                    continue
-                
-                value = values[period_name]
-                
-                # Skip if value is None or empty
-                if value is None:
-                    continue
-                
-                # Check if we should skip existing metrics
-                if skip_existing and (period_name, metric_name, company.id) in existing_metrics:
+            for metric_name, value in zip(metric_names, values):
+                # Skip blank cells (NaN)
+                if value != value:
                     continue
                 
                 metrics_data.append({
                     'company': company,
                     'company_id': company.id,
-                    'period_name': period_name,
+                    'period_name': label,
                     'metric_name': metric_name,
                     'value': value
                 })
-                
-                if skip_existing:
-                    existing_metrics.add((period_name, metric_name, company.id))
+
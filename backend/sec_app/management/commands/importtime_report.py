@@ -0,0 +1,64 @@
+import os
+import re
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+# Runs in a fresh interpreter so nothing is already cached in sys.modules
+PROBE = '''
+import sys, time
+started = time.perf_counter()
+import django
+django.setup()
+from importlib import import_module
+for name in sys.argv[1:]:
+    import_module(name)
+print(f"total_ms={(time.perf_counter() - started) * 1000:.1f}")
+'''
+
+
+class Command(BaseCommand):
+    help = 'Report per-module import cost of a cold start (python -X importtime)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('modules', nargs='*', help='Modules to import after django.setup() (default: the URLconf)')
+        parser.add_argument('--top', type=int, default=30, help='Number of modules to show')
+        parser.add_argument('--sort', choices=['cumulative', 'self'], default='cumulative', help='Sort by cumulative or self time')
+        parser.add_argument('--filter', help='Only modules whose name starts with this prefix (e.g. sec_app)')
+        parser.add_argument('--min-ms', type=float, default=0.0, help='Hide modules cheaper than this')
+
+    def handle(self, *args, **options):
+        modules = options['modules'] or [settings.ROOT_URLCONF]
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'backend.settings'))
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', PROBE, *modules],
+            cwd=str(settings.BASE_DIR),
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(f'Import probe failed:\n{result.stderr[-2000:]}')
+
+        rows = []
+        for line in result.stderr.splitlines():
+            match = IMPORTTIME_LINE.match(line)
+            if match:
+                self_us, cumulative_us, indent, name = match.groups()
+                rows.append((name, int(self_us) / 1000, int(cumulative_us) / 1000, len(indent) // 2))
+
+        total = next((line.split('=', 1)[1] for line in result.stdout.splitlines() if line.startswith('total_ms=')), '?')
+        key = 2 if options['sort'] == 'cumulative' else 1
+        if options['filter']:
+            rows = [row for row in rows if row[0].startswith(options['filter'])]
+        rows = [row for row in rows if row[key] >= options['min_ms']]
+        rows.sort(key=lambda row: -row[key])
+
+        self.stdout.write(f"Cold import of {', '.join(modules)}: {total} ms total, {len(rows)} modules")
+        self.stdout.write(f"{'cumulative ms':>14} {'self ms':>9}  module")
+        for name, self_ms, cumulative_ms, depth in rows[:options['top']]:
+            self.stdout.write(f'{cumulative_ms:>14.1f} {self_ms:>9.1f}  {name}')
@@ -0,0 +1,197 @@
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from sec_app.ingest import (
+    DATA_FINANCIALS_PATHS,
+    LOADERS,
+    PARSE_EXECUTORS,
+    add_journal_arguments,
+    add_manifest_arguments,
+    add_year_arguments,
+    FlushError,
+    PARSERS,
+    MetricWriter,
+    IngestJournal,
+    IngestManifest,
+    MultiplesWriter,
+    ensure_companies,
+    fetch_sec_company_names,
+    find_data_financials_dir,
+    parse_executor,
+    refresh_and_finish,
+    report_unwritten,
+    scan_data_financials,
+    select_changed,
+    year_range,
+)
+
+
+class Command(BaseCommand):
+    help = 'Load every data_financials CSV (statements, master financials, valuation summaries, multiples) in one pass'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', nargs='+', choices=list(PARSERS), help='Only these file kinds (default: all)')
+        parser.add_argument('--tickers', nargs='+', help='Only these tickers (space or comma separated)')
+        parser.add_argument('--workers', type=int, default=12, help='Number of parallel workers for CSV parsing')
+        parser.add_argument('--executor', choices=PARSE_EXECUTORS, default='processes', help='Parse CSVs in worker processes (scales with cores) or threads')
+        parser.add_argument('--db-batch-size', type=int, default=5000, help='Database batch size for bulk upserts')
+        parser.add_argument('--flush-rows', type=int, default=100000, help='Metric cells buffered before each database flush')
+        parser.add_argument('--loader', choices=LOADERS, default='auto', help='Metric write path: COPY through a staging table (auto on PostgreSQL) or multi-row INSERT')
+        parser.add_argument('--sec-names', action='store_true', help='Name companies from the SEC ticker list (as stocks_perf does)')
+        parser.add_argument('--skip-derived', action='store_true', help='Do not refresh derived, window and TTM metrics for the loaded periods')
+        parser.add_argument('--keep-window-columns', action='store_true', help='Also store the MasterFinancials LastNY_AVG/CAGR columns as periods')
+        add_year_arguments(parser)
+        add_manifest_arguments(parser)
+        add_journal_arguments(parser)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        root = find_data_financials_dir()
+        if not root:
+            self.stdout.write(self.style.ERROR("Could not find data_financials directory. Tried:"))
+            for path in DATA_FINANCIALS_PATHS:
+                self.stdout.write(self.style.ERROR(f"- {path}"))
+            return
+
+        tickers = None
+        if options['tickers']:
+            tickers = {t.strip().upper() for value in options['tickers'] for t in value.split(',') if t.strip()}
+        folders, files = scan_data_financials(root, options['only'], tickers)
+        if not folders:
+            raise CommandError(f'No company folders found in {root}')
+        self.stdout.write(f"Found {len(files)} files in {len(folders)} company folders under {root}")
+
+        manifest = IngestManifest(root, force=options['force'])
+        changed = select_changed(self, manifest, (f.path for f in files), options['changed_only'])
+        if changed is None:
+            return
+        # A changed ticker reloads all its files, so cells several kinds share still resolve to the last kind
+        changed_tickers = {f.ticker for f in files if f.path in changed}
+        unchanged_tickers = {f.ticker for f in files} - changed_tickers
+        if unchanged_tickers:
+            self.stdout.write(f"Skipping {len(unchanged_tickers)} tickers whose files are unchanged since their last load")
+            files = [f for f in files if f.ticker in changed_tickers]
+            folders = [ticker for ticker in folders if ticker not in unchanged_tickers]
+
+        # Every --checkpoint-every tickers the writers are flushed and the batch journaled;
+        # --resume continues the last unfinished run
+        journal = IngestJournal.open('ingest_financials', options, resume=options['resume'], derived=True)
+        # Pairs written by this run before an interruption, or by runs whose derived refresh never ran
+        dirty_pairs = set(journal.dirty_pairs)
+        if not files and not dirty_pairs:
+            journal.finish()
+            self.stdout.write(self.style.SUCCESS("✅ Nothing to load"))
+            return
+        if journal.resumed:
+            self.stdout.write(f"Resuming run #{journal.run.id}: {len(journal.done_tickers)} tickers already loaded")
+            files = [f for f in files if f.ticker not in journal.done_tickers]
+            folders = [ticker for ticker in folders if ticker not in journal.done_tickers]
+        by_kind = Counter(f.kind for f in files)
+        for kind in PARSERS:
+            if by_kind[kind]:
+                self.stdout.write(f"  {kind}: {by_kind[kind]}")
+
+        names = None
+        if options['sec_names']:
+            try:
+                names = fetch_sec_company_names()
+                self.stdout.write(self.style.SUCCESS(f"Loaded {len(names)} company names from SEC API"))
+            except Exception as e:
+                self.stdout.write(self.style.WARNING(f"Error fetching company names from SEC API: {str(e)}"))
+        company_ids = self.company_ids = ensure_companies(folders, names, options['db_batch_size'])
+
+        writers = {
+            'metrics': MetricWriter(options['db_batch_size'], options['flush_rows'], loader=options['loader'], journal=journal),
+            'multiples': MultiplesWriter(options['db_batch_size']),
+        }
+        loaded = []
+        batch_tickers, batch_files = [], []
+        # A ticker is journaled as done only once every one of its files was read
+        ticker, ticker_failed = None, False
+        parser_options = {'keep_window_columns': options['keep_window_columns'], 'years': year_range(options)}
+        parsed = self.parse_files(files, options['executor'], options['workers'], parser_options)
+        for done, (data_file, result, error) in enumerate(parsed, start=1):
+            # Files come grouped by ticker, so a checkpoint never splits one
+            if data_file.ticker != ticker:
+                if ticker is not None and not ticker_failed:
+                    batch_tickers.append(ticker)
+                if len(batch_tickers) >= options['checkpoint_every']:
+                    self.checkpoint(writers, manifest, journal, batch_tickers, batch_files, options['db_batch_size'])
+                    batch_tickers, batch_files = [], []
+                ticker, ticker_failed = data_file.ticker, False
+            if error is not None:
+                self.stdout.write(self.style.ERROR(f"Error reading {data_file.path}: {str(error)}"))
+                ticker_failed = True
+                continue
+            writer = PARSERS[data_file.kind].writer
+            try:
+                if writer == 'metrics':
+                    writers['metrics'].add(company_ids[data_file.ticker], result)
+                else:
+                    writers[writer].add(data_file.ticker, result)
+            except FlushError as e:
+                # The flush this file set off also lost the files queued before it
+                lost = report_unwritten(self, e, company_ids)
+                batch_tickers = [queued for queued in batch_tickers if queued not in lost]
+                batch_files = [queued for queued in batch_files if queued.ticker not in lost]
+                ticker_failed = True
+                continue
+            loaded.append(data_file.path)
+            batch_files.append(data_file)
+            if done % 500 == 0:
+                self.stdout.write(f"  {done}/{len(files)} files parsed, {writers['metrics'].written:,} metrics written")
+        if ticker is not None and not ticker_failed:
+            batch_tickers.append(ticker)
+        self.checkpoint(writers, manifest, journal, batch_tickers, batch_files, options['db_batch_size'])
+
+        metrics = writers['metrics']
+        dirty_pairs |= metrics.dirty_pairs
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Metrics: {metrics.result}; {writers['multiples'].written:,} multiples rows "
+            f"from {len(loaded)} files in {time.perf_counter() - started:.1f}s"
+        ))
+        if len(loaded) < len(files):
+            self.stdout.write(self.style.WARNING(f"Failed to read {len(files) - len(loaded)} files"))
+
+        refresh_and_finish(self, journal, dirty_pairs, options['skip_derived'], options['db_batch_size'])
+
+    def checkpoint(self, writers, manifest, journal, tickers, files, batch_size):
+        """Write everything buffered for ``tickers``, then journal the batch and record its files.
+
+        Tickers a failed flush lost are left out of both, so the next run loads them again.
+        """
+        lost = set()
+        for writer in writers.values():
+            try:
+                writer.flush()
+            except FlushError as e:
+                lost |= report_unwritten(self, e, self.company_ids)
+        tickers = [ticker for ticker in tickers if ticker not in lost]
+        # Files read for a ticker with an unreadable file are recorded without it
+        paths = [f.path for f in files if f.ticker not in lost]
+        if not paths:
+            return
+        # The batch's dirty pairs are journaled with the manifest entries, so a skipped file never hides a pending refresh
+        with transaction.atomic():
+            batch = journal.checkpoint(tickers, len(paths), writers['metrics'].result)
+            manifest.record(paths, batch_size)
+        self.stdout.write(f"  Checkpoint {batch.number}: {len(tickers)} tickers, {batch.created + batch.updated:,} metrics written in {batch.seconds:.1f}s")
+
+    def parse_files(self, files, executor_kind, workers, parser_options):
+        """Yield ``(file, result, error)`` in scan order, so later kinds win for cells several files share.
+
+        At most a few files per worker are parsed ahead of the writers.
+        """
+        workers = max(1, workers)
+        window = workers * 4
+        with parse_executor(executor_kind, workers) as executor:
+            for start in range(0, len(files), window):
+                batch = [(f, executor.submit(PARSERS[f.kind].func, f.path, **parser_options)) for f in files[start:start + window]]
+                for data_file, future in batch:
+                    try:
+                        yield data_file, future.result(), None
+                    except Exception as e:
+                        yield data_file, None, e
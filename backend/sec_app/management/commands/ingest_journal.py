@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from sec_app.models import IngestRun
+
+
+class Command(BaseCommand):
+    help = 'Show recent loader runs from the ingest journal, with per-batch row counts and throughput'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--command', help='Only runs of this loader (e.g. fetch_financial_data)')
+        parser.add_argument('--run', type=int, help='Show every batch of this run')
+        parser.add_argument('--limit', type=int, default=10, help='Number of runs to list')
+
+    def handle(self, *args, **options):
+        if options['run']:
+            run = IngestRun.objects.filter(id=options['run']).first()
+            if run is None:
+                raise CommandError(f"No ingest run #{options['run']}")
+            self.show_run(run)
+            return
+
+        runs = IngestRun.objects.all()
+        if options['command']:
+            runs = runs.filter(command=options['command'])
+        runs = list(runs.order_by('-id')[:options['limit']])
+        if not runs:
+            self.stdout.write('No ingest runs recorded')
+            return
+
+        self.stdout.write(f"{'run':>5} {'command':<26} {'status':<9} {'started':<20} {'batches':>7} {'tickers':>8} {'rows':>12} {'seconds':>9}")
+        for run in runs:
+            batches = list(run.batches.all())
+            rows = sum(b.created + b.updated + b.unchanged for b in batches)
+            self.stdout.write(
+                f"{run.id:>5} {run.command:<26} {run.status:<9} {run.created_at:%Y-%m-%d %H:%M:%S}  "
+                f"{len(batches):>7} {sum(len(b.tickers) for b in batches):>8} {rows:>12,} {sum(b.seconds for b in batches):>9.1f}"
+            )
+
+    def show_run(self, run):
+        self.stdout.write(f"Run #{run.id}: {run.command} ({run.status}), started {run.created_at:%Y-%m-%d %H:%M:%S}")
+        if run.finished_at:
+            self.stdout.write(f"Finished {run.finished_at:%Y-%m-%d %H:%M:%S}")
+        self.stdout.write(f"{'batch':>5} {'tickers':>8} {'files':>6} {'created':>10} {'updated':>10} {'unchanged':>10} {'seconds':>8} {'rows/sec':>10}")
+        for batch in run.batches.all():
+            rate = batch.rows_per_second
+            rate_text = f"{rate:,.0f}" if rate is not None else '-'
+            self.stdout.write(
+                f"{batch.number:>5} {len(batch.tickers):>8} {batch.files:>6} {batch.created:>10,} {batch.updated:>10,} "
+                f"{batch.unchanged:>10,} {batch.seconds:>8.2f} {rate_text:>10}"
+            )
@@ -1,15 +1,38 @@
-import csv
 import os
-from datetime import date
 from django.core.management.base import BaseCommand
 from django.db import transaction
-from sec_app.models import Company, FinancialPeriod, FinancialMetric
+from sec_app.ingest import (
+    FlushError,
+    IngestJournal,
+    IngestManifest,
+    MetricWriter,
+    add_journal_arguments,
+    add_manifest_arguments,
+    add_year_arguments,
+    ensure_companies,
+    parse_cash_flow,
+    refresh_and_finish,
+    report_unwritten,
+    select_changed,
+    year_range,
+)
 
 
 class Command(BaseCommand):
     help = 'Load cash flow data from CSV files into the database'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--db-batch-size', type=int, default=5000, help='Database batch size for bulk upserts')
+        parser.add_argument('--flush-rows', type=int, default=100000, help='Metric cells buffered before each database flush')
+        parser.add_argument('--skip-derived', action='store_true', help='Do not refresh derived, window and TTM metrics for the loaded periods')
+        add_year_arguments(parser)
+        add_manifest_arguments(parser)
+        add_journal_arguments(parser)
+
     def handle(self, *args, **options):
+        # Cells are upserted in bulk; the writer also records the (company_id, period_id) pairs
+        # written by this run, whose derived metrics are refreshed at the end
+        self.writer = MetricWriter(options['db_batch_size'], options['flush_rows'])
         # Find data_financials directory
         current_dir = os.path.dirname(os.path.abspath(__file__))
         project_root = os.path.abspath(os.path.join(current_dir, '..', '..', '..', '..'))
@@ -45,6 +68,7 @@ class Command(BaseCommand):
         loaded_count = 0
         error_count = 0
         
+        files = []
         for ticker in company_folders:
             # Look for {TICKER}_CashFlowExpanded.csv in the company folder
             csv_filename = f'{ticker}_CashFlowExpanded.csv'
@@ -53,111 +77,85 @@ class Command(BaseCommand):
             if not os.path.exists(file_path):
                 self.stdout.write(self.style.WARNING(f'CashFlowExpanded.csv not found for {ticker}, skipping'))
                 continue
-            
+            files.append((ticker, file_path))
+        
+        # Skip files unchanged since their last load
+        manifest = IngestManifest(data_financials_dir, force=options['force'])
+        changed = select_changed(self, manifest, (file_path for _, file_path in files), options['changed_only'])
+        if changed is None:
+            return
+        if len(changed) < len(files):
+            self.stdout.write(f'Skipping {len(files) - len(changed)} files unchanged since their last load')
+            files = [(ticker, file_path) for ticker, file_path in files if file_path in changed]
+
+        # Every --checkpoint-every files the writer is flushed and the batch journaled;
+        # --resume continues the last unfinished run
+        journal = IngestJournal.open('load_cash_flows', options, resume=options['resume'], derived=True)
+        self.writer.journal = journal
+        if journal.resumed:
+            self.stdout.write(f'Resuming run #{journal.run.id}: {len(journal.done_tickers)} tickers already loaded')
+            files = [(ticker, file_path) for ticker, file_path in files if ticker.upper() not in journal.done_tickers]
+
+        # Fetch (or create) every company once instead of once per file
+        self.company_ids = ensure_companies(ticker for ticker, _ in files)
+        
+        years = year_range(options)
+        # (ticker, file_path) pairs queued since the last checkpoint
+        batch = []
+        for ticker, file_path in files:
+            if len(batch) >= options['checkpoint_every']:
+                written = self.checkpoint(manifest, journal, batch, options['db_batch_size'])
+                loaded_count += len(written)
+                error_count += len(batch) - len(written)
+                batch = []
             try:
-                with transaction.atomic():
-                    self.load_cash_flow(file_path, ticker)
-                action = 'Loaded'
-                self.stdout.write(self.style.SUCCESS(f'{action} {ticker.upper()}'))
-                loaded_count += 1
-                
+                count = self.load_cash_flow(file_path, ticker, years)
+                self.stdout.write(self.style.SUCCESS(f'Loaded {ticker.upper()}: {count} metrics'))
+                batch.append((ticker.upper(), file_path))
+
+            except FlushError as e:
+                # The flush this file set off also lost the files queued before it
+                lost = report_unwritten(self, e, self.company_ids)
+                kept = [(queued, path) for queued, path in batch if queued not in lost]
+                error_count += len(batch) + 1 - len(kept)
+                batch = kept
             except Exception as e:
                 self.stdout.write(self.style.ERROR(f'Error loading {ticker}: {str(e)}'))
                 error_count += 1
         
+        written = self.checkpoint(manifest, journal, batch, options['db_batch_size'])
+        loaded_count += len(written)
+        error_count += len(batch) - len(written)
+        self.dirty_pairs = self.writer.dirty_pairs | journal.dirty_pairs
+        self.stdout.write(self.style.SUCCESS(f'Metrics: {self.writer.result}'))
         self.stdout.write(self.style.SUCCESS(f'\nSuccessfully loaded {loaded_count} companies'))
         if error_count > 0:
             self.stdout.write(self.style.WARNING(f'Failed to load {error_count} companies'))
-    
-    def load_cash_flow(self, file_path, ticker):
-        """Load cash flow data from CSV file into database"""
-        # Get or create Company
-        company, created = Company.objects.get_or_create(
-            ticker=ticker.upper(),
-            defaults={'name': ticker.upper()}  # Will be updated if company exists with proper name
-        )
-        
-        # Parse CSV file
-        with open(file_path, 'r', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            
-            # Read first row to get years
-            header_row = next(reader)
-            years = []
-            for col in header_row[1:]:  # Skip first empty column
-                if col and col.strip():
-                    try:
-                        year = int(col.strip())
-                        years.append(year)
-                    except ValueError:
-                        continue
-            
-            if not years:
-                raise ValueError(f"No valid years found in CSV file for {ticker}")
-            
-            # Read metric rows
-            metrics_created = 0
-            metrics_updated = 0
-            
-            for row in reader:
-                if not row or len(row) < 2:
-                    continue
-                
-                metric_name = row[0].strip() if row[0] else None
-                if not metric_name:
-                    continue
-                
-                # Skip empty metric names
-                if metric_name == '':
-                    continue
-                
-                # Normalize metric name (remove spaces, keep as is for now)
-                metric_name = metric_name.strip()
-                
-                # Process each year's value
-                for idx, year in enumerate(years):
-                    if idx + 1 >= len(row):
-                        continue
-                    
-                    value_str = row[idx + 1].strip() if len(row) > idx + 1 else ''
-                    
-                    # Skip empty values
-                    if not value_str or value_str == '':
-                        continue
-                    
-                    # Parse value
-                    try:
-                        value = float(value_str)
-                    except ValueError:
-                        # Skip non-numeric values
-                        continue
-                    
-                    # Get or create FinancialPeriod
-                    period, _ = FinancialPeriod.objects.get_or_create(
-                        company=company,
-                        period=str(year),
-                        defaults={
-                            'period_type': 'annual',
-                            'start_date': date(year, 1, 1),
-                            'end_date': date(year, 12, 31)
-                        }
-                    )
-                    
-                    # Create or update FinancialMetric
-                    metric, created = FinancialMetric.objects.update_or_create(
-                        company=company,
-                        period=period,
-                        metric_name=metric_name,
-                        defaults={
-                            'value': value,
-                            'unit': 'USD'
-                        }
-                    )
-                    
-                    if created:
-                        metrics_created += 1
-                    else:
-                        metrics_updated += 1
-            
-            self.stdout.write(f'  Created {metrics_created} metrics, updated {metrics_updated} metrics for {ticker}')
 
+        refresh_and_finish(self, journal, self.dirty_pairs, options['skip_derived'], options['db_batch_size'])
+
+    def checkpoint(self, manifest, journal, batch, batch_size):
+        """Write everything queued for ``batch``, then journal it and record its files.
+
+        Returns the ``(ticker, file_path)`` pairs written; tickers a failed flush lost are left out.
+        """
+        try:
+            self.writer.flush()
+        except FlushError as e:
+            lost = report_unwritten(self, e, self.company_ids)
+            batch = [(ticker, path) for ticker, path in batch if ticker not in lost]
+        if not batch:
+            return batch
+        # The batch's dirty pairs are journaled with the manifest entries, so a skipped file never hides a pending refresh
+        with transaction.atomic():
+            journal.checkpoint([ticker for ticker, _ in batch], len(batch), self.writer.result)
+            manifest.record([path for _, path in batch], batch_size)
+        return batch
+    
+    def load_cash_flow(self, file_path, ticker, years=None):
+        """Parse cash flow data from a CSV file and queue it for the bulk upsert"""
+        rows = parse_cash_flow(file_path, years=years)
+        if not rows:
+            raise ValueError(f"No valid years or quarters found in CSV file for {ticker}")
+        self.writer.add(self.company_ids[ticker.upper()], rows)
+        return len(rows)
@@ -2,12 +2,18 @@ import csv
 import os
 from django.core.management.base import BaseCommand
 from django.conf import settings
+from django.db import transaction
+from sec_app.ingest import IngestJournal, IngestManifest, UpsertResult, add_journal_arguments, add_manifest_arguments
 from sec_app.models import CompanyMultiples
 
 
 class Command(BaseCommand):
     help = 'Load multiples data from CSV files into the database'
 
+    def add_arguments(self, parser):
+        add_manifest_arguments(parser)
+        add_journal_arguments(parser)
+
     def handle(self, *args, **options):
         # Find data_financials directory (same logic as fetch_financial_data.py)
         current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -42,7 +48,21 @@ class Command(BaseCommand):
         self.stdout.write(self.style.SUCCESS(f'Found {len(company_folders)} company folders'))
         
         loaded_count = 0
+        unchanged_count = 0
+        changed_count = 0
+        loaded_paths = []
+        manifest = IngestManifest(data_financials_dir, force=options['force'])
+        # Every --checkpoint-every tickers the batch is journaled; --resume continues the last unfinished run
+        journal = None
+        if not options['changed_only']:
+            journal = IngestJournal.open('load_multiples_data', options, resume=options['resume'])
+            if journal.resumed:
+                self.stdout.write(f'Resuming run #{journal.run.id}: {len(journal.done_tickers)} tickers already loaded')
+        self.result = UpsertResult()
+        batch_tickers = []
         for ticker in company_folders:
+            if journal is not None and ticker.upper() in journal.done_tickers:
+                continue
             # Look for {TICKER}_MultiplesTable.csv in the company folder
             csv_filename = f'{ticker}_MultiplesTable.csv'
             file_path = os.path.join(data_financials_dir, ticker, csv_filename)
@@ -51,6 +71,18 @@ class Command(BaseCommand):
                 self.stdout.write(self.style.WARNING(f'MultiplesTable.csv not found for {ticker}, skipping'))
                 continue
             
+            # Skip files unchanged since their last load
+            if not manifest.changed(file_path):
+                unchanged_count += 1
+                continue
+            if options['changed_only']:
+                self.stdout.write(manifest.key(file_path))
+                changed_count += 1
+                continue
+            
+            if len(batch_tickers) >= options['checkpoint_every']:
+                self.checkpoint(manifest, journal, batch_tickers, loaded_paths)
+                batch_tickers, loaded_paths = [], []
             try:
                 data = self.parse_csv(file_path, ticker)
                 
@@ -60,14 +92,36 @@ class Command(BaseCommand):
                     defaults=data
                 )
                 
+                if created:
+                    self.result.created += 1
+                else:
+                    self.result.updated += 1
                 action = 'Created' if created else 'Updated'
                 self.stdout.write(self.style.SUCCESS(f'{action} {ticker.upper()}'))
                 loaded_count += 1
+                loaded_paths.append(file_path)
+                batch_tickers.append(ticker.upper())
                 
             except Exception as e:
                 self.stdout.write(self.style.ERROR(f'Error loading {ticker}: {str(e)}'))
         
+        if options['changed_only']:
+            self.stdout.write(self.style.SUCCESS(f'{changed_count} of {changed_count + unchanged_count} files changed since their last load'))
+            return
+        self.checkpoint(manifest, journal, batch_tickers, loaded_paths)
+        
         self.stdout.write(self.style.SUCCESS(f'\nSuccessfully loaded {loaded_count} companies'))
+        if unchanged_count > 0:
+            self.stdout.write(f'Skipped {unchanged_count} files unchanged since their last load')
+        journal.finish()
+
+    def checkpoint(self, manifest, journal, tickers, paths):
+        """Journal the batch written for ``tickers`` and record its files"""
+        if not tickers:
+            return
+        with transaction.atomic():
+            journal.checkpoint(tickers, len(paths), self.result)
+            manifest.record(paths)
     
     def parse_csv(self, file_path, ticker):
         """Parse CSV file and return structured data"""
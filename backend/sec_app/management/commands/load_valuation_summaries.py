@@ -3,12 +3,17 @@ import os
 from datetime import date
 from django.core.management.base import BaseCommand
 from django.db import transaction
+from sec_app.ingest import IngestJournal, IngestManifest, UpsertResult, add_journal_arguments, add_manifest_arguments
 from sec_app.models import Company, FinancialPeriod, FinancialMetric
 
 
 class Command(BaseCommand):
     help = 'Load EquityValue from ValuationSummary CSV files into the database'
 
+    def add_arguments(self, parser):
+        add_manifest_arguments(parser)
+        add_journal_arguments(parser)
+
     def handle(self, *args, **options):
         # Find data_financials directory
         current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -45,8 +50,22 @@ class Command(BaseCommand):
         loaded_count = 0
         error_count = 0
         skipped_count = 0
+        unchanged_count = 0
+        changed_count = 0
+        loaded_paths = []
+        manifest = IngestManifest(data_financials_dir, force=options['force'])
+        # Every --checkpoint-every tickers the batch is journaled; --resume continues the last unfinished run
+        journal = None
+        if not options['changed_only']:
+            journal = IngestJournal.open('load_valuation_summaries', options, resume=options['resume'])
+            if journal.resumed:
+                self.stdout.write(f'Resuming run #{journal.run.id}: {len(journal.done_tickers)} tickers already loaded')
+        self.result = UpsertResult()
+        batch_tickers = []
         
         for ticker in company_folders:
+            if journal is not None and ticker.upper() in journal.done_tickers:
+                continue
             # Look for {TICKER}_ValuationSummary.csv in the company folder
             csv_filename = f'{ticker}_ValuationSummary.csv'
             file_path = os.path.join(data_financials_dir, ticker, csv_filename)
@@ -56,6 +75,18 @@ class Command(BaseCommand):
                 skipped_count += 1
                 continue
             
+            # Skip files unchanged since their last load
+            if not manifest.changed(file_path):
+                unchanged_count += 1
+                continue
+            if options['changed_only']:
+                self.stdout.write(manifest.key(file_path))
+                changed_count += 1
+                continue
+            
+            if len(batch_tickers) >= options['checkpoint_every']:
+                self.checkpoint(manifest, journal, batch_tickers, loaded_paths)
+                batch_tickers, loaded_paths = [], []
             try:
                 with transaction.atomic():
                     equity_value = self.load_valuation_summary(file_path, ticker)
@@ -65,16 +96,34 @@ class Command(BaseCommand):
                     else:
                         self.stdout.write(self.style.WARNING(f'EquityValue not found in {ticker}, skipping'))
                         skipped_count += 1
+                loaded_paths.append(file_path)
+                batch_tickers.append(ticker.upper())
                 
             except Exception as e:
                 self.stdout.write(self.style.ERROR(f'Error loading {ticker}: {str(e)}'))
                 error_count += 1
         
+        if options['changed_only']:
+            self.stdout.write(self.style.SUCCESS(f'{changed_count} of {changed_count + unchanged_count} files changed since their last load'))
+            return
+        self.checkpoint(manifest, journal, batch_tickers, loaded_paths)
+        
         self.stdout.write(self.style.SUCCESS(f'\nSuccessfully loaded {loaded_count} companies'))
+        if unchanged_count > 0:
+            self.stdout.write(f'Skipped {unchanged_count} files unchanged since their last load')
         if skipped_count > 0:
             self.stdout.write(self.style.WARNING(f'Skipped {skipped_count} companies (no EquityValue found)'))
         if error_count > 0:
             self.stdout.write(self.style.ERROR(f'Failed to load {error_count} companies'))
+        journal.finish()
+
+    def checkpoint(self, manifest, journal, tickers, paths):
+        """Journal the batch written for ``tickers`` and record its files"""
+        if not tickers:
+            return
+        with transaction.atomic():
+            journal.checkpoint(tickers, len(paths), self.result)
+            manifest.record(paths)
     
     def load_valuation_summary(self, file_path, ticker):
         """Load EquityValue from ValuationSummary CSV file into database"""
@@ -126,7 +175,7 @@ class Command(BaseCommand):
                     )
                     
                     # Create or update FinancialMetric
-                    FinancialMetric.objects.update_or_create(
+                    _, created = FinancialMetric.objects.update_or_create(
                         company=company,
                         period=period,
                         metric_name='EquityValue',
@@ -136,6 +185,11 @@ class Command(BaseCommand):
                         }
                     )
                     
+                    if created:
+                        self.result.created += 1
+                    else:
+                        self.result.updated += 1
+                    self.result.changed_pairs.add((company.id, period.id))
                     break  # Found EquityValue, no need to continue
         
         return equity_value
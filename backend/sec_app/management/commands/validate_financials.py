@@ -0,0 +1,58 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sec_app.models import Company
+from sec_app_2.validation import CHECKS, validate_universe
+
+
+class Command(BaseCommand):
+    help = 'Reconcile PPE roll-forwards, the balance sheet identity and invested capital across every company and year'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--checks', nargs='+', choices=list(CHECKS), help='Only these checks (default: all)')
+        parser.add_argument('--tickers', nargs='+', help='Only these tickers (space or comma separated)')
+        parser.add_argument('--period-type', default='annual', choices=['annual', 'quarterly'], help='Periods to check')
+        parser.add_argument('--tolerance', type=float, default=0.5, help='Relative tolerance, in percent of the check scale')
+        parser.add_argument('--absolute-tolerance', type=float, default=1.0, help='Residuals at or below this never fail')
+        parser.add_argument('--top', type=int, default=10, help='Worst offenders to list per check')
+        parser.add_argument('--output', help='Write the full report as JSON to this file')
+        parser.add_argument('--fail-on-breaks', action='store_true', help='Exit with an error when any check fails')
+
+    def handle(self, *args, **options):
+        company_ids = None
+        if options['tickers']:
+            tickers = {t.strip().upper() for arg in options['tickers'] for t in arg.split(',') if t.strip()}
+            company_ids = list(Company.objects.filter(ticker__in=tickers).values_list('id', flat=True))
+            if not company_ids:
+                raise CommandError(f"No companies found for tickers: {', '.join(sorted(tickers))}")
+
+        report = validate_universe(
+            checks=options['checks'],
+            period_type=options['period_type'],
+            company_ids=company_ids,
+            tolerance=options['tolerance'] / 100,
+            absolute_tolerance=options['absolute_tolerance'],
+            top=options['top'],
+        )
+
+        self.stdout.write(
+            f"Checked {report['companies']} companies in {report['load_seconds'] + report['check_seconds']:.2f}s "
+            f"(load {report['load_seconds']:.2f}s, checks {report['check_seconds']:.3f}s)"
+        )
+        breaks = 0
+        for name, result in report['checks'].items():
+            breaks += result['failed']
+            style = self.style.ERROR if result['failed'] else self.style.SUCCESS
+            self.stdout.write(style(f"{name}: {result['failed']} of {result['checked']} failed, {result['skipped']} skipped"))
+            for row in result['worst']:
+                relative = f"{row['relative'] * 100:.2f}%" if row['relative'] is not None else 'n/a'
+                self.stdout.write(f"  {row['ticker'] or row['company_id']:<10} {row['year']}  residual {row['residual']:>18,.0f}  ({relative})")
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+
+        if options['fail_on_breaks'] and breaks:
+            raise CommandError(f'{breaks} reconciliation breaks')
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sec_app', '0006_chatbatch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DerivedMetric',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('statement', models.CharField(max_length=50)),
+                ('metric_name', models.CharField(max_length=100)),
+                ('value', models.FloatField()),
+                (
+                    'company',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to='sec_app.company',
+                    ),
+                ),
+                (
+                    'period',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to='sec_app.financialperiod',
+                    ),
+                ),
+            ],
+            options={
+                'ordering': ['period', 'statement', 'metric_name'],
+                'indexes': [
+                    models.Index(
+                        fields=['company', 'statement', 'metric_name'],
+                        name='sec_app_der_company_ca3af1_idx',
+                    )
+                ],
+                'unique_together': {('company', 'period', 'statement', 'metric_name')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sec_app', '0007_derivedmetric'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='derivedmetric',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sec_app', '0008_derivedmetric_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WindowMetric',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('metric_name', models.CharField(max_length=100)),
+                ('window', models.PositiveSmallIntegerField()),
+                (
+                    'kind',
+                    models.CharField(
+                        choices=[
+                            ('AVG', 'Average'),
+                            ('CAGR', 'Compound annual growth rate'),
+                        ],
+                        max_length=4,
+                    ),
+                ),
+                ('end_year', models.IntegerField()),
+                ('value', models.FloatField()),
+                (
+                    'company',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to='sec_app.company',
+                    ),
+                ),
+            ],
+            options={
+                'ordering': ['company', 'metric_name', 'kind', 'window'],
+                'indexes': [
+                    models.Index(
+                        fields=['company', 'metric_name'],
+                        name='sec_app_win_company_ca472d_idx',
+                    )
+                ],
+                'unique_together': {('company', 'metric_name', 'window', 'kind')},
+            },
+        ),
+    ]
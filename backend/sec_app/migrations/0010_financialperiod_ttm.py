@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sec_app', '0009_windowmetric'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='financialperiod',
+            name='period_type',
+            field=models.CharField(
+                choices=[
+                    ('annual', 'Annual'),
+                    ('quarterly', 'Quarterly'),
+                    ('ttm', 'Trailing twelve months'),
+                ],
+                default='annual',
+                max_length=10,
+            ),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sec_app', '0010_financialperiod_ttm'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestedFile',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('path', models.CharField(max_length=255, unique=True)),
+                ('ticker', models.CharField(db_index=True, max_length=10)),
+                ('size', models.BigIntegerField()),
+                ('mtime', models.FloatField()),
+                ('sha256', models.CharField(max_length=64)),
+            ],
+            options={
+                'ordering': ['path'],
+            },
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sec_app', '0011_ingestedfile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestRun',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('command', models.CharField(db_index=True, max_length=100)),
+                ('options', models.JSONField(default=dict)),
+                (
+                    'status',
+                    models.CharField(
+                        choices=[('running', 'Running'), ('finished', 'Finished')],
+                        default='running',
+                        max_length=10,
+                    ),
+                ),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='IngestBatch',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('number', models.PositiveIntegerField()),
+                ('tickers', models.JSONField(default=list)),
+                ('files', models.PositiveIntegerField(default=0)),
+                ('created', models.PositiveIntegerField(default=0)),
+                ('updated', models.PositiveIntegerField(default=0)),
+                ('unchanged', models.PositiveIntegerField(default=0)),
+                ('dirty_pairs', models.JSONField(default=list)),
+                ('seconds', models.FloatField()),
+                (
+                    'run',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='batches',
+                        to='sec_app.ingestrun',
+                    ),
+                ),
+            ],
+            options={
+                'ordering': ['run', 'number'],
+                'unique_together': {('run', 'number')},
+            },
+        ),
+    ]
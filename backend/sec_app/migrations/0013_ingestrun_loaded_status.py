@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sec_app', '0012_ingest_journal'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ingestrun',
+            name='status',
+            field=models.CharField(
+                choices=[
+                    ('running', 'Running'),
+                    ('loaded', 'Loaded, derived refresh pending'),
+                    ('finished', 'Finished'),
+                ],
+                default='running',
+                max_length=10,
+            ),
+        ),
+    ]
@@ -3,6 +3,10 @@ from .analysis import SentimentAnalysis
 from .period import FinancialPeriod
 from .filling import FilingDocument
 from .metric import FinancialMetric
+from .derived_metric import DerivedMetric
+from .window_metric import WindowMetric
+from .ingested_file import IngestedFile
+from .ingest_journal import IngestBatch, IngestRun
 from .chatlog import ChatLog
 from .query import Query
 from .contact import Contact
@@ -21,6 +25,11 @@ __all__ = [
     'FinancialPeriod',
     'FilingDocument',
     'FinancialMetric',
+    'DerivedMetric',
+    'WindowMetric',
+    'IngestedFile',
+    'IngestRun',
+    'IngestBatch',
     'ChatLog',
     'Query',
     'Contact',
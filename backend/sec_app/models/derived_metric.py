@@ -0,0 +1,25 @@
+from django.db import models
+from backend.basemodel import TimeBaseModel
+from .company import Company
+from .period import FinancialPeriod
+
+
+class DerivedMetric(TimeBaseModel):
+    """A calculator output (NOPAT, ROIC, FCF, common-size, ...) for one company period."""
+
+    company = models.ForeignKey(Company, on_delete=models.CASCADE)
+    period = models.ForeignKey(FinancialPeriod, on_delete=models.CASCADE)
+    statement = models.CharField(max_length=50)  # e.g., "nopat", "free_cash_flow"
+    metric_name = models.CharField(max_length=100)
+    value = models.FloatField()
+    version = models.PositiveIntegerField(default=1)  # calculator version that produced the value
+
+    def __str__(self):
+        return f"{self.company_id} - {self.statement}.{self.metric_name}: {self.value}"
+
+    class Meta:
+        ordering = ['period', 'statement', 'metric_name']
+        unique_together = ('company', 'period', 'statement', 'metric_name')
+        indexes = [
+            models.Index(fields=['company', 'statement', 'metric_name']),
+        ]
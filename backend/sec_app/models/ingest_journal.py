@@ -0,0 +1,49 @@
+from django.db import models
+from backend.basemodel import TimeBaseModel
+
+
+class IngestRun(TimeBaseModel):
+    """One run of a data_financials loader, checkpointed batch by batch so it can be resumed."""
+
+    STATUSES = [
+        ('running', 'Running'),
+        ('loaded', 'Loaded, derived refresh pending'),
+        ('finished', 'Finished'),
+    ]
+
+    command = models.CharField(max_length=100, db_index=True)  # e.g. "fetch_financial_data"
+    options = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUSES, default='running')
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.command} #{self.id} ({self.status})"
+
+    class Meta:
+        ordering = ['-created_at']
+
+
+class IngestBatch(TimeBaseModel):
+    """A written batch of a loader run: the tickers it covered, its row counts and timing."""
+
+    run = models.ForeignKey(IngestRun, on_delete=models.CASCADE, related_name='batches')
+    number = models.PositiveIntegerField()
+    tickers = models.JSONField(default=list)
+    files = models.PositiveIntegerField(default=0)
+    created = models.PositiveIntegerField(default=0)
+    updated = models.PositiveIntegerField(default=0)
+    unchanged = models.PositiveIntegerField(default=0)
+    dirty_pairs = models.JSONField(default=list)  # [company_id, period_id] pairs written, for the derived refresh
+    seconds = models.FloatField()
+
+    @property
+    def rows_per_second(self):
+        rows = self.created + self.updated + self.unchanged
+        return rows / self.seconds if self.seconds else None
+
+    def __str__(self):
+        return f"{self.run_id} batch {self.number}: {len(self.tickers)} tickers in {self.seconds:.1f}s"
+
+    class Meta:
+        ordering = ['run', 'number']
+        unique_together = ('run', 'number')
@@ -0,0 +1,18 @@
+from django.db import models
+from backend.basemodel import TimeBaseModel
+
+
+class IngestedFile(TimeBaseModel):
+    """A data_financials CSV as of its last successful load, so unchanged files can be skipped."""
+
+    path = models.CharField(max_length=255, unique=True)  # relative to data_financials, e.g. "AAPL/AAPL_MasterFinancials.csv"
+    ticker = models.CharField(max_length=10, db_index=True)
+    size = models.BigIntegerField()
+    mtime = models.FloatField()
+    sha256 = models.CharField(max_length=64)
+
+    def __str__(self):
+        return f"{self.path} ({self.sha256[:12]})"
+
+    class Meta:
+        ordering = ['path']
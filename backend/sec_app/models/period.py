@@ -6,6 +6,7 @@ class FinancialPeriod(TimeBaseModel):
     PERIOD_TYPES = [
         ('annual', 'Annual'),
         ('quarterly', 'Quarterly'),
+        ('ttm', 'Trailing twelve months'),
     ]
 
     company = models.ForeignKey(Company, on_delete=models.CASCADE)
@@ -0,0 +1,29 @@
+from django.db import models
+from backend.basemodel import TimeBaseModel
+from .company import Company
+
+
+class WindowMetric(TimeBaseModel):
+    """A trailing N-year average or CAGR of one raw metric, as of the company's latest year."""
+
+    KINDS = [
+        ('AVG', 'Average'),
+        ('CAGR', 'Compound annual growth rate'),
+    ]
+
+    company = models.ForeignKey(Company, on_delete=models.CASCADE)
+    metric_name = models.CharField(max_length=100)
+    window = models.PositiveSmallIntegerField()  # years, e.g. 5 for Last5Y
+    kind = models.CharField(max_length=4, choices=KINDS)
+    end_year = models.IntegerField()  # last year of the window
+    value = models.FloatField()
+
+    def __str__(self):
+        return f"{self.company_id} - {self.metric_name} Last{self.window}Y_{self.kind}: {self.value}"
+
+    class Meta:
+        ordering = ['company', 'metric_name', 'kind', 'window']
+        unique_together = ('company', 'metric_name', 'window', 'kind')
+        indexes = [
+            models.Index(fields=['company', 'metric_name']),
+        ]
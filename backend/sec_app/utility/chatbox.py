@@ -4,7 +4,6 @@ import logging
 from sec_app.models.metric import FinancialMetric  
 from sec_app.models.period import FinancialPeriod
 from django.db import models
-import feedparser 
 logger = logging.getLogger(__name__)
 
 def normalize_metric_name(metric: str) -> str:
@@ -14,6 +13,8 @@ def normalize_metric_name(metric: str) -> str:
 def fetch_google_news(company):
     query = company.replace(" ", "+")
     rss_url = f"https://news.google.com/rss/search?q={query}+stock"
+    import feedparser  # deferred: only the news lookup needs it
+
     feed = feedparser.parse(rss_url)
 
     if not feed.entries:
@@ -21,7 +21,6 @@ from django.http import JsonResponse
 import logging
 import requests
 from django.conf import settings
-import pandas as pd
 import os
 import math
 from .utility.chatbox import answer_question
@@ -44,11 +43,18 @@ from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
 from datetime import datetime
 from django.utils import timezone
-import stripe
-stripe.api_key = settings.STRIPE_SECRET_KEY
 from accounts.models import User
 from .models.stripe_event import StripeEvent
 from datetime import timedelta
+
+
+def get_stripe():
+    # Imported on first use: the SDK is slow to import and only the billing views need it
+    import stripe
+    stripe.api_key = settings.STRIPE_SECRET_KEY
+    return stripe
+
+
 #stripe webhook
 @csrf_exempt
 def create_checkout_session(request):
@@ -107,7 +113,7 @@ def create_checkout_session(request):
         if client_reference_id:
             session_params['client_reference_id'] = client_reference_id
 
-        session = stripe.checkout.Session.create(**session_params)
+        session = get_stripe().checkout.Session.create(**session_params)
         
         return JsonResponse({'sessionId': session.id})
 
@@ -130,6 +136,7 @@ def stripe_webhook(request):
         # Misconfiguration safeguard
         return HttpResponse(status=500)
 
+    stripe = get_stripe()
     try:
         event = stripe.Webhook.construct_event(payload, sig_header, webhook_secret)
     except (ValueError, stripe.error.SignatureVerificationError):
@@ -547,7 +554,7 @@ class FinancialMetricViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = FinancialMetric.objects.all()
     serializer_class = FinancialMetricSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
-    filterset_fields = ["company__ticker", "company__name", "metric_name", "period__id"]
+    filterset_fields = ["company__ticker", "company__name", "metric_name", "period__id", "period__period_type"]
     search_fields = ["company__name", "company__ticker", "metric_name"]
 
     def get_queryset(self):
@@ -571,6 +578,8 @@ class BoxPlotDataAPIView(APIView):
 
         if metrics and period:
             try:
+                import pandas as pd
+
                 file_path = os.path.join("sec_app", "data", "stocks_perf_data.xlsx")
                 df = pd.read_excel(file_path)
 
@@ -609,6 +618,7 @@ class BoxPlotDataAPIView(APIView):
                             FinancialMetric.objects.filter(
                                 metric_name__iexact=metric,
                                 period__period__contains=period_str,
+                                period__period_type="annual",
                                 company__ticker__in=industry_companies,
                             )
                             .select_related("company")
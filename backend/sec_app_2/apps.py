@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class App2Config(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "sec_app_2"
+
+    def ready(self):
+        from django.conf import settings
+
+        if getattr(settings, "CALCULATOR_INSTRUMENTATION", False):
+            from .calculators.instrumentation import enable_instrumentation
+
+            enable_instrumentation()
@@ -0,0 +1,206 @@
+"""Micro-benchmarks for the valuation calculators.
+
+``python manage.py benchmark_calculators`` generates synthetic statements
+for N tickers x M years and times, per calculator, the
+``update_*_calculations`` and ``recalculate_*_dependent_fields`` facades,
+plus the full-chain recompute (graph and vectorized), a single-cell graph
+edit and alias normalization.  Results are written as JSON so runs can be
+diffed between commits; ``compare`` flags benchmarks whose median got
+slower than a threshold.
+"""
+
+from importlib import import_module
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import copy
+import logging
+import platform
+import random
+import time
+
+from .calculators.aliases import normalize_dataset
+from .calculators.graph import calculator_graph
+from .calculators.registry import calculator_registry
+from .calculators.valuation_model import INPUT_FIELDS, build_model, recompute_model
+
+# Fields that are rates rather than amounts, with a plausible range
+RATE_FIELDS: Dict[str, Tuple[float, float]] = {
+    'LeasesDiscountRate': (0.03, 0.07),
+    'WeightedAverageCostOfCapital': (0.06, 0.12),
+}
+# Amounts that are as often negative as positive
+SIGNED_FIELDS = {'OtherIncome', 'ForeignCurrencyAdjustment', 'TaxesNonoperating', 'DeferredIncomeTaxes'}
+
+Statements = Dict[str, Dict[int, Dict[str, Any]]]
+
+
+def synthetic_statements(tickers: int, years: int, seed: int = 0, last_year: int = 2024) -> List[Tuple[str, Statements]]:
+    """Raw input statements for ``tickers`` synthetic companies over ``years`` years.
+
+    Each company gets a revenue path (lognormal scale, noisy growth) and a
+    fixed ratio to revenue per field, jittered a few percent per year, so
+    statements are internally consistent enough for every formula to run.
+    """
+    rng = random.Random(seed)
+    axis = list(range(last_year - years + 1, last_year + 1))
+    result = []
+    for n in range(tickers):
+        revenue = rng.lognormvariate(21, 1.5)
+        growth = rng.gauss(0.05, 0.08)
+        ratios = {field_name: rng.uniform(0.005, 0.35) for fields in INPUT_FIELDS.values() for field_name in fields}
+        rates = {field_name: rng.uniform(*bounds) for field_name, bounds in RATE_FIELDS.items()}
+        signs = {field_name: rng.choice((-1, 1)) for field_name in SIGNED_FIELDS}
+        statements: Statements = {}
+        for year in axis:
+            for statement, fields in INPUT_FIELDS.items():
+                row = statements.setdefault(statement, {}).setdefault(year, {})
+                for field_name in fields:
+                    if field_name in rates:
+                        row[field_name] = rates[field_name]
+                    elif field_name == 'Revenue':
+                        row[field_name] = revenue
+                    else:
+                        value = revenue * ratios[field_name] * rng.uniform(0.95, 1.05)
+                        row[field_name] = value * signs.get(field_name, 1)
+            revenue *= 1 + growth + rng.gauss(0, 0.03)
+        result.append((f'SYN{n}', statements))
+    return result
+
+
+def _facades(statement: str) -> Tuple[Callable[..., Any], Callable[..., Any]]:
+    module_name, _, calculate_field = calculator_registry.entries[statement]
+    module = import_module(f'.calculators.{module_name}', __package__)
+    name = calculate_field[len('calculate_'):-len('_field')]
+    return getattr(module, f'update_{name}_calculations'), getattr(module, f'recalculate_{name}_dependent_fields')
+
+
+def _changed_field(statement: str) -> str:
+    """A field the statement's own formulas read, to drive its recalculate facade."""
+    for (node_statement, _), refs in calculator_graph.inputs.items():
+        if node_statement != statement:
+            continue
+        for (source, source_field), _ in refs:
+            if source == statement:
+                return source_field
+    return sorted(calculator_registry.get(statement).calculated_fields)[0]
+
+
+def _time_calls(calls: Iterable[Callable[[], Any]]) -> List[float]:
+    samples = []
+    clock = time.perf_counter
+    for call in calls:
+        started = clock()
+        call()
+        samples.append(clock() - started)
+    return samples
+
+
+def _summary(samples: List[float]) -> Dict[str, Any]:
+    ordered = sorted(samples)
+
+    def percentile(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+    mean = sum(ordered) / len(ordered)
+    return {
+        'samples': len(ordered),
+        'ops_per_sec': 1 / mean if mean else None,
+        'mean_us': mean * 1e6,
+        'p50_us': percentile(50) * 1e6,
+        'p99_us': percentile(99) * 1e6,
+    }
+
+
+def run_benchmarks(tickers: int = 20, years: int = 15, repeat: int = 3, seed: int = 0, only: Optional[str] = None) -> Dict[str, Any]:
+    """Run every benchmark ``repeat`` times over the synthetic universe; return the JSON report."""
+    companies = synthetic_statements(tickers, years, seed)
+    models = [recompute_model(build_model(copy.deepcopy(statements))) for _, statements in companies]
+    year_axis = sorted(models[0]['income_statement']) if models else []
+
+    cases: Dict[str, Callable[[], List[Callable[[], Any]]]] = {}
+    for spec in calculator_graph.specs.values():
+        statement, sources = spec.statement, spec.sources
+        update, recalculate = _facades(statement)
+        changed_field = _changed_field(statement)
+
+        def update_calls(statement=statement, sources=sources, update=update):
+            return [
+                (lambda model=model, year=year: update(model[statement], year, *[model[s] for s in sources]))
+                for model in models for year in year_axis
+            ]
+
+        def recalculate_calls(statement=statement, sources=sources, recalculate=recalculate, changed_field=changed_field):
+            return [
+                (lambda model=model, year=year: recalculate(model[statement], year, changed_field, *[model[s] for s in sources]))
+                for model in models for year in year_axis
+            ]
+
+        cases[update.__name__] = update_calls
+        cases[recalculate.__name__] = recalculate_calls
+
+    def full_chain_graph():
+        fresh = [build_model(copy.deepcopy(statements)) for _, statements in companies]
+        return [(lambda model=model: calculator_graph.recalculate_all(model)) for model in fresh]
+
+    def full_chain_vectorized():
+        fresh = [build_model(copy.deepcopy(statements)) for _, statements in companies]
+        return [(lambda model=model: recompute_model(model)) for model in fresh]
+
+    def graph_edit():
+        year = year_axis[len(year_axis) // 2] if year_axis else None
+
+        def edit(model):
+            model['income_statement'][year]['Revenue'] *= 1.01
+            calculator_graph.recalculate(model, [('income_statement', year, 'Revenue')])
+        return [(lambda model=model: edit(model)) for model in models]
+
+    def normalize():
+        fresh = [copy.deepcopy(statements[statement]) for _, statements in companies for statement in ('income_statement', 'balance_sheet')]
+        return [(lambda dataset=dataset: normalize_dataset(dataset)) for dataset in fresh]
+
+    cases['full_chain_graph'] = full_chain_graph
+    cases['full_chain_vectorized'] = full_chain_vectorized
+    cases['graph_edit_revenue'] = graph_edit
+    cases['normalize_dataset'] = normalize
+
+    results: Dict[str, Any] = {}
+    # The facades log every update at INFO; time the arithmetic, not the log handlers
+    calculators_logger = logging.getLogger('sec_app_2.calculators')
+    level = calculators_logger.level
+    calculators_logger.setLevel(logging.WARNING)
+    try:
+        for name, make_calls in cases.items():
+            if only and only not in name:
+                continue
+            samples: List[float] = []
+            for _ in range(repeat):
+                samples.extend(_time_calls(make_calls()))
+            if samples:
+                results[name] = _summary(samples)
+    finally:
+        calculators_logger.setLevel(level)
+
+    return {
+        'meta': {
+            'tickers': tickers,
+            'years': years,
+            'repeat': repeat,
+            'seed': seed,
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'benchmarks': results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> List[Dict[str, Any]]:
+    """Benchmarks whose median is more than ``max_regression`` percent slower than the baseline."""
+    regressions = []
+    for name, result in current.get('benchmarks', {}).items():
+        previous = baseline.get('benchmarks', {}).get(name)
+        if not previous or not previous.get('p50_us'):
+            continue
+        change = (result['p50_us'] / previous['p50_us'] - 1) * 100
+        if change > max_regression:
+            regressions.append({'name': name, 'baseline_p50_us': previous['p50_us'], 'p50_us': result['p50_us'], 'change_pct': change})
+    return regressions
@@ -1,79 +1,134 @@
 """Calculator modules for financial computations.
 
 This package organizes calculators into focused modules to keep imports
-fast and code easier to navigate.
+fast and code easier to navigate.  Public names are resolved lazily: a
+submodule is imported the first time one of its names is accessed.
 """
 
-from .income_statement import (
-    income_statement_calculator,
-    calculate_income_statement_field,
-    update_income_statement_calculations,
-    recalculate_income_statement_dependent_fields,
-)
+from importlib import import_module
+from typing import Any, Dict, List, Tuple
 
-from .balance_sheet import (
-    balance_sheet_calculator,
-    calculate_balance_sheet_field,
-    update_balance_sheet_calculations,
-    recalculate_balance_sheet_dependent_fields,
-    update_percentage_based_balance_sheet_field,
-)
+# Submodule -> public names it defines
+_MODULE_EXPORTS: Dict[str, Tuple[str, ...]] = {
+    'income_statement': (
+        'income_statement_calculator',
+        'calculate_income_statement_field',
+        'update_income_statement_calculations',
+        'recalculate_income_statement_dependent_fields',
+    ),
+    'balance_sheet': (
+        'balance_sheet_calculator',
+        'calculate_balance_sheet_field',
+        'update_balance_sheet_calculations',
+        'recalculate_balance_sheet_dependent_fields',
+        'update_percentage_based_balance_sheet_field',
+    ),
+    'nopat': (
+        'nopat_calculator',
+        'calculate_nopat_field',
+        'update_nopat_calculations',
+        'recalculate_nopat_dependent_fields',
+    ),
+    'capital_table': (
+        'financial_breakdown_calculator',
+        'calculate_financial_breakdown_field',
+        'update_financial_breakdown_calculations',
+        'recalculate_financial_breakdown_dependent_fields',
+    ),
+    'ppe_changes': (
+        'ppe_changes_calculator',
+        'calculate_ppe_changes_field',
+        'update_ppe_changes_calculations',
+        'recalculate_ppe_changes_dependent_fields',
+        'validate_ppe_reconciliation',
+    ),
+    'income_statement_common_size': (
+        'income_statement_common_size_calculator',
+        'calculate_income_statement_common_size_field',
+        'update_income_statement_common_size_calculations',
+        'recalculate_income_statement_common_size_dependent_fields',
+    ),
+    'roic_performance': (
+        'roic_performance_calculator',
+        'calculate_roic_performance_field',
+        'update_roic_performance_calculations',
+        'recalculate_roic_performance_dependent_fields',
+    ),
+    'financing_health': (
+        'financing_health_calculator',
+        'calculate_financing_health_field',
+        'update_financing_health_calculations',
+        'recalculate_financing_health_dependent_fields',
+    ),
+    'free_cash_flow': (
+        'free_cash_flow_calculator',
+        'calculate_free_cash_flow_field',
+        'update_free_cash_flow_calculations',
+        'recalculate_free_cash_flow_dependent_fields',
+    ),
+    'balance_sheet_common_size': (
+        'balance_sheet_common_size_calculator',
+        'calculate_balance_sheet_common_size_field',
+        'update_balance_sheet_common_size_calculations',
+        'recalculate_balance_sheet_common_size_dependent_fields',
+    ),
+    'graph': (
+        'calculator_graph',
+        'recalculate_model_dependent_fields',
+        'recalculate_model_dependent_fields_batch',
+        'update_model_calculations',
+    ),
+    'vectorized': (
+        'vectorized_engine',
+        'update_model_calculations_vectorized',
+    ),
+    'valuation_model': (
+        'MODEL_STATEMENTS',
+        'build_model',
+        'apply_edits',
+        'serialize_model',
+        'serialize_changes',
+        'recalculate_edits',
+        'recompute_model',
+        'statements_from_metrics',
+        'derived_cells',
+    ),
+    'frame': (
+        'StatementFrame',
+        'YearView',
+        'compact_model',
+        'expand_model',
+    ),
+    'sensitivity': (
+        'dcf_sensitivity_engine',
+        'run_dcf_sensitivity',
+        'SensitivityError',
+    ),
+    'registry': (
+        'calculator_registry',
+        'get_calculator',
+    ),
+    'instrumentation': (
+        'enable_instrumentation',
+        'disable_instrumentation',
+        'instrumentation_enabled',
+        'reset_calculator_stats',
+        'calculator_stats',
+    ),
+}
+_EXPORTS: Dict[str, str] = {name: module for module, names in _MODULE_EXPORTS.items() for name in names}
 
-from .nopat import (
-    nopat_calculator,
-    calculate_nopat_field,
-    update_nopat_calculations,
-    recalculate_nopat_dependent_fields,
-)
+__all__ = list(_EXPORTS)
 
-from .capital_table import (
-    financial_breakdown_calculator,
-    calculate_financial_breakdown_field,
-    update_financial_breakdown_calculations,
-    recalculate_financial_breakdown_dependent_fields,
-)
 
-from .ppe_changes import (
-    ppe_changes_calculator,
-    calculate_ppe_changes_field,
-    update_ppe_changes_calculations,
-    recalculate_ppe_changes_dependent_fields,
-    validate_ppe_reconciliation,
-)
-
-from .income_statement_common_size import (
-    income_statement_common_size_calculator,
-    calculate_income_statement_common_size_field,
-    update_income_statement_common_size_calculations,
-    recalculate_income_statement_common_size_dependent_fields,
-)
-
-from .roic_performance import (
-    roic_performance_calculator,
-    calculate_roic_performance_field,
-    update_roic_performance_calculations,
-    recalculate_roic_performance_dependent_fields,
-)
-
-from .financing_health import (
-    financing_health_calculator,
-    calculate_financing_health_field,
-    update_financing_health_calculations,
-    recalculate_financing_health_dependent_fields,
-)
-
-from .free_cash_flow import (
-    free_cash_flow_calculator,
-    calculate_free_cash_flow_field,
-    update_free_cash_flow_calculations,
-    recalculate_free_cash_flow_dependent_fields,
-)
-
-from .balance_sheet_common_size import (
-    balance_sheet_common_size_calculator,
-    calculate_balance_sheet_common_size_field,
-    update_balance_sheet_common_size_calculations,
-    recalculate_balance_sheet_common_size_dependent_fields,
-)
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(f'.{module}', __name__), name)
+    globals()[name] = value
+    return value
 
 
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -1,4 +1,21 @@
-from typing import Dict, Any, Iterable, Union
+"""Field-name normalization for request and stored datasets.
+
+Two kinds of keys are normalized:
+
+* aliases (``accountsreceivable``, ``Receivables``) -- the canonical key is
+  added next to the alias, which is kept for backward compatibility;
+* snake-case request keys (``revenue``, ``cost_of_revenue``) -- renamed to
+  the canonical income statement field.
+
+Each raw key is resolved once and memoized, so a request pays a dict
+lookup per key rather than ``lower()``/``replace()``.  Datasets returned
+by ``normalize_dataset`` are ``NormalizedDataset`` instances and pass
+through later calls untouched, so a request is normalized once however
+many calculators it reaches.
+"""
+
+from typing import Dict, Any, Iterable, Tuple, Union
+import sys
 
 # Central alias map: alias (case-insensitive) -> list of canonical keys to set
 _ALIAS_TO_CANONICAL: Dict[str, Iterable[str]] = {
@@ -36,45 +53,114 @@ _ALIAS_TO_CANONICAL: Dict[str, Iterable[str]] = {
 }
 
 
+# Snake-case request keys (matched lower-cased) -> canonical income statement field
+FIELD_RENAMES: Dict[str, str] = {
+    'revenue': 'Revenue',
+    'cost_of_revenue': 'CostOfRevenue',
+    'sga': 'SellingGeneralAdministrative',
+    'selling_general_administrative': 'SellingGeneralAdministrative',
+    'depreciation': 'Depreciation',
+    'interest_expense': 'InterestExpense',
+    'interest_income': 'InterestIncome',
+    'other_income': 'OtherIncome',
+    'tax_provision': 'TaxProvision',
+    'net_income_noncontrolling': 'NetIncomeNoncontrolling',
+}
+
+# Memoized raw key -> canonical keys / renamed key; bounded in case of hostile payloads
+_MAX_MEMO = 50_000
+_canonical_memo: Dict[Any, Tuple[str, ...]] = {}
+_rename_memo: Dict[Any, Any] = {}
+
+
 def _lower(s: str) -> str:
     return s.lower().replace('_', '') if isinstance(s, str) else s
 
 
-def normalize_year_fields(year_data: Dict[str, Any]) -> Dict[str, Any]:
-    """Return a copy of year_data with alias keys normalized to canonical keys.
+def canonical_keys(key: Any) -> Tuple[str, ...]:
+    """Canonical keys an alias key should also be stored under (usually none)."""
+    try:
+        return _canonical_memo[key]
+    except KeyError:
+        keys = tuple(sys.intern(name) for name in _ALIAS_TO_CANONICAL.get(_lower(key), ()))
+        if len(_canonical_memo) < _MAX_MEMO:
+            _canonical_memo[key] = keys
+        return keys
+
+
+def canonical_field(key: Any) -> Any:
+    """Canonical name for a snake-case request key; other keys are returned unchanged."""
+    try:
+        return _rename_memo[key]
+    except KeyError:
+        name = FIELD_RENAMES.get(key.lower(), key) if isinstance(key, str) else key
+        name = sys.intern(name) if isinstance(name, str) else name
+        if len(_rename_memo) < _MAX_MEMO:
+            _rename_memo[key] = name
+        return name
+
+
+class NormalizedDataset(dict):
+    """A ``{year: fields}`` dataset whose rows already went through ``normalize_year_fields``."""
+
+
+def normalize_year_fields(year_data: Dict[str, Any], in_place: bool = False) -> Dict[str, Any]:
+    """Add canonical keys for any alias keys in year_data.
 
     If an alias key is present, we ensure the canonical key(s) exist with the
     same value but we do not delete the original key to remain backward-compatible.
+    Rows without aliases are returned as is; otherwise a copy is returned,
+    or ``year_data`` itself when ``in_place``.
     """
     if not isinstance(year_data, dict):
         return year_data
 
-    normalized: Dict[str, Any] = dict(year_data)
+    normalized = year_data
+    for key, value in year_data.items():
+        for canonical in canonical_keys(key):
+            if canonical in normalized:
+                continue
+            if normalized is year_data:
+                if in_place:
+                    # Adding keys while iterating; finish over a snapshot
+                    return _add_canonical(year_data, year_data)
+                normalized = dict(year_data)
+            normalized[canonical] = value
+    return normalized
+
 
-    for key, value in list(year_data.items()):
-        key_norm = _lower(key)
-        canonical_keys: Iterable[str] = _ALIAS_TO_CANONICAL.get(key_norm, [])
-        for canonical in canonical_keys:
-            if canonical not in normalized:
-                normalized[canonical] = value
+def _add_canonical(target: Dict[str, Any], source: Dict[str, Any]) -> Dict[str, Any]:
+    for key, value in list(source.items()):
+        for canonical in canonical_keys(key):
+            if canonical not in target:
+                target[canonical] = value
+    return target
 
-    return normalized
+
+def rename_fields(year_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of a request row with snake-case keys renamed to canonical fields."""
+    return {canonical_field(key): value for key, value in year_data.items()}
 
 
-def normalize_dataset(data: Dict[Union[int, str], Dict[str, Any]]) -> Dict[Union[int, str], Dict[str, Any]]:
+def normalize_dataset(data: Dict[Union[int, str], Dict[str, Any]], in_place: bool = False, rename: bool = False) -> Dict[Union[int, str], Dict[str, Any]]:
     """Normalize an entire dataset keyed by year -> fields dict.
 
-    Returns a shallow-copied dataset with each year's fields normalized.
+    Returns a ``NormalizedDataset`` (a shallow copy of the year mapping);
+    rows are copied only when they hold alias keys, and not at all with
+    ``in_place``.  With ``rename`` each row is first passed through
+    ``rename_fields``, so a request row is renamed and aliased in one copy.
+    Already normalized datasets and statement frames are returned unchanged.
     """
-    if not isinstance(data, dict):
+    if not isinstance(data, dict) or isinstance(data, NormalizedDataset):
         return data
 
-    result: Dict[Union[int, str], Dict[str, Any]] = {}
+    result: Dict[Union[int, str], Dict[str, Any]] = NormalizedDataset()
     for year, fields in data.items():
         if isinstance(fields, dict):
-            result[year] = normalize_year_fields(fields)
+            if rename:
+                result[year] = normalize_year_fields(rename_fields(fields), in_place=True)
+            else:
+                result[year] = normalize_year_fields(fields, in_place)
         else:
             result[year] = fields
     return result
-
-
@@ -6,6 +6,8 @@ logger = logging.getLogger(__name__)
 
 
 class BalanceSheetCalculator(BaseCalculator):
+    statement = 'balance_sheet'
+
     def __init__(self):
         self.calculated_fields = {
             'TotalAssets': self.calculate_total_assets,
@@ -52,6 +54,18 @@ class BalanceSheetCalculator(BaseCalculator):
             'StockholdersEquity': ['LiabilitiesAndStockholdersEquity'],
         }
 
+        # Cells read by each formula; compiled into the cross-statement graph (see graph.py)
+        self.field_inputs = {
+            'TotalAssets': ['AssetsCurrent', 'AssetsNoncurrent'],
+            'AssetsCurrent': ['CashAndCashEquivalents', 'Receivables', 'Inventory', 'DeferredTaxesAssetsCurrent', 'OtherAssetsCurrent'],
+            'AssetsNoncurrent': ['PropertyPlantAndEquipmentNet', 'OperatingLeaseRightOfUseAsset', 'LeaseFinanceAssetsNoncurrent', 'Goodwill', 'DeferredIncomeTaxAssetsNoncurrent', 'OtherAssetsNoncurrent'],
+            'TotalLiabilities': ['LiabilitiesCurrent', 'LiabilitiesNoncurrent'],
+            'LiabilitiesCurrent': ['AccountsPayableCurrent', 'EmployeeRelatedLiabilitiesCurrent', 'AccruedLiabilitiesCurrent', 'DeferredRevenueCurrent', 'LongTermDebtCurrent', 'OperatingLeaseLiabilitiesCurrent', 'FinanceLeaseLiabilitiesCurrent', 'OtherLiabilitiesCurrent'],
+            'LiabilitiesNoncurrent': ['LongTermDebtNoncurrent', 'OperatingLeaseLiabilityNoncurrent', 'FinanceLeaseLiabilitiesNonCurrent', 'DeferredIncomeTaxLiabilitiesNonCurrent', 'OtherLiabilitiesNoncurrent'],
+            'StockholdersEquity': ['TotalAssets', 'TotalLiabilities'],
+            'LiabilitiesAndStockholdersEquity': ['TotalLiabilities', 'StockholdersEquity'],
+        }
+
     def calculate_total_assets(self, data: Dict[int, Dict[str, Any]], year: int) -> Optional[float]:
         try:
             y = data.get(year, {})
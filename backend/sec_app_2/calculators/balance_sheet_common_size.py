@@ -6,6 +6,9 @@ logger = logging.getLogger(__name__)
 
 
 class BalanceSheetCommonSizeCalculator(BaseCalculator):
+    statement = 'balance_sheet_common_size'
+    field_dispatcher = 'calculate_field'
+
     def __init__(self):
         self.calculated_fields = {
             'CashAndCashEquivalentsAsPercentOfRevenue': self.pct,
@@ -58,6 +61,19 @@ class BalanceSheetCommonSizeCalculator(BaseCalculator):
             'LiabilitiesCurrent365DayTurnover': self.turnover,
         }
 
+        # Cells read by each formula; compiled into the cross-statement graph (see graph.py)
+        self.field_inputs = {}
+        for name, func in self.calculated_fields.items():
+            if func == self.pct_cap:
+                source = ('capital_table', name[:-len('AsPercentOfRevenue')])
+            elif func == self.pct_fcf:
+                source = ('free_cash_flow', 'ForeignCurrencyAdjustment')
+            elif func == self.turnover:
+                source = ('balance_sheet', name[:-len('365DayTurnover')])
+            else:
+                source = ('balance_sheet', name[:-len('AsPercentOfRevenue')])
+            self.field_inputs[name] = [source, ('income_statement', 'Revenue')]
+
     def _num(self, v: Any) -> float:
         return self.to_number(v)
 
@@ -79,26 +95,27 @@ class BalanceSheetCommonSizeCalculator(BaseCalculator):
         inc_year = (income_statement_data or {}).get(year, {})
         cap_year = (capital_data or {}).get(year, {})
         fcf_year = (free_cash_flow_data or {}).get(year, {})
-        for name, func in self.calculated_fields.items():
+        for name in self.calculated_fields:
             try:
-                if name.endswith('AsPercentOfRevenue'):
-                    if 'VariableLeaseAssets' in name or 'ForeignTaxCreditCarryForward' in name or 'DeferredIncomeTaxesNet' in name or 'NoncontrollingInterests' in name:
-                        key = name.replace('AsPercentOfRevenue', '').replace('DeferredIncomeTaxesNet', 'DeferredIncomeTaxesNet')
-                        results[name] = self.pct_cap(cap_year, inc_year, key)
-                    elif 'ForeignCurrencyAdjustment' in name:
-                        key = 'ForeignCurrencyAdjustment'
-                        results[name] = self.pct_fcf(fcf_year, inc_year, key)
-                    else:
-                        key = name.replace('AsPercentOfRevenue', '')
-                        results[name] = self.pct(bs_year, inc_year, key)
-                elif name.endswith('365DayTurnover'):
-                    key = name.replace('365DayTurnover', '')
-                    results[name] = self.turnover(bs_year, inc_year, key)
+                value = self.calculate_field(name, bs_year, inc_year, cap_year, fcf_year)
+                if value is not None:
+                    results[name] = value
             except Exception as e:
                 logger.error(f"Error calculating {name} for {year}: {e}")
                 results[name] = 0.0
         return results
 
+    def calculate_field(self, name: str, bs_year: Dict[str, Any], inc_year: Dict[str, Any], cap_year: Dict[str, Any], fcf_year: Dict[str, Any]) -> Optional[float]:
+        if name.endswith('AsPercentOfRevenue'):
+            if 'VariableLeaseAssets' in name or 'ForeignTaxCreditCarryForward' in name or 'DeferredIncomeTaxesNet' in name or 'NoncontrollingInterests' in name:
+                return self.pct_cap(cap_year, inc_year, name.replace('AsPercentOfRevenue', ''))
+            if 'ForeignCurrencyAdjustment' in name:
+                return self.pct_fcf(fcf_year, inc_year, 'ForeignCurrencyAdjustment')
+            return self.pct(bs_year, inc_year, name.replace('AsPercentOfRevenue', ''))
+        if name.endswith('365DayTurnover'):
+            return self.turnover(bs_year, inc_year, name.replace('365DayTurnover', ''))
+        return None
+
     def update_calculated_fields(self, data: Dict[int, Dict[str, Any]], year: int, balance_sheet_data: Dict[int, Dict[str, Any]] = None, income_statement_data: Dict[int, Dict[str, Any]] = None, capital_data: Dict[int, Dict[str, Any]] = None, free_cash_flow_data: Dict[int, Dict[str, Any]] = None) -> Dict[int, Dict[str, Any]]:
         data.setdefault(year, {})
         data[year].update(self.calculate_all_fields(data, year, balance_sheet_data, income_statement_data, capital_data, free_cash_flow_data))
@@ -113,9 +130,20 @@ balance_sheet_common_size_calculator = BalanceSheetCommonSizeCalculator()
 
 
 def calculate_balance_sheet_common_size_field(data: Dict[int, Dict[str, Any]], year: int, field_name: str, balance_sheet_data: Dict[int, Dict[str, Any]] = None, income_statement_data: Dict[int, Dict[str, Any]] = None, capital_data: Dict[int, Dict[str, Any]] = None, free_cash_flow_data: Dict[int, Dict[str, Any]] = None) -> Any:
-    # Minimal on-demand: compute all and return field
-    results = balance_sheet_common_size_calculator.calculate_all_fields(data, year, balance_sheet_data, income_statement_data, capital_data, free_cash_flow_data)
-    return results.get(field_name)
+    if field_name not in balance_sheet_common_size_calculator.calculated_fields:
+        logger.warning(f"Field {field_name} is not a calculated balance sheet common size field")
+        return None
+    try:
+        return balance_sheet_common_size_calculator.calculate_field(
+            field_name,
+            (balance_sheet_data or {}).get(year, {}),
+            (income_statement_data or {}).get(year, {}),
+            (capital_data or {}).get(year, {}),
+            (free_cash_flow_data or {}).get(year, {}),
+        )
+    except Exception as e:
+        logger.error(f"Error calculating {field_name} for {year}: {e}")
+        return 0.0
 
 
 def update_balance_sheet_common_size_calculations(data: Dict[int, Dict[str, Any]], year: int, balance_sheet_data: Dict[int, Dict[str, Any]] = None, income_statement_data: Dict[int, Dict[str, Any]] = None, capital_data: Dict[int, Dict[str, Any]] = None, free_cash_flow_data: Dict[int, Dict[str, Any]] = None) -> Dict[int, Dict[str, Any]]:
@@ -1,4 +1,4 @@
-from typing import Any, Dict, Union
+from typing import Any, Dict, Optional, Union
 import logging
 
 logger = logging.getLogger(__name__)
@@ -7,6 +7,26 @@ logger = logging.getLogger(__name__)
 class BaseCalculator:
     """Shared numeric helpers and safe getters."""
 
+    statement: str = ''
+    # Method taking ``(field_name, ...)`` that computes fields instead of ``calculated_fields``
+    field_dispatcher: Optional[str] = None
+
+    def instrument(self) -> None:
+        """Swap each field formula for a timed wrapper (see ``instrumentation``)."""
+        from .instrumentation import timed_dispatch, timed_field
+
+        for name, func in self.calculated_fields.items():
+            if not hasattr(func, '__wrapped__'):
+                self.calculated_fields[name] = timed_field(self.statement, name, func)
+        if self.field_dispatcher and self.field_dispatcher not in vars(self):
+            setattr(self, self.field_dispatcher, timed_dispatch(self.statement, getattr(self, self.field_dispatcher)))
+
+    def uninstrument(self) -> None:
+        for name, func in self.calculated_fields.items():
+            self.calculated_fields[name] = getattr(func, '__wrapped__', func)
+        if self.field_dispatcher:
+            vars(self).pop(self.field_dispatcher, None)
+
     @staticmethod
     def to_number(value: Any) -> float:
         try:
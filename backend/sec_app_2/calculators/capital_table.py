@@ -6,6 +6,8 @@ logger = logging.getLogger(__name__)
 
 
 class CapitalTableCalculator(BaseCalculator):
+    statement = 'capital_table'
+
     def __init__(self):
         self.calculated_fields = {
             'CurrentAssetsAggregate': self.calculate_current_assets_aggregate,
@@ -60,6 +62,24 @@ class CapitalTableCalculator(BaseCalculator):
             'NetDeferredIncomeTaxes': ['TotalCapitalFunds'],
         }
 
+        # Cells read by each formula; compiled into the cross-statement graph (see graph.py)
+        self.field_inputs = {
+            'CurrentAssetsAggregate': [('balance_sheet', 'OperatingCash'), ('balance_sheet', 'ReceivablesCurrent'), ('balance_sheet', 'Inventory'), ('balance_sheet', 'OtherAssetsCurrent')],
+            'CurrentLiabilitiesAggregate': [('balance_sheet', 'AccountsPayableCurrent'), ('balance_sheet', 'EmployeeLiabilitiesCurrent'), ('balance_sheet', 'AccruedLiabilitiesCurrent'), ('balance_sheet', 'DeferredRevenueCurrent'), ('balance_sheet', 'OtherLiabilitiesCurrent')],
+            'NetOperatingAssetsCurrent': [('balance_sheet', 'OperatingAssetsCurrent'), ('balance_sheet', 'OperatingLiabilitiesCurrent')],
+            'ScaledOperatingLeaseAssets': [('balance_sheet', 'OperatingLeaseAssets')],
+            'NetOtherNoncurrentAssets': [('balance_sheet', 'OtherAssetsNoncurrent'), ('balance_sheet', 'OtherLiabilitiesNoncurrent')],
+            'TotalInvestedCapitalComponents': ['OperatingWorkingCapital', ('balance_sheet', 'PropertyPlantAndEquipment'), ('balance_sheet', 'OperatingLeaseAssets'), 'VariableLeaseAssets', ('balance_sheet', 'FinanceLeaseAssets'), 'OtherAssetsNetOtherLiabilities'],
+            'InvestedCapitalWithGoodwill': ['InvestedCapitalExcludingGoodwill', ('balance_sheet', 'Goodwill')],
+            'BroaderInvestedCapital': ['InvestedCapitalIncludingGoodwill', ('balance_sheet', 'ExcessCash'), ('balance_sheet', 'ForeignTaxCreditCarryForward')],
+            'TotalLongTermDebt': [('balance_sheet', 'LongTermDebtCurrent'), ('balance_sheet', 'LongTermDebtNoncurrent')],
+            'TotalOperatingLeaseLiabilities': [('balance_sheet', 'OperatingLeaseLiabilitiesCurrent'), ('balance_sheet', 'OperatingLeaseLiabilitiesNoncurrent')],
+            'TotalFinanceLeaseLiabilities': [('balance_sheet', 'FinanceLeaseLiabilitiesCurrent'), ('balance_sheet', 'FinanceLeaseLiabilitiesNoncurrent')],
+            'TotalDebtAndLeaseLiabilities': ['Debt', 'OperatingLeaseLiabilities', 'VariableLeaseLiabilities', 'FinanceLeaseLiabilities'],
+            'NetDeferredIncomeTaxes': [('balance_sheet', 'DeferredIncomeTaxes'), ('balance_sheet', 'ForeignTaxCreditCarryForward')],
+            'TotalCapitalFunds': ['DebtAndDebtEquivalents', ('balance_sheet', 'DeferredIncomeTaxes'), ('balance_sheet', 'ForeignTaxCreditCarryForward'), ('balance_sheet', 'NoncontrollingInterests'), ('balance_sheet', 'Equity')],
+        }
+
     def get_balance_sheet_field(self, data: Dict[int, Dict[str, Any]], year: int, field_name: str) -> float:
         return self.get_field(data, year, field_name)
 
@@ -6,6 +6,8 @@ logger = logging.getLogger(__name__)
 
 
 class FinancingHealthCalculator(BaseCalculator):
+    statement = 'financing_health'
+
     def __init__(self):
         self.calculated_fields = {
             'AdjustedEBITDA': self.calculate_adjusted_ebitda,
@@ -29,6 +31,17 @@ class FinancingHealthCalculator(BaseCalculator):
             'TotalInterestExpense': ['EBITAInterestCoverageRatio', 'AdjustedEBITDAInterestCoverageRatio'],
         }
 
+        # Cells read by each formula; compiled into the cross-statement graph (see graph.py)
+        self.field_inputs = {
+            'AdjustedEBITDA': [('nopat', 'EBITAAdjusted'), ('nopat', 'Depreciation')],
+            'TotalInterestExpense': [('income_statement', 'InterestExpense'), ('nopat', 'OperatingLeaseInterest'), ('nopat', 'VariableLeaseInterest')],
+            'EBITAInterestCoverageRatio': [('nopat', 'EBITAAdjusted'), 'TotalInterestExpense'],
+            'AdjustedEBITDAInterestCoverageRatio': [('nopat', 'EBITAAdjusted'), ('nopat', 'Depreciation'), 'TotalInterestExpense'],
+            'DebtToEBITARatio': [('capital_table', 'Debt'), ('nopat', 'EBITAAdjusted')],
+            'DebtToAdjustedEBITDARatio': [('capital_table', 'Debt'), 'AdjustedEBITDA'],
+            'DebtToEquityRatio': [('capital_table', 'Debt'), ('balance_sheet', 'Equity')],
+        }
+
     def _num(self, v: Any) -> float:
         return self.to_number(v)
 
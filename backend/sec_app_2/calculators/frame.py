@@ -0,0 +1,359 @@
+"""Compact array-backed statement datasets.
+
+A ``StatementFrame`` holds one statement's ``{year: {field: value}}``
+dataset as a single flat ``array('d')``: one row per year between the
+first and last year, one column per field of a shared ``FrameSchema``.
+Missing cells are NaN, so a ticker model costs 8 bytes per cell instead
+of a dict entry plus a boxed float.
+
+Frames (and the ``YearView`` rows they hand out) implement the mutable
+mapping protocol, so calculators written against dicts -- ``data.get(year,
+{}).get(key)``, ``data.setdefault(year, {})[key] = value`` -- run on them
+unchanged.  ``YearView.prior`` is the previous year's row, read straight
+from the same array.
+
+Values that are not plain numbers (``None``, strings, NaN) are kept
+verbatim in a small side dict, so ``from_dict``/``to_dict`` round-trip;
+ints are stored as floats.
+"""
+
+from array import array
+from collections.abc import Mapping, MutableMapping
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+import math
+
+from .graph import calculator_graph
+
+NAN = float('nan')
+_MISSING = object()
+# Year rows are contiguous; a dataset spanning more years keeps the outliers in a dict
+MAX_SPAN = 400
+
+
+class FrameSchema:
+    """Field -> column index, shared by every frame of a statement."""
+
+    __slots__ = ('names', 'index')
+
+    def __init__(self, names: Tuple[str, ...]):
+        self.names = names
+        self.index: Dict[str, int] = {name: j for j, name in enumerate(names)}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def extend(self, names: Iterable[str]) -> 'FrameSchema':
+        extra = sorted(set(names) - self.index.keys())
+        return schema_for(self.names + tuple(extra)) if extra else self
+
+
+_schemas: Dict[Tuple[str, ...], FrameSchema] = {}
+
+
+def schema_for(names: Iterable[str]) -> FrameSchema:
+    """Interned schema, so frames with the same fields share one index."""
+    names = tuple(names)
+    schema = _schemas.get(names)
+    if schema is None:
+        schema = _schemas[names] = FrameSchema(names)
+    return schema
+
+
+def _statement_fields() -> Dict[str, set]:
+    fields: Dict[str, set] = {}
+    for (statement, field_name), refs in calculator_graph.inputs.items():
+        fields.setdefault(statement, set()).add(field_name)
+        for (source, source_field), _ in refs:
+            fields.setdefault(source, set()).add(source_field)
+    return fields
+
+
+# Every field the calculators read or write, per statement
+STATEMENT_SCHEMAS: Dict[str, FrameSchema] = {statement: schema_for(sorted(names)) for statement, names in _statement_fields().items()}
+EMPTY_SCHEMA = schema_for(())
+
+
+def _is_number(value: Any) -> bool:
+    return (type(value) is float or type(value) is int) and math.isfinite(value)
+
+
+class YearView(MutableMapping):
+    """One year of a frame; reads and writes go straight to the frame's array."""
+
+    __slots__ = ('frame', 'year')
+
+    def __init__(self, frame: 'StatementFrame', year: int):
+        self.frame = frame
+        self.year = year
+
+    def _offset(self) -> int:
+        frame = self.frame
+        return (self.year - frame.first) * len(frame.schema)
+
+    def get(self, field_name: str, default: Any = None) -> Any:
+        frame = self.frame
+        j = frame.schema.index.get(field_name)
+        if j is not None:
+            value = frame.cells[(self.year - frame.first) * len(frame.schema.names) + j]
+            if value == value:
+                return value
+        if frame.extras:
+            return frame.extras.get((self.year, field_name), default)
+        return default
+
+    def __getitem__(self, field_name: str) -> Any:
+        value = self.get(field_name, _MISSING)
+        if value is _MISSING:
+            raise KeyError(field_name)
+        return value
+
+    def __contains__(self, field_name: object) -> bool:
+        return self.get(field_name, _MISSING) is not _MISSING
+
+    def number(self, field_name: str) -> float:
+        """``BaseCalculator.to_number`` of the cell, without boxing a dict lookup."""
+        j = self.frame.schema.index.get(field_name)
+        if j is not None:
+            value = self.frame.cells[self._offset() + j]
+            if value == value:
+                return value
+        if self.frame.extras:
+            value = self.frame.extras.get((self.year, field_name))
+            try:
+                return float(value) if value is not None else 0.0
+            except (TypeError, ValueError):
+                return 0.0
+        return 0.0
+
+    def __setitem__(self, field_name: str, value: Any) -> None:
+        frame = self.frame
+        if field_name not in frame.schema.index:
+            frame.extend_schema((field_name,))
+        idx = self._offset() + frame.schema.index[field_name]
+        if _is_number(value):
+            frame.cells[idx] = value
+            if frame.extras:
+                frame.extras.pop((self.year, field_name), None)
+        else:
+            frame.cells[idx] = NAN
+            if frame.extras is None:
+                frame.extras = {}
+            frame.extras[(self.year, field_name)] = value
+
+    def __delitem__(self, field_name: str) -> None:
+        if field_name not in self:
+            raise KeyError(field_name)
+        frame = self.frame
+        frame.cells[self._offset() + frame.schema.index[field_name]] = NAN
+        if frame.extras:
+            frame.extras.pop((self.year, field_name), None)
+
+    def __iter__(self) -> Iterator[str]:
+        frame = self.frame
+        offset = self._offset()
+        cells = frame.cells
+        for j, name in enumerate(frame.schema.names):
+            value = cells[offset + j]
+            if value == value or (frame.extras and (self.year, name) in frame.extras):
+                yield name
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    @property
+    def prior(self) -> Optional['YearView']:
+        """The previous year's row, or None when the frame has no such year."""
+        return self.frame.get(self.year - 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: self[name] for name in self}
+
+    def __repr__(self) -> str:
+        return f'YearView({self.year}, {self.to_dict()!r})'
+
+
+class StatementFrame(MutableMapping):
+    """A statement dataset keyed by year, stored as one ``years x fields`` float array."""
+
+    __slots__ = ('schema', 'first', 'rows', 'cells', 'present', 'extras', 'loose')
+
+    def __init__(self, schema: FrameSchema = EMPTY_SCHEMA):
+        self.schema = schema
+        self.first: Optional[int] = None
+        self.rows = 0
+        self.cells = array('d')
+        # One flag per row: whether the year is a key of the dataset
+        self.present = bytearray()
+        # (year, field) -> non-numeric value (None, strings, NaN)
+        self.extras: Optional[Dict[Tuple[int, str], Any]] = None
+        # Rows keyed by non-year labels (AVG, CAGR) or far outside the span
+        self.loose: Optional[Dict[Any, Dict[str, Any]]] = None
+
+    @classmethod
+    def from_dict(cls, dataset: Mapping, statement: Optional[str] = None) -> 'StatementFrame':
+        """Pack a ``{year: {field: value}}`` dataset; ``statement`` picks its base schema."""
+        if isinstance(dataset, StatementFrame):
+            return dataset
+        names = set()
+        for fields in dataset.values():
+            names.update(fields or ())
+        base = STATEMENT_SCHEMAS.get(statement, EMPTY_SCHEMA)
+        frame = cls(base.extend(names))
+        years = [year for year in dataset if type(year) is int]
+        if years:
+            frame._allocate(min(years), max(years))
+        for year, fields in dataset.items():
+            frame[year] = fields or {}
+        return frame
+
+    def to_dict(self) -> Dict[Any, Dict[str, Any]]:
+        return {year: dict(fields) for year, fields in self.items()}
+
+    def _allocate(self, low: int, high: int) -> None:
+        if self.first is None:
+            high = min(high, low + MAX_SPAN - 1)
+            self.first = low
+            self.rows = high - low + 1
+            self.cells = array('d', [NAN]) * (self.rows * len(self.schema))
+            self.present = bytearray(self.rows)
+            return
+        width = len(self.schema)
+        if low < self.first:
+            pad = self.first - low
+            self.cells = array('d', [NAN]) * (pad * width) + self.cells
+            self.present = bytearray(pad) + self.present
+            self.first = low
+            self.rows += pad
+        last = self.first + self.rows - 1
+        if high > last:
+            pad = high - last
+            self.cells.extend(array('d', [NAN]) * (pad * width))
+            self.present.extend(bytearray(pad))
+            self.rows += pad
+
+    def _row(self, year: Any) -> Optional[int]:
+        if type(year) is not int or self.first is None:
+            return None
+        i = year - self.first
+        return i if 0 <= i < self.rows else None
+
+    def _fits(self, year: Any) -> bool:
+        if type(year) is not int:
+            return False
+        if self.first is None:
+            return True
+        return max(year, self.first + self.rows - 1) - min(year, self.first) < MAX_SPAN
+
+    def extend_schema(self, names: Iterable[str]) -> None:
+        """Add columns, re-laying out the array once."""
+        schema = self.schema.extend(names)
+        if schema is self.schema:
+            return
+        old, width, new_width = self.cells, len(self.schema), len(schema)
+        cells = array('d', [NAN]) * (self.rows * new_width)
+        for i in range(self.rows):
+            cells[i * new_width:i * new_width + width] = old[i * width:(i + 1) * width]
+        self.schema = schema
+        self.cells = cells
+
+    def get(self, year: Any, default: Any = None) -> Any:
+        if type(year) is int and self.first is not None and 0 <= year - self.first < self.rows and self.present[year - self.first]:
+            return YearView(self, year)
+        if self.loose and year in self.loose:
+            return self.loose[year]
+        return default
+
+    def __getitem__(self, year: Any) -> Any:
+        row = self.get(year, self)
+        if row is self:
+            raise KeyError(year)
+        return row
+
+    def __contains__(self, year: object) -> bool:
+        i = self._row(year)
+        return (i is not None and bool(self.present[i])) or bool(self.loose and year in self.loose)
+
+    def __setitem__(self, year: Any, fields: Mapping) -> None:
+        if isinstance(fields, YearView):
+            fields = fields.to_dict()
+        if not self._fits(year):
+            if self.loose is None:
+                self.loose = {}
+            self.loose[year] = dict(fields)
+            return
+        if year in self:
+            del self[year]
+        self._allocate(year, year)
+        self.present[year - self.first] = 1
+        row = YearView(self, year)
+        for field_name, value in fields.items():
+            row[field_name] = value
+
+    def setdefault(self, year: Any, default: Any = None) -> Any:
+        row = self.get(year)
+        if row is None:
+            self[year] = default or {}
+            row = self[year]
+        return row
+
+    def __delitem__(self, year: Any) -> None:
+        if self.loose and year in self.loose:
+            del self.loose[year]
+            return
+        i = self._row(year)
+        if i is None or not self.present[i]:
+            raise KeyError(year)
+        width = len(self.schema)
+        self.cells[i * width:(i + 1) * width] = array('d', [NAN]) * width
+        self.present[i] = 0
+        if self.extras:
+            for key in [key for key in self.extras if key[0] == year]:
+                del self.extras[key]
+
+    def __iter__(self) -> Iterator[Any]:
+        for i in range(self.rows):
+            if self.present[i]:
+                yield self.first + i
+        if self.loose:
+            yield from list(self.loose)
+
+    def __len__(self) -> int:
+        return self.present.count(1) + (len(self.loose) if self.loose else 0)
+
+    def __bool__(self) -> bool:
+        # ``data or {}`` in the calculators; cheaper than counting rows
+        return 1 in self.present or bool(self.loose)
+
+    def number(self, year: Any, field_name: str) -> float:
+        """O(1) ``to_number`` read: 0.0 for missing or non-numeric cells."""
+        row = self.get(year)
+        if isinstance(row, YearView):
+            return row.number(field_name)
+        if row is None:
+            return 0.0
+        try:
+            value = row.get(field_name)
+            return float(value) if value is not None else 0.0
+        except (TypeError, ValueError):
+            return 0.0
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the array and row flags (not the shared schema)."""
+        return self.cells.itemsize * len(self.cells) + len(self.present)
+
+    def __repr__(self) -> str:
+        return f'StatementFrame({self.to_dict()!r})'
+
+
+def compact_model(model: Mapping) -> Dict[str, StatementFrame]:
+    """Pack every statement of a model into frames (frames are kept as is)."""
+    return {statement: StatementFrame.from_dict(dataset or {}, statement) for statement, dataset in model.items()}
+
+
+def expand_model(model: Mapping) -> Dict[str, Dict[Any, Dict[str, Any]]]:
+    """Plain dict-of-dicts copy of a (possibly compacted) model."""
+    return {
+        statement: dataset.to_dict() if isinstance(dataset, StatementFrame) else {year: dict(fields) for year, fields in dataset.items()}
+        for statement, dataset in model.items()
+    }
@@ -6,6 +6,8 @@ logger = logging.getLogger(__name__)
 
 
 class FreeCashFlowCalculator(BaseCalculator):
+    statement = 'free_cash_flow'
+
     def __init__(self):
         self.calculated_fields = {
             'NOPAT': self.get_nopat_field,
@@ -56,6 +58,39 @@ class FreeCashFlowCalculator(BaseCalculator):
             'WeightedAverageCostOfCapital': ['DiscountFactor', 'PresentValueOfFreeCashFlow'],
         }
 
+        # Cells read by each formula; compiled into the cross-statement graph (see graph.py).
+        # CapitalExpenditures and TaxesNonoperating are entered directly on this statement.
+        self.field_inputs = {
+            'NOPAT': [('nopat', 'NOPAT')],
+            'Depreciation': [('nopat', 'Depreciation')],
+            'EBITAAdjusted': [('nopat', 'EBITAAdjusted')],
+            'ChangeInOperatingWorkingCapital': [('capital_table', 'OperatingWorkingCapital'), ('capital_table', 'OperatingWorkingCapital', -1)],
+            'ChangeInOperatingLeaseAssets': [('balance_sheet', 'OperatingLeaseAssets'), ('balance_sheet', 'OperatingLeaseAssets', -1)],
+            'ChangeInVariableLeaseAssets': [('balance_sheet', 'VariableLeaseAssets'), ('balance_sheet', 'VariableLeaseAssets', -1)],
+            'ChangeInFinanceLeaseAssets': [('balance_sheet', 'FinanceLeaseAssets'), ('balance_sheet', 'FinanceLeaseAssets', -1)],
+            'ChangeInGoodwill': [('balance_sheet', 'Goodwill'), ('balance_sheet', 'Goodwill', -1)],
+            'ChangeInNetOtherNoncurrentAssets': [
+                ('balance_sheet', 'OtherAssetsNoncurrent'), ('balance_sheet', 'OtherAssetsNoncurrent', -1),
+                ('balance_sheet', 'OtherLiabilitiesNoncurrent'), ('balance_sheet', 'OtherLiabilitiesNoncurrent', -1),
+            ],
+            'ChangeInExcessCash': [('capital_table', 'ExcessCash'), ('capital_table', 'ExcessCash', -1)],
+            'ChangeInForeignTaxCreditCarryForward': [('capital_table', 'ForeignTaxCreditCarryForward'), ('capital_table', 'ForeignTaxCreditCarryForward', -1)],
+            'InterestIncome': [('income_statement', 'InterestIncome')],
+            'OtherIncome': [('income_statement', 'OtherIncome')],
+            'ForeignCurrencyAdjustment': [('income_statement', 'ForeignCurrencyAdjustment')],
+            'UnexplainedChangesInPPE': [('ppe_changes', 'UnexplainedChangesInPPE')],
+            'GrossCashFlow': [('nopat', 'NOPAT'), ('nopat', 'Depreciation')],
+            'FreeCashFlow': [
+                'GrossCashFlow', 'InterestIncome', 'OtherIncome', 'ForeignCurrencyAdjustment',
+                'ChangeInOperatingWorkingCapital', 'ChangeInOperatingLeaseAssets', 'ChangeInVariableLeaseAssets',
+                'ChangeInFinanceLeaseAssets', 'ChangeInGoodwill', 'ChangeInNetOtherNoncurrentAssets',
+                'CapitalExpenditures', 'TaxesNonoperating', 'ChangeInExcessCash',
+                'ChangeInForeignTaxCreditCarryForward', 'UnexplainedChangesInPPE',
+            ],
+            'DiscountFactor': ['WeightedAverageCostOfCapital'],
+            'PresentValueOfFreeCashFlow': ['DiscountFactor', 'FreeCashFlow'],
+        }
+
     def _num(self, v: Any) -> float:
         return self.to_number(v)
 
@@ -163,15 +198,20 @@ class FreeCashFlowCalculator(BaseCalculator):
             if wacc is None:
                 wacc = (data.get(year, {}) or {}).get('WeightedAverageCostOfCapital', 0.1)
             if base_year is None:
-                # Use the earliest year in the dataset as base year
-                years = [y for y in data.keys() if isinstance(y, int)]
-                base_year = min(years) if years else year
+                base_year = self.earliest_year(data)
+                if base_year is None:
+                    base_year = year
             order = year - base_year
             return 1.0 if order <= 0 else 1 / ((1 + wacc) ** order)
         except Exception as e:
             logger.error(f"Error calculating Discount Factor for year {year}: {e}")
             return None
 
+    def earliest_year(self, data) -> Optional[int]:
+        """Base year for discounting: the earliest integer year in the dataset."""
+        years = [y for y in data.keys() if isinstance(y, int)]
+        return min(years) if years else None
+
     def calculate_present_value_of_free_cash_flow(self, data, year) -> Optional[float]:
         try:
             df = (data.get(year, {}) or {}).get('DiscountFactor', 1.0)
@@ -183,6 +223,8 @@ class FreeCashFlowCalculator(BaseCalculator):
 
     def calculate_all_fields(self, data, year, nopat=None, inc=None, bs=None, cap=None, ppe=None, wacc: float = None) -> Dict[str, Any]:
         values: Dict[str, Any] = {}
+        # Resolved once per call instead of rescanning the dataset for each discounted field
+        base_year = self.earliest_year(data)
         for name, func in self.calculated_fields.items():
             try:
                 if name in ['NOPAT', 'Depreciation', 'EBITAAdjusted']:
@@ -202,7 +244,7 @@ class FreeCashFlowCalculator(BaseCalculator):
                 elif name in ['FreeCashFlow']:
                     v = func(data, year, nopat, inc, bs, cap, ppe)
                 elif name in ['DiscountFactor']:
-                    v = func(data, year, wacc, None)  # base_year will be auto-determined
+                    v = func(data, year, wacc, base_year)
                 elif name in ['PresentValueOfFreeCashFlow']:
                     v = func(data, year)
                 else:
@@ -221,6 +263,7 @@ class FreeCashFlowCalculator(BaseCalculator):
 
     def recalculate_dependent_fields(self, data, year, changed_field, nopat=None, inc=None, bs=None, cap=None, ppe=None, wacc: float = None) -> Dict[int, Dict[str, Any]]:
         data.setdefault(year, {})
+        base_year = self.earliest_year(data)
         for name in self.dependencies.get(changed_field, []):
             if name in self.calculated_fields:
                 try:
@@ -241,7 +284,7 @@ class FreeCashFlowCalculator(BaseCalculator):
                     elif name in ['FreeCashFlow']:
                         v = self.calculated_fields[name](data, year, nopat, inc, bs, cap, ppe)
                     elif name in ['DiscountFactor']:
-                        v = self.calculated_fields[name](data, year, wacc, None)  # base_year will be auto-determined
+                        v = self.calculated_fields[name](data, year, wacc, base_year)
                     elif name in ['PresentValueOfFreeCashFlow']:
                         v = self.calculated_fields[name](data, year)
                     else:
@@ -0,0 +1,262 @@
+"""Cross-statement dependency graph for the valuation model.
+
+Every calculator declares the cells its formulas read in ``field_inputs``
+(and, for pass-through fields, ``linked_fields``).  Those declarations are
+compiled once at import into a single DAG over ``(statement, field)`` nodes
+and topologically sorted, so an edit anywhere in the model recomputes only
+its transitive dependents, each exactly once, after all of its inputs.
+
+A *model* is a dict of statement datasets keyed by statement name, each in
+the usual ``{year: {field: value}}`` shape used by the calculators.
+"""
+
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+import heapq
+import math
+import logging
+
+from .registry import calculator_registry
+
+logger = logging.getLogger(__name__)
+
+Node = Tuple[str, str]
+Cell = Tuple[str, Any, str]
+
+
+class StatementSpec:
+    """How to evaluate one statement's fields: the calculator, its field
+    facade, and the statements passed to that facade after ``field_name``."""
+
+    def __init__(self, calculator: Any, calculate_field: Callable[..., Optional[float]], sources: Tuple[str, ...] = ()):
+        self.statement = calculator.statement
+        self.calculator = calculator
+        self.calculate_field = calculate_field
+        self.sources = sources
+
+    def evaluate(self, model: Dict[str, Dict[Any, Dict[str, Any]]], year: Any, field_name: str) -> Optional[float]:
+        data = model.get(self.statement)
+        args = [model.get(source) for source in self.sources]
+        return self.calculate_field(data, year, field_name, *args)
+
+
+# Statement -> statements passed to its field facade after ``field_name``
+STATEMENT_SOURCES: List[Tuple[str, Tuple[str, ...]]] = [
+    ('income_statement', ()),
+    ('balance_sheet', ()),
+    ('capital_table', ('balance_sheet', 'capital_table', 'income_statement')),
+    ('nopat', ('capital_table', 'balance_sheet', 'income_statement')),
+    ('ppe_changes', ('balance_sheet', 'income_statement')),
+    ('free_cash_flow', ('nopat', 'income_statement', 'balance_sheet', 'capital_table', 'ppe_changes')),
+    ('roic_performance', ('income_statement', 'capital_table', 'nopat')),
+    ('financing_health', ('income_statement', 'capital_table', 'balance_sheet', 'nopat')),
+    ('income_statement_common_size', ('income_statement', 'balance_sheet', 'ppe_changes', 'cash_flow')),
+    ('balance_sheet_common_size', ('balance_sheet', 'income_statement', 'capital_table', 'free_cash_flow')),
+]
+
+STATEMENT_SPECS: List[StatementSpec] = [
+    StatementSpec(calculator_registry.get(statement), calculator_registry.calculate_field(statement), sources)
+    for statement, sources in STATEMENT_SOURCES
+]
+
+
+def _shift(year: Any, offset: int) -> Any:
+    """Move a dataset year key by ``offset`` years, keeping its type."""
+    if offset == 0:
+        return year
+    if isinstance(year, int):
+        return year + offset
+    if isinstance(year, str) and year.lstrip('-').isdigit():
+        return str(int(year) + offset)
+    return None
+
+
+class CalculatorGraph:
+    """Compiled dependency graph over every calculator's fields."""
+
+    def __init__(self, specs: Iterable[StatementSpec]):
+        self.specs: Dict[str, StatementSpec] = {}
+        # node -> list of (input node, lag in years)
+        self.inputs: Dict[Node, List[Tuple[Node, int]]] = {}
+        # node -> source node whose raw value it mirrors
+        self.links: Dict[Node, Node] = {}
+        for spec in specs:
+            self.specs[spec.statement] = spec
+            self._compile_statement(spec)
+
+        # input node -> list of (dependent node, year offset of the dependent cell)
+        self.dependents: Dict[Node, List[Tuple[Node, int]]] = {}
+        for node, refs in self.inputs.items():
+            for source, lag in refs:
+                self.dependents.setdefault(source, []).append((node, -lag))
+
+        self.order: List[Node] = self._topological_order()
+        self.rank: Dict[Node, int] = {node: i for i, node in enumerate(self.order)}
+        logger.debug(f"Compiled calculator graph: {len(self.order)} nodes, {sum(len(r) for r in self.inputs.values())} edges")
+
+    def _compile_statement(self, spec: StatementSpec) -> None:
+        calculator = spec.calculator
+        statement = spec.statement
+        for field_name, refs in getattr(calculator, 'field_inputs', {}).items():
+            if field_name not in calculator.calculated_fields:
+                raise ValueError(f"{statement}.{field_name} declares inputs but is not a calculated field")
+            self.inputs[(statement, field_name)] = [self._parse_ref(statement, ref) for ref in refs]
+        for field_name, source in getattr(calculator, 'linked_fields', {}).items():
+            if field_name not in calculator.calculated_fields:
+                raise ValueError(f"{statement}.{field_name} is linked but is not a calculated field")
+            self.links[(statement, field_name)] = source
+            self.inputs[(statement, field_name)] = [(source, 0)]
+
+    @staticmethod
+    def _parse_ref(statement: str, ref: Any) -> Tuple[Node, int]:
+        if isinstance(ref, str):
+            return (statement, ref), 0
+        if len(ref) == 2:
+            return (ref[0], ref[1]), 0
+        return (ref[0], ref[1]), ref[2]
+
+    def _topological_order(self) -> List[Node]:
+        # Kahn's algorithm; nodes are visited in declaration order for stable output
+        pending = {node: sum(1 for source, _ in refs if source in self.inputs) for node, refs in self.inputs.items()}
+        ready = [node for node, count in pending.items() if count == 0]
+        order: List[Node] = []
+        while ready:
+            node = ready.pop(0)
+            order.append(node)
+            for dependent, _ in self.dependents.get(node, []):
+                pending[dependent] -= 1
+                if pending[dependent] == 0:
+                    ready.append(dependent)
+        if len(order) != len(self.inputs):
+            cyclic = sorted(f"{s}.{f}" for (s, f), count in pending.items() if count > 0)
+            raise ValueError(f"Calculator dependencies contain a cycle through: {', '.join(cyclic)}")
+        return order
+
+    def is_calculated(self, statement: str, field_name: str) -> bool:
+        return (statement, field_name) in self.inputs
+
+    def backed_cells(self, model: Dict[str, Dict[Any, Dict[str, Any]]]) -> Set[Cell]:
+        """Calculated cells whose inputs all trace back to stored numbers.
+
+        The calculators read absent inputs as 0, so a cell with an unbacked
+        input holds a default rather than a figure.
+        """
+        known_years = set()
+        for dataset in model.values():
+            if isinstance(dataset, Mapping):
+                known_years.update(dataset.keys())
+
+        def stored(statement: str, year: Any, field_name: str) -> bool:
+            value = ((model.get(statement) or {}).get(year) or {}).get(field_name)
+            return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+        backed: Set[Cell] = set()
+        for statement, field_name in self.order:
+            refs = self.inputs[(statement, field_name)]
+            for year in known_years:
+                for (source_statement, source_field), lag in refs:
+                    source_year = _shift(year, lag)
+                    source = (source_statement, source_year, source_field)
+                    if source_year is None or not (source in backed if self.is_calculated(source_statement, source_field) else stored(*source)):
+                        break
+                else:
+                    backed.add((statement, year, field_name))
+        return backed
+
+    def evaluate(self, model: Dict[str, Dict[Any, Dict[str, Any]]], statement: str, year: Any, field_name: str) -> Optional[float]:
+        node = (statement, field_name)
+        if node in self.links:
+            source_statement, source_field = self.links[node]
+            return (model.get(source_statement) or {}).get(year, {}).get(source_field)
+        return self.specs[statement].evaluate(model, year, field_name)
+
+    def recalculate(self, model: Dict[str, Dict[Any, Dict[str, Any]]], changed_cells: Iterable[Cell]) -> Dict[Cell, Any]:
+        """Recompute every cell downstream of ``changed_cells`` in place.
+
+        ``changed_cells`` are ``(statement, year, field)`` triples whose new
+        values are already in ``model``.  Each downstream cell is evaluated
+        once, in topological order; propagation stops early along paths
+        whose value did not change.  Returns the cells that changed.
+        """
+        known_years = set()
+        for dataset in model.values():
+            if isinstance(dataset, Mapping):
+                known_years.update(dataset.keys())
+
+        heap: List[Tuple[int, int, str, Any, str]] = []
+        scheduled = set()
+        seq = 0
+
+        def schedule(statement: str, year: Any, field_name: str) -> None:
+            nonlocal seq
+            for (dep_statement, dep_field), offset in self.dependents.get((statement, field_name), []):
+                dep_year = _shift(year, offset)
+                if dep_year is None or dep_year not in known_years or dep_statement not in model:
+                    continue
+                key = (dep_statement, dep_year, dep_field)
+                if key in scheduled:
+                    continue
+                scheduled.add(key)
+                heapq.heappush(heap, (self.rank[(dep_statement, dep_field)], seq, dep_statement, dep_year, dep_field))
+                seq += 1
+
+        for statement, year, field_name in changed_cells:
+            schedule(statement, year, field_name)
+
+        changed: Dict[Cell, Any] = {}
+        while heap:
+            _, _, statement, year, field_name = heapq.heappop(heap)
+            try:
+                value = self.evaluate(model, statement, year, field_name)
+            except Exception as e:
+                logger.error(f"Error recalculating {statement}.{field_name} for year {year}: {e}")
+                continue
+            if value is None:
+                continue
+            row = model[statement].setdefault(year, {})
+            if row.get(field_name) == value and field_name in row:
+                continue
+            row[field_name] = value
+            changed[(statement, year, field_name)] = value
+            schedule(statement, year, field_name)
+        return changed
+
+    def recalculate_all(self, model: Dict[str, Dict[Any, Dict[str, Any]]], years: Optional[Iterable[Any]] = None) -> Dict[str, Dict[Any, Dict[str, Any]]]:
+        """Evaluate every calculated node for ``years`` (default: all years in the model)."""
+        if years is None:
+            years = set()
+            for dataset in model.values():
+                if isinstance(dataset, Mapping):
+                    years.update(dataset.keys())
+        years = sorted(years, key=lambda y: (not isinstance(y, int), str(y) if not isinstance(y, int) else y))
+        for statement, field_name in self.order:
+            dataset = model.get(statement)
+            if dataset is None:
+                continue
+            for year in years:
+                try:
+                    value = self.evaluate(model, statement, year, field_name)
+                except Exception as e:
+                    logger.error(f"Error calculating {statement}.{field_name} for year {year}: {e}")
+                    continue
+                if value is not None:
+                    dataset.setdefault(year, {})[field_name] = value
+        return model
+
+
+# Compiled once at import; shared by every request
+calculator_graph = CalculatorGraph(STATEMENT_SPECS)
+
+
+def recalculate_model_dependent_fields(model: Dict[str, Dict[Any, Dict[str, Any]]], year: Any, statement: str, changed_field: str) -> Dict[str, Dict[Any, Dict[str, Any]]]:
+    calculator_graph.recalculate(model, [(statement, year, changed_field)])
+    return model
+
+
+def recalculate_model_dependent_fields_batch(model: Dict[str, Dict[Any, Dict[str, Any]]], changed_cells: Iterable[Cell]) -> Dict[Cell, Any]:
+    """Coalesce many edited ``(statement, year, field)`` cells into one recalculation pass."""
+    return calculator_graph.recalculate(model, changed_cells)
+
+
+def update_model_calculations(model: Dict[str, Dict[Any, Dict[str, Any]]], years: Optional[Iterable[Any]] = None) -> Dict[str, Dict[Any, Dict[str, Any]]]:
+    return calculator_graph.recalculate_all(model, years)
@@ -6,6 +6,8 @@ logger = logging.getLogger(__name__)
 
 
 class IncomeStatementCalculator(BaseCalculator):
+    statement = 'income_statement'
+
     def __init__(self):
         self.calculated_fields = {
             'GrossIncome': self.calculate_gross_income,
@@ -29,6 +31,17 @@ class IncomeStatementCalculator(BaseCalculator):
             'NetIncomeNoncontrolling': ['NetIncome'],
         }
 
+        # Cells read by each formula; compiled into the cross-statement graph (see graph.py)
+        self.field_inputs = {
+            'GrossIncome': ['Revenue', 'CostOfRevenue'],
+            'OperatingExpense': ['SellingGeneralAdministrative', 'Depreciation'],
+            'OperatingIncome': ['GrossIncome', 'SellingGeneralAdministrative', 'Depreciation'],
+            'NetNonOperatingInterestIncome': ['InterestExpense', 'InterestIncome', 'OtherIncome'],
+            'PretaxIncome': ['OperatingIncome', 'InterestExpense', 'InterestIncome', 'OtherIncome'],
+            'ProfitLossControlling': ['PretaxIncome', 'TaxProvision'],
+            'NetIncome': ['ProfitLossControlling', 'NetIncomeNoncontrolling'],
+        }
+
     def calculate_gross_income(self, data: Dict[Any, Dict[str, Any]], year: Any) -> Optional[float]:
         try:
             y = data.get(year, {})
@@ -6,6 +6,8 @@ logger = logging.getLogger(__name__)
 
 
 class IncomeStatementCommonSizeCalculator(BaseCalculator):
+    statement = 'income_statement_common_size'
+
     def __init__(self):
         self.calculated_fields = {
             'RevenueAsPercentOfRevenue': self.calculate_revenue_as_percent_of_revenue,
@@ -61,6 +63,26 @@ class IncomeStatementCommonSizeCalculator(BaseCalculator):
             'CommonStockDividendPayment': ['CommonStockDividendPaymentAsPercentOfNetIncome'],
         }
 
+        # Cells read by each formula; compiled into the cross-statement graph (see graph.py)
+        self.field_inputs = {
+            'RevenueAsPercentOfRevenue': [],
+            'GrossMarginAsPercentOfRevenue': [('income_statement', 'GrossIncome'), ('income_statement', 'Revenue')],
+            'SGAAsPercentOfRevenue': [('income_statement', 'SellingGeneralAdministrative'), ('income_statement', 'Revenue')],
+            'DepreciationAsPercentOfLastYearPPE': [('income_statement', 'Depreciation'), ('ppe_changes', 'PPEBeginningOfYear')],
+            'CapitalExpendituresAsPercentOfRevenue': [('ppe_changes', 'CapitalExpenditures'), ('income_statement', 'Revenue')],
+            'UnexplainedChangesInPPEAsPercentOfRevenue': [('ppe_changes', 'UnexplainedChangesInPPE'), ('income_statement', 'Revenue')],
+            'TaxProvisionAsPercentOfPretaxIncome': [('income_statement', 'TaxProvision'), ('income_statement', 'PretaxIncome')],
+            'InterestExpenseAsPercentOfTotalLongTermDebt': [
+                ('income_statement', 'InterestExpense'),
+                ('balance_sheet', 'LongTermDebtCurrent', -1), ('balance_sheet', 'LongTermDebtNoncurrent', -1),
+            ],
+            'InterestIncomeAsPercentOfExcessCash': [('income_statement', 'InterestIncome'), ('balance_sheet', 'ExcessCash', -1)],
+            'CommonStockDividendPaymentAsPercentOfNetIncome': [('cash_flow', 'CommonStockDividendPayment'), ('income_statement', 'NetIncome')],
+        }
+        for name in self.calculated_fields:
+            if name.endswith('AsPercentOfRevenue') and name not in self.field_inputs:
+                self.field_inputs[name] = [('income_statement', name[:-len('AsPercentOfRevenue')]), ('income_statement', 'Revenue')]
+
     def _num(self, v: Any) -> float:
         return self.to_number(v)
 
@@ -0,0 +1,158 @@
+"""Opt-in per-field call counts and timings for the calculators.
+
+While enabled, every entry of a calculator's ``calculated_fields`` is
+swapped for a wrapper that records, per ``(statement, field)``, how often
+it ran, the cumulative wall time, how often it returned ``None`` and how
+many errors it raised or logged.  Calculators swallow their exceptions
+into ``logger.error``, so errors are counted by a logging handler that
+attributes ERROR records to the field being evaluated at the time.
+
+Disabled (the default) the original bound methods are back in place and
+nothing is paid per call.  Turn it on with ``CALCULATOR_INSTRUMENTATION``
+in settings, the debug endpoint or ``enable_instrumentation()``.  Timings are inclusive
+and per process; the vectorized engine does not go through the per-field
+functions and is not counted.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+import threading
+import time
+
+Node = Tuple[str, str]
+
+# node -> [calls, seconds, errors, none results]
+_stats: Dict[Node, List[Any]] = {}
+_lock = threading.Lock()
+_current = threading.local()
+_enabled = False
+
+SORT_KEYS = ('total_ms', 'calls', 'mean_us', 'errors', 'none_results')
+
+
+def _counters(node: Node) -> List[Any]:
+    counters = _stats.get(node)
+    if counters is None:
+        with _lock:
+            counters = _stats.setdefault(node, [0, 0.0, 0, 0])
+    return counters
+
+
+def _record(node: Node, seconds: float, result: Any, failed: bool) -> None:
+    counters = _counters(node)
+    with _lock:
+        counters[0] += 1
+        counters[1] += seconds
+        if failed:
+            counters[2] += 1
+        elif result is None:
+            counters[3] += 1
+
+
+def _call(node: Node, func: Callable[..., Any], args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Any:
+    previous = getattr(_current, 'node', None)
+    _current.node = node
+    started = time.perf_counter()
+    try:
+        result = func(*args, **kwargs)
+    except Exception:
+        _record(node, time.perf_counter() - started, None, True)
+        raise
+    finally:
+        _current.node = previous
+    _record(node, time.perf_counter() - started, result, False)
+    return result
+
+
+def timed_field(statement: str, field_name: str, func: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap one field formula so each call is recorded under ``(statement, field_name)``."""
+    node = (statement, field_name)
+
+    def timed(*args, **kwargs):
+        return _call(node, func, args, kwargs)
+
+    timed.__wrapped__ = func
+    return timed
+
+
+def timed_dispatch(statement: str, func: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap a ``(field_name, ...)`` dispatcher so each call is recorded under its field."""
+    def timed(field_name, *args, **kwargs):
+        return _call((statement, field_name), func, (field_name,) + args, kwargs)
+
+    timed.__wrapped__ = func
+    return timed
+
+
+class _ErrorCounter(logging.Handler):
+    """Counts ERROR records logged while a timed field is running."""
+
+    def __init__(self):
+        super().__init__(logging.ERROR)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        node = getattr(_current, 'node', None)
+        if node is not None:
+            counters = _counters(node)
+            with _lock:
+                counters[2] += 1
+
+
+_error_counter = _ErrorCounter()
+_calculators_logger = logging.getLogger(__package__)
+
+
+def instrumentation_enabled() -> bool:
+    return _enabled
+
+
+def enable_instrumentation() -> None:
+    """Instrument every registered calculator (importing any not yet loaded)."""
+    global _enabled
+    from .registry import calculator_registry
+
+    for statement in calculator_registry:
+        calculator_registry.get(statement).instrument()
+    if _error_counter not in _calculators_logger.handlers:
+        _calculators_logger.addHandler(_error_counter)
+    _enabled = True
+
+
+def disable_instrumentation() -> None:
+    """Put the original formulas back; recorded stats are kept until ``reset_calculator_stats()``."""
+    global _enabled
+    from .registry import calculator_registry
+
+    for statement in calculator_registry:
+        if calculator_registry.is_loaded(statement):
+            calculator_registry.get(statement).uninstrument()
+    _calculators_logger.removeHandler(_error_counter)
+    _enabled = False
+
+
+def reset_calculator_stats() -> None:
+    with _lock:
+        _stats.clear()
+
+
+def calculator_stats(sort: str = 'total_ms', top: Optional[int] = None, statement: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Recorded stats as rows, slowest (or ``sort``-largest) first."""
+    if sort not in SORT_KEYS:
+        raise ValueError(f"sort must be one of: {', '.join(SORT_KEYS)}")
+    with _lock:
+        items = [(node, list(counters)) for node, counters in _stats.items()]
+    rows = []
+    for (node_statement, field_name), (calls, seconds, errors, none_results) in items:
+        if statement and node_statement != statement:
+            continue
+        rows.append({
+            'statement': node_statement,
+            'field': field_name,
+            'calls': calls,
+            'total_ms': seconds * 1e3,
+            'mean_us': seconds / calls * 1e6 if calls else 0.0,
+            'errors': errors,
+            'none_results': none_results,
+        })
+    rows.sort(key=lambda row: (-row[sort], row['statement'], row['field']))
+    return rows[:top] if top else rows
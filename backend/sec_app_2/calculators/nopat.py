@@ -6,6 +6,8 @@ logger = logging.getLogger(__name__)
 
 
 class NOPATCalculator(BaseCalculator):
+    statement = 'nopat'
+
     def __init__(self):
         self.calculated_fields = {
             'Revenue': self.get_income_statement_field,
@@ -32,6 +34,24 @@ class NOPATCalculator(BaseCalculator):
             'TaxProvision': ['NOPAT'],
         }
 
+        # Cells read by each formula; compiled into the cross-statement graph (see graph.py)
+        self.field_inputs = {
+            'EBITA_Unadjusted': ['Revenue', 'CostOfRevenue', 'SellingGeneralAndAdministration', 'Depreciation'],
+            'OperatingLeaseInterest': [('capital_table', 'OperatingLeaseLiabilities', -1), ('income_statement', 'LeasesDiscountRate')],
+            'VariableLeaseInterest': [('balance_sheet', 'VariableLeaseAssets'), 'LeasesDiscountRate'],
+            'EBITAAdjusted': ['EBITA_Unadjusted', 'OperatingLeaseInterest', 'VariableLeaseInterest'],
+            'NOPAT': ['EBITAAdjusted', 'TaxProvision'],
+        }
+
+        # Pass-through fields mirror the income statement cell they are named after
+        self.linked_fields = {
+            'Revenue': ('income_statement', 'Revenue'),
+            'CostOfRevenue': ('income_statement', 'CostOfRevenue'),
+            'SellingGeneralAndAdministration': ('income_statement', 'SellingGeneralAdministrative'),
+            'Depreciation': ('income_statement', 'Depreciation'),
+            'TaxProvision': ('income_statement', 'TaxProvision'),
+        }
+
     def get_income_statement_field(self, data: Dict[int, Dict[str, Any]], year: int, field_name: str = None) -> Optional[float]:
         return (data or {}).get(year, {}).get(field_name, 0)
 
@@ -126,8 +146,14 @@ class NOPATCalculator(BaseCalculator):
         values: Dict[str, Any] = {}
         for name, func in self.calculated_fields.items():
             try:
-                if name in ['OperatingLeaseInterest', 'VariableLeaseInterest', 'EBITAAdjusted', 'NOPAT']:
+                if name == 'OperatingLeaseInterest':
+                    v = func(data, year, capital_data, income_statement_data)
+                elif name == 'VariableLeaseInterest':
+                    v = func(data, year, balance_sheet_data)
+                elif name in ['EBITAAdjusted', 'NOPAT']:
                     v = func(data, year, capital_data, balance_sheet_data, income_statement_data)
+                elif name == 'EBITA_Unadjusted':
+                    v = func(data, year)
                 else:
                     v = func(data, year, name)
                 if v is not None:
@@ -147,8 +173,14 @@ class NOPATCalculator(BaseCalculator):
         for name in self.dependencies.get(changed_field, []):
             if name in self.calculated_fields:
                 try:
-                    if name in ['OperatingLeaseInterest', 'VariableLeaseInterest', 'EBITAAdjusted', 'NOPAT']:
+                    if name == 'OperatingLeaseInterest':
+                        v = self.calculated_fields[name](data, year, capital_data, income_statement_data)
+                    elif name == 'VariableLeaseInterest':
+                        v = self.calculated_fields[name](data, year, balance_sheet_data)
+                    elif name in ['EBITAAdjusted', 'NOPAT']:
                         v = self.calculated_fields[name](data, year, capital_data, balance_sheet_data, income_statement_data)
+                    elif name == 'EBITA_Unadjusted':
+                        v = self.calculated_fields[name](data, year)
                     else:
                         v = self.calculated_fields[name](data, year, name)
                     if v is not None:
@@ -165,8 +197,14 @@ nopat_calculator = NOPATCalculator()
 
 def calculate_nopat_field(data: Dict[int, Dict[str, Any]], year: int, field_name: str, capital_data: Dict[int, Dict[str, Any]] = None, balance_sheet_data: Dict[int, Dict[str, Any]] = None, income_statement_data: Dict[int, Dict[str, Any]] = None) -> Optional[float]:
     if field_name in nopat_calculator.calculated_fields:
-        if field_name in ['OperatingLeaseInterest', 'VariableLeaseInterest', 'EBITAAdjusted', 'NOPAT']:
+        if field_name == 'OperatingLeaseInterest':
+            return nopat_calculator.calculated_fields[field_name](data, year, capital_data, income_statement_data)
+        if field_name == 'VariableLeaseInterest':
+            return nopat_calculator.calculated_fields[field_name](data, year, balance_sheet_data)
+        if field_name in ['EBITAAdjusted', 'NOPAT']:
             return nopat_calculator.calculated_fields[field_name](data, year, capital_data, balance_sheet_data, income_statement_data)
+        if field_name == 'EBITA_Unadjusted':
+            return nopat_calculator.calculated_fields[field_name](data, year)
         return nopat_calculator.calculated_fields[field_name](data, year, field_name)
     logger.warning(f"Field {field_name} is not a calculated NOPAT field")
     return None
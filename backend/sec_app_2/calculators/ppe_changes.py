@@ -6,6 +6,8 @@ logger = logging.getLogger(__name__)
 
 
 class PPEChangesCalculator(BaseCalculator):
+    statement = 'ppe_changes'
+
     def __init__(self):
         self.calculated_fields = {
             'PPEBeginningOfYear': self.calculate_ppe_beginning_of_year,
@@ -23,6 +25,15 @@ class PPEChangesCalculator(BaseCalculator):
             'PPEEndOfYear': ['UnexplainedChangesInPPE'],
         }
 
+        # Cells read by each formula; compiled into the cross-statement graph (see graph.py)
+        self.field_inputs = {
+            'PPEBeginningOfYear': [('balance_sheet', 'PropertyPlantAndEquipment', -1)],
+            'CapitalExpenditures': [('balance_sheet', 'CapitalExpenditures')],
+            'Depreciation': [('income_statement', 'Depreciation')],
+            'UnexplainedChangesInPPE': [('balance_sheet', 'PropertyPlantAndEquipment'), 'PPEBeginningOfYear', 'CapitalExpenditures', 'Depreciation'],
+            'PPEEndOfYear': [('balance_sheet', 'PropertyPlantAndEquipment')],
+        }
+
     def get_balance_sheet_field(self, data: Dict[int, Dict[str, Any]], year: int, field_name: str) -> float:
         return self.get_field(data, year, field_name)
 
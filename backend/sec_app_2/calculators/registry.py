@@ -0,0 +1,68 @@
+"""Calculators looked up by statement name, imported on first use.
+
+Each statement maps to the module that defines its calculator instance and
+its ``calculate_<statement>_field`` facade.  Nothing is imported until a
+statement is asked for, so importing the package does not pay for all ten
+calculator modules.
+"""
+
+from importlib import import_module
+from typing import Any, Callable, Dict, Iterator, Tuple
+import threading
+
+# statement -> (module, calculator instance, field facade)
+CALCULATORS: Dict[str, Tuple[str, str, str]] = {
+    'income_statement': ('income_statement', 'income_statement_calculator', 'calculate_income_statement_field'),
+    'balance_sheet': ('balance_sheet', 'balance_sheet_calculator', 'calculate_balance_sheet_field'),
+    'capital_table': ('capital_table', 'financial_breakdown_calculator', 'calculate_financial_breakdown_field'),
+    'nopat': ('nopat', 'nopat_calculator', 'calculate_nopat_field'),
+    'ppe_changes': ('ppe_changes', 'ppe_changes_calculator', 'calculate_ppe_changes_field'),
+    'free_cash_flow': ('free_cash_flow', 'free_cash_flow_calculator', 'calculate_free_cash_flow_field'),
+    'roic_performance': ('roic_performance', 'roic_performance_calculator', 'calculate_roic_performance_field'),
+    'financing_health': ('financing_health', 'financing_health_calculator', 'calculate_financing_health_field'),
+    'income_statement_common_size': ('income_statement_common_size', 'income_statement_common_size_calculator', 'calculate_income_statement_common_size_field'),
+    'balance_sheet_common_size': ('balance_sheet_common_size', 'balance_sheet_common_size_calculator', 'calculate_balance_sheet_common_size_field'),
+}
+
+
+class CalculatorRegistry:
+    def __init__(self, package: str, entries: Dict[str, Tuple[str, str, str]]):
+        self.package = package
+        self.entries = dict(entries)
+        self._loaded: Dict[str, Tuple[Any, Callable[..., Any]]] = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, statement: object) -> bool:
+        return statement in self.entries
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.entries)
+
+    def _load(self, statement: str) -> Tuple[Any, Callable[..., Any]]:
+        loaded = self._loaded.get(statement)
+        if loaded is None:
+            if statement not in self.entries:
+                raise KeyError(f"No calculator registered for statement: {statement}")
+            module_name, calculator, calculate_field = self.entries[statement]
+            with self._lock:
+                module = import_module(f'.{module_name}', self.package)
+                loaded = self._loaded[statement] = (getattr(module, calculator), getattr(module, calculate_field))
+        return loaded
+
+    def get(self, statement: str) -> Any:
+        """The statement's calculator instance."""
+        return self._load(statement)[0]
+
+    def calculate_field(self, statement: str) -> Callable[..., Any]:
+        """The statement's ``calculate_<statement>_field`` facade."""
+        return self._load(statement)[1]
+
+    def is_loaded(self, statement: str) -> bool:
+        return statement in self._loaded
+
+
+calculator_registry = CalculatorRegistry(__package__, CALCULATORS)
+
+
+def get_calculator(statement: str) -> Any:
+    return calculator_registry.get(statement)
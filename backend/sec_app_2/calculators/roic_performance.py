@@ -6,6 +6,8 @@ logger = logging.getLogger(__name__)
 
 
 class ROICPerformanceCalculator(BaseCalculator):
+    statement = 'roic_performance'
+
     def __init__(self):
         self.calculated_fields = {
             'CostOfRevenueAsPercentOfRevenue': self.calculate_cost_of_revenue_as_percent_of_revenue,
@@ -37,6 +39,29 @@ class ROICPerformanceCalculator(BaseCalculator):
             'NOPAT': ['ReturnOnInvestedCapitalExcludingGoodwill', 'ReturnOnInvestedCapitalIncludingGoodwill'],
         }
 
+        # Cells read by each formula; compiled into the cross-statement graph (see graph.py)
+        self.field_inputs = {
+            'CostOfRevenueAsPercentOfRevenue': [('income_statement', 'CostOfRevenue'), ('income_statement', 'Revenue')],
+            'SellingGeneralAndAdministrationAsPercentOfRevenue': [('income_statement', 'SellingGeneralAdministrative'), ('income_statement', 'Revenue')],
+            'OperatingProfitAsPercentOfRevenue': [('income_statement', 'OperatingIncome'), ('income_statement', 'Revenue')],
+            'WorkingCapitalAsPercentOfRevenue': [('capital_table', 'OperatingWorkingCapital'), ('income_statement', 'Revenue')],
+            'FixedAssetsAsPercentOfRevenue': [
+                ('capital_table', 'PropertyPlantAndEquipment'), ('capital_table', 'OperatingLeaseAssets'),
+                ('capital_table', 'VariableLeaseAssets'), ('capital_table', 'FinanceLeaseAssets'), ('income_statement', 'Revenue'),
+            ],
+            'OtherAssetsAsPercentOfRevenue': [('capital_table', 'OtherAssetsNetOtherLiabilities'), ('income_statement', 'Revenue')],
+            'PretaxReturnOnInvestedCapital': [('income_statement', 'OperatingIncome'), ('capital_table', 'InvestedCapitalExcludingGoodwill')],
+            'ReturnOnInvestedCapitalExcludingGoodwill': [
+                ('nopat', 'NOPAT'), ('capital_table', 'InvestedCapitalExcludingGoodwill'), ('capital_table', 'InvestedCapitalExcludingGoodwill', -1),
+            ],
+            'GoodwillAsPercentOfInvestedCapital': [
+                ('capital_table', 'Goodwill'), ('capital_table', 'InvestedCapitalExcludingGoodwill'), ('capital_table', 'InvestedCapitalExcludingGoodwill', -1),
+            ],
+            'ReturnOnInvestedCapitalIncludingGoodwill': [
+                ('nopat', 'NOPAT'), ('capital_table', 'InvestedCapitalIncludingGoodwill'), ('capital_table', 'InvestedCapitalIncludingGoodwill', -1),
+            ],
+        }
+
     def _num(self, v: Any) -> float:
         return self.to_number(v)
 
@@ -117,8 +142,10 @@ class ROICPerformanceCalculator(BaseCalculator):
                     v = func(data, year, inc, cap)
                 elif name in ['GoodwillAsPercentOfInvestedCapital']:
                     v = func(data, year, cap)
-                elif name in ['ReturnOnInvestedCapitalExcludingGoodwill', 'ReturnOnInvestedCapitalIncludingGoodwill']:
+                elif name == 'ReturnOnInvestedCapitalExcludingGoodwill':
                     v = func(data, year, inc, cap, nopat)
+                elif name == 'ReturnOnInvestedCapitalIncludingGoodwill':
+                    v = func(data, year, cap, nopat)
                 else:
                     v = func(data, year)
                 if v is not None:
@@ -144,8 +171,10 @@ class ROICPerformanceCalculator(BaseCalculator):
                         v = self.calculated_fields[name](data, year, inc, cap)
                     elif name in ['GoodwillAsPercentOfInvestedCapital']:
                         v = self.calculated_fields[name](data, year, cap)
-                    elif name in ['ReturnOnInvestedCapitalExcludingGoodwill', 'ReturnOnInvestedCapitalIncludingGoodwill']:
+                    elif name == 'ReturnOnInvestedCapitalExcludingGoodwill':
                         v = self.calculated_fields[name](data, year, inc, cap, nopat)
+                    elif name == 'ReturnOnInvestedCapitalIncludingGoodwill':
+                        v = self.calculated_fields[name](data, year, cap, nopat)
                     else:
                         v = self.calculated_fields[name](data, year)
                     if v is not None:
@@ -169,8 +198,10 @@ def calculate_roic_performance_field(data, year, field_name, inc=None, cap=None,
             return calc(data, year, inc, cap)
         elif field_name in ['GoodwillAsPercentOfInvestedCapital']:
             return calc(data, year, cap)
-        elif field_name in ['ReturnOnInvestedCapitalExcludingGoodwill', 'ReturnOnInvestedCapitalIncludingGoodwill']:
+        elif field_name == 'ReturnOnInvestedCapitalExcludingGoodwill':
             return calc(data, year, inc, cap, nopat)
+        elif field_name == 'ReturnOnInvestedCapitalIncludingGoodwill':
+            return calc(data, year, cap, nopat)
         else:
             return calc(data, year)
     logger.warning(f"Field {field_name} is not a calculated ROIC performance field")
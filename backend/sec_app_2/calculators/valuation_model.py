@@ -0,0 +1,160 @@
+"""Whole-model helpers shared by the valuation model endpoints.
+
+A request carries the raw statement datasets for one ticker (JSON, so year
+keys arrive as strings) plus a list of cell edits.  These helpers turn that
+payload into a calculator model with integer years, apply the edits and
+serialize the result back to JSON-friendly year keys.
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import math
+
+from .aliases import normalize_dataset
+from .graph import calculator_graph, Cell
+
+Model = Dict[str, Dict[Any, Dict[str, Any]]]
+
+# Statements the calculators produce, in dependency order
+DERIVED_STATEMENTS: Tuple[str, ...] = tuple(calculator_graph.specs)
+# Raw-only statements read by the calculators
+SOURCE_STATEMENTS: Tuple[str, ...] = ('cash_flow',)
+MODEL_STATEMENTS: Tuple[str, ...] = DERIVED_STATEMENTS + SOURCE_STATEMENTS
+
+
+def _input_fields() -> Dict[str, Set[str]]:
+    fields: Dict[str, Set[str]] = {statement: set() for statement in MODEL_STATEMENTS}
+    for refs in calculator_graph.inputs.values():
+        for (statement, field_name), _ in refs:
+            if not calculator_graph.is_calculated(statement, field_name) and statement in fields:
+                fields[statement].add(field_name)
+    return fields
+
+
+# Raw (non-calculated) fields each statement contributes to the calculators
+INPUT_FIELDS: Dict[str, Set[str]] = _input_fields()
+# Raw field -> statements that read it
+STATEMENTS_BY_INPUT: Dict[str, Tuple[str, ...]] = {}
+for _statement, _fields in INPUT_FIELDS.items():
+    for _field_name in _fields:
+        STATEMENTS_BY_INPUT[_field_name] = STATEMENTS_BY_INPUT.get(_field_name, ()) + (_statement,)
+
+
+def statements_from_metrics(rows: Iterable[Tuple[Any, str, Any]]) -> Dict[str, Dict[Any, Dict[str, Any]]]:
+    """Group flat ``(period, metric_name, value)`` rows into statement datasets.
+
+    Stored metrics carry no statement, so each one is placed in every
+    statement that reads it as a raw input; other metrics and non-year
+    periods are dropped.
+    """
+    statements: Dict[str, Dict[Any, Dict[str, Any]]] = {}
+    for period, metric_name, value in rows:
+        # Skip non-year columns such as AVG/CAGR stored next to the years
+        if not isinstance(coerce_year(period), int):
+            continue
+        for statement in STATEMENTS_BY_INPUT.get(metric_name, ()):
+            statements.setdefault(statement, {}).setdefault(period, {})[metric_name] = value
+    return statements
+
+
+def derived_cells(model: Model, years: Optional[Iterable[Any]] = None) -> Iterator[Tuple[str, Any, str, float]]:
+    """Yield ``(statement, year, field, value)`` for every finite calculated cell
+    backed by stored inputs; cells that read an absent input are skipped."""
+    wanted = set(years) if years is not None else None
+    backed = calculator_graph.backed_cells(model)
+    for statement in DERIVED_STATEMENTS:
+        for year, fields in model.get(statement, {}).items():
+            if wanted is not None and year not in wanted:
+                continue
+            for field_name, value in fields.items():
+                if (statement, year, field_name) not in backed:
+                    continue
+                try:
+                    value = float(value)
+                except (TypeError, ValueError):
+                    continue
+                if math.isfinite(value):
+                    yield statement, year, field_name, value
+
+
+def coerce_year(year: Any) -> Any:
+    """JSON year keys ('2023') become ints so prior-year lookups work."""
+    if isinstance(year, int):
+        return year
+    if isinstance(year, str) and year.strip().lstrip('-').isdigit():
+        return int(year)
+    return year
+
+
+def build_model(statements: Dict[str, Any]) -> Model:
+    """Build a model from the known statements of a request payload.
+
+    Unknown statements are ignored; every derived statement is present
+    (possibly empty) so the calculators have somewhere to write.
+    """
+    if not isinstance(statements, dict):
+        raise ValueError("statements must be an object keyed by statement name")
+    model: Model = {}
+    for statement in MODEL_STATEMENTS:
+        dataset = statements.get(statement) or {}
+        if not isinstance(dataset, dict):
+            raise ValueError(f"{statement} must be an object keyed by year")
+        rows = {coerce_year(year): fields if isinstance(fields, dict) else dict(fields or {}) for year, fields in dataset.items()}
+        # Rows are fresh per request, so aliases are added without copying them
+        model[statement] = normalize_dataset(rows, in_place=True)
+    return model
+
+
+def apply_edits(model: Model, edits: Iterable[Dict[str, Any]], default_statement: str = 'income_statement') -> List[Cell]:
+    """Write ``{statement, year, field, value}`` edits into ``model``; return the edited cells.
+
+    The whole batch is validated before any edit is written, so a rejected
+    batch leaves ``model`` untouched.
+    """
+    writes: List[Tuple[Cell, Any]] = []
+    for edit in edits or []:
+        if not isinstance(edit, dict):
+            raise ValueError("Each edit must be an object with statement, year, field and value")
+        statement = edit.get('statement', default_statement)
+        year = coerce_year(edit.get('year'))
+        field_name = edit.get('field')
+        if not isinstance(statement, str) or statement not in model:
+            raise ValueError(f"Unknown statement: {statement}")
+        if not isinstance(year, (int, str)) or not isinstance(field_name, str) or not field_name:
+            raise ValueError("Each edit requires year and field")
+        writes.append(((statement, year, field_name), edit.get('value')))
+    for (statement, year, field_name), value in writes:
+        model[statement].setdefault(year, {})[field_name] = value
+    return [cell for cell, _ in writes]
+
+
+def serialize_model(model: Model, statements: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    names = statements if statements is not None else model.keys()
+    return {
+        statement: {str(year): dict(fields) for year, fields in sorted(model.get(statement, {}).items(), key=lambda item: str(item[0]))}
+        for statement in names
+    }
+
+
+def serialize_changes(changed: Dict[Cell, Any]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """``{(statement, year, field): value}`` -> ``{statement: {year: {field: value}}}``."""
+    result: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for (statement, year, field_name), value in changed.items():
+        result.setdefault(statement, {}).setdefault(str(year), {})[field_name] = value
+    return result
+
+
+def recalculate_edits(model: Model, edits: Iterable[Dict[str, Any]], default_statement: str = 'income_statement') -> Dict[Cell, Any]:
+    """Apply ``edits`` and recompute only their downstream cells; return the cells that changed."""
+    cells = apply_edits(model, edits, default_statement)
+    return calculator_graph.recalculate(model, cells)
+
+
+def recompute_model(model: Model, edits: Optional[Iterable[Dict[str, Any]]] = None, years: Optional[Iterable[Any]] = None) -> Model:
+    """Apply ``edits`` and evaluate every calculator, in dependency order, in one pass."""
+    # numpy is imported with the engine, on the first full recompute rather than at startup
+    from .vectorized import update_model_calculations_vectorized
+
+    apply_edits(model, edits)
+    if years is not None:
+        years = [coerce_year(year) for year in years]
+    return update_model_calculations_vectorized(model, years)
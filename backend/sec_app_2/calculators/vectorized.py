@@ -0,0 +1,470 @@
+"""Vectorized all-years engine for the valuation model.
+
+Alternative to ``CalculatorGraph.recalculate_all``: every statement is
+loaded into a dense ``years x fields`` float64 matrix (NaN for missing)
+and each formula is evaluated once as an array expression over all years,
+in the graph's topological order.  Prior-year terms are shifted columns.
+
+Results match the scalar calculators field for field, including their
+"skip" cases (a scalar ``None`` is NaN here and is never written back).
+"""
+
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import logging
+
+import numpy as np
+
+from .graph import CalculatorGraph, calculator_graph
+
+logger = logging.getLogger(__name__)
+
+# Cell states in StatementMatrix.state
+NUMBER, MISSING, NONE, INVALID = 0, 1, 2, 3
+
+
+class StatementMatrix:
+    """One statement as a ``(years + 1) x fields`` matrix.
+
+    ``numbers`` holds the ``to_number`` view of ``values`` (0 for anything
+    non-numeric).  The trailing row is an all-missing pad that prior-year
+    lookups fall back to when ``year - 1`` is not on the axis.  ``written``
+    marks the cells computed in this pass; they are copied back into the
+    dataset once, at the end.
+    """
+
+    __slots__ = ('names', 'fields', 'keys', 'values', 'numbers', 'state', 'written', 'rows_written')
+
+    def __init__(self, dataset: Dict[int, Dict[str, Any]], years: List[int], fields: Iterable[str]):
+        self.names = sorted(fields)
+        self.fields: Dict[str, int] = {name: j for j, name in enumerate(self.names)}
+        self.keys = set(dataset.keys())
+        rows = [dataset.get(year) or {} for year in years]
+        shape = (len(years) + 1, len(self.names))
+        try:
+            self.values = np.array([[row.get(name) for name in self.names] for row in rows] + [[None] * shape[1]], dtype=np.float64).reshape(shape)
+            present = np.array([[name in row for name in self.names] for row in rows] + [[False] * shape[1]], dtype=bool).reshape(shape)
+            # None (and NaN) inputs load as NaN; both are treated as None
+            self.state = np.where(present, np.where(np.isnan(self.values), NONE, NUMBER), MISSING).astype(np.int8)
+        except (TypeError, ValueError):
+            self._load_cells(rows, shape)
+        self.numbers = np.where(self.state == NUMBER, self.values, 0.0)
+        self.written = np.zeros(shape, dtype=bool)
+        self.rows_written = np.zeros(shape[0], dtype=bool)
+
+    def _load_cells(self, rows: List[Dict[str, Any]], shape: Tuple[int, int]) -> None:
+        # Slow path for datasets holding non-numeric strings
+        self.values = np.full(shape, np.nan)
+        self.state = np.full(shape, MISSING, dtype=np.int8)
+        for i, row in enumerate(rows):
+            for name, j in self.fields.items():
+                if name not in row:
+                    continue
+                value = row[name]
+                try:
+                    number = float(value) if value is not None else np.nan
+                except (TypeError, ValueError):
+                    self.state[i, j] = INVALID
+                    continue
+                self.values[i, j] = number
+                self.state[i, j] = NONE if np.isnan(number) else NUMBER
+
+    def set_column(self, j: int, idx: np.ndarray, result: np.ndarray) -> None:
+        self.values[idx, j] = result
+        self.numbers[idx, j] = result
+        self.state[idx, j] = NUMBER
+        self.written[idx, j] = True
+        self.rows_written[idx] = True
+
+    def write_back(self, dataset: Dict[int, Dict[str, Any]], years: List[int]) -> None:
+        for i in np.flatnonzero(self.written.any(axis=1)).tolist():
+            cols = np.flatnonzero(self.written[i]).tolist()
+            dataset.setdefault(years[i], {}).update(zip([self.names[j] for j in cols], self.values[i, cols].tolist()))
+
+
+class ModelFrame:
+    """Per-call evaluation context handed to every vectorized formula."""
+
+    def __init__(self, model: Dict[str, Dict[int, Dict[str, Any]]], years: List[int], write: np.ndarray, fields: Dict[str, Iterable[str]]):
+        self.model = model
+        self.years = years
+        # Years being recalculated; other years keep their stored values
+        self.write = write
+        self.year_array = np.array(years, dtype=np.int64)
+        position = {year: i for i, year in enumerate(years)}
+        pad = len(years)
+        # Same-year reads are a basic slice (a view); prior-year reads index through ``rows``
+        self.current = slice(0, len(years))
+        self.rows = {-1: np.array([position.get(year - 1, pad) for year in years], dtype=np.int64)}
+        self.zeros = np.zeros(len(years))
+        self.zeros.flags.writeable = False
+
+        self.matrices: Dict[str, StatementMatrix] = {}
+        for statement, dataset in model.items():
+            if isinstance(dataset, Mapping):
+                self.matrices[statement] = StatementMatrix(dataset, years, fields.get(statement, ()))
+
+    def present(self, statement: str) -> bool:
+        """Whether the dataset holds any row yet; calculators skip empty ones."""
+        matrix = self.matrices.get(statement)
+        return matrix is not None and (bool(matrix.keys) or bool(matrix.rows_written.any()))
+
+    def row_years(self, statement: str) -> set:
+        matrix = self.matrices[statement]
+        return matrix.keys | {self.years[i] for i in np.flatnonzero(matrix.rows_written).tolist()}
+
+    def _rows(self, lag: int) -> Any:
+        return self.current if lag == 0 else self.rows[lag]
+
+    def num(self, statement: str, field_name: str, lag: int = 0) -> np.ndarray:
+        """Column coerced like ``BaseCalculator.to_number`` (anything non-numeric is 0)."""
+        matrix = self.matrices.get(statement)
+        j = matrix.fields.get(field_name) if matrix is not None else None
+        if j is None:
+            return self.zeros
+        return matrix.numbers[self._rows(lag), j]
+
+    def strict(self, statement: str, field_name: str, lag: int = 0, default: float = 0.0) -> np.ndarray:
+        """Column read like ``float(y.get(key, default))``: missing is ``default``, None/invalid is NaN."""
+        matrix = self.matrices.get(statement)
+        j = matrix.fields.get(field_name) if matrix is not None else None
+        if j is None:
+            return np.full(len(self.years), default)
+        rows = self._rows(lag)
+        state = matrix.state[rows, j]
+        return np.where(state == NUMBER, matrix.values[rows, j], np.where(state == MISSING, default, np.nan))
+
+    def store(self, statement: str, field_name: str, result: np.ndarray) -> None:
+        matrix = self.matrices[statement]
+        idx = np.flatnonzero(self.write & ~np.isnan(result))
+        if idx.size:
+            matrix.set_column(matrix.fields[field_name], idx, result[idx])
+
+
+def _ratio(num: np.ndarray, den: np.ndarray, scale: float) -> np.ndarray:
+    safe = np.where(den == 0, 1.0, den)
+    return np.where(den == 0, 0.0, (num / safe) * scale)
+
+
+Formula = Tuple[Tuple[str, ...], Callable[[ModelFrame], np.ndarray]]
+
+IS, BS, CAP, NOPAT, PPE, FCF = 'income_statement', 'balance_sheet', 'capital_table', 'nopat', 'ppe_changes', 'free_cash_flow'
+ROIC, FH, ISCS, BSCS, CF = 'roic_performance', 'financing_health', 'income_statement_common_size', 'balance_sheet_common_size', 'cash_flow'
+
+
+def _sum(*columns: np.ndarray) -> np.ndarray:
+    total = columns[0]
+    for column in columns[1:]:
+        total = total + column
+    return total
+
+
+def _change(c: ModelFrame, statement: str, field_name: str) -> np.ndarray:
+    return c.num(statement, field_name) - c.num(statement, field_name, -1)
+
+
+def _decrease(c: ModelFrame, statement: str, field_name: str) -> np.ndarray:
+    return c.num(statement, field_name, -1) - c.num(statement, field_name)
+
+
+def _net_other_noncurrent_change(c: ModelFrame) -> np.ndarray:
+    cur = c.num(BS, 'OtherAssetsNoncurrent') - c.num(BS, 'OtherLiabilitiesNoncurrent')
+    prior = c.num(BS, 'OtherAssetsNoncurrent', -1) - c.num(BS, 'OtherLiabilitiesNoncurrent', -1)
+    return cur - prior
+
+
+def _operating_lease_interest(c: ModelFrame) -> np.ndarray:
+    if not c.present(CAP) or not c.present(IS):
+        return np.zeros(len(c.years))
+    return c.strict(CAP, 'OperatingLeaseLiabilities', -1) * c.strict(IS, 'LeasesDiscountRate') / 100
+
+
+def _variable_lease_interest(c: ModelFrame) -> np.ndarray:
+    if not c.present(BS):
+        return np.zeros(len(c.years))
+    return c.strict(BS, 'VariableLeaseAssets') * c.strict(NOPAT, 'LeasesDiscountRate') / 100
+
+
+def _ebita_adjusted(c: ModelFrame) -> np.ndarray:
+    op_li = np.nan_to_num(_operating_lease_interest(c), nan=0.0)
+    var_li = np.nan_to_num(_variable_lease_interest(c), nan=0.0)
+    return c.strict(NOPAT, 'EBITA_Unadjusted') + op_li + var_li
+
+
+def _gross_cash_flow(c: ModelFrame) -> np.ndarray:
+    return c.num(NOPAT, 'NOPAT') + c.num(NOPAT, 'Depreciation')
+
+
+def _free_cash_flow(c: ModelFrame) -> np.ndarray:
+    def either(present: bool, column: Callable[[], np.ndarray]) -> np.ndarray:
+        return column() if present else np.zeros(len(c.years))
+
+    bs, cap = c.present(BS), c.present(CAP)
+    gcf = either(c.present(NOPAT), lambda: _gross_cash_flow(c))
+    return (
+        gcf + c.num(IS, 'InterestIncome') + c.num(IS, 'OtherIncome') + c.num(IS, 'ForeignCurrencyAdjustment')
+        - either(cap, lambda: _change(c, CAP, 'OperatingWorkingCapital'))
+        - either(bs, lambda: _change(c, BS, 'OperatingLeaseAssets'))
+        - either(bs, lambda: _change(c, BS, 'VariableLeaseAssets'))
+        - either(bs, lambda: _change(c, BS, 'FinanceLeaseAssets'))
+        - either(bs, lambda: _change(c, BS, 'Goodwill'))
+        - either(bs, lambda: _net_other_noncurrent_change(c))
+        - c.num(FCF, 'CapitalExpenditures') - c.num(FCF, 'TaxesNonoperating')
+        - either(cap, lambda: _decrease(c, CAP, 'ExcessCash'))
+        - either(cap, lambda: _decrease(c, CAP, 'ForeignTaxCreditCarryForward'))
+        - c.num(PPE, 'UnexplainedChangesInPPE')
+    )
+
+
+def _discount_factor(c: ModelFrame) -> np.ndarray:
+    # Base year is the earliest year on the statement, as in calculate_discount_factor
+    keys = c.row_years(FCF)
+    first = np.flatnonzero(c.write)
+    if first.size:
+        keys.add(c.years[first[0]])
+    base_year = min(keys)
+    wacc = c.strict(FCF, 'WeightedAverageCostOfCapital', default=0.1)
+    # The scalar path does arithmetic on the raw cell: None and strings (numeric or not) give no factor
+    rows = c.model.get(FCF) or {}
+    for i, year in enumerate(c.years):
+        if not isinstance((rows.get(year) or {}).get('WeightedAverageCostOfCapital', 0.1), (int, float)):
+            wacc[i] = np.nan
+    order = c.year_array - base_year
+    factors = np.ones(len(c.years))
+    # pow() per discounted year keeps bit-for-bit parity with the scalar path
+    for i in np.flatnonzero(order > 0).tolist():
+        try:
+            factors[i] = 1 / ((1 + float(wacc[i])) ** int(order[i]))
+        except (ZeroDivisionError, OverflowError):
+            factors[i] = np.nan
+    return factors
+
+
+def _present_value(c: ModelFrame) -> np.ndarray:
+    return c.strict(FCF, 'DiscountFactor', default=1.0) * c.strict(FCF, 'FreeCashFlow')
+
+
+def _build_formulas() -> Dict[Tuple[str, str], Formula]:
+    f: Dict[Tuple[str, str], Formula] = {}
+
+    def pct(num_statement: str, num_field: str, den_statement: str, den_field: str, scale: float = 100.0):
+        return lambda c: _ratio(c.num(num_statement, num_field), c.num(den_statement, den_field), scale)
+
+    # Income statement
+    f[(IS, 'GrossIncome')] = ((), lambda c: c.num(IS, 'Revenue') - c.num(IS, 'CostOfRevenue'))
+    f[(IS, 'OperatingExpense')] = ((), lambda c: c.num(IS, 'SellingGeneralAdministrative') + c.num(IS, 'Depreciation'))
+    f[(IS, 'OperatingIncome')] = ((), lambda c: c.num(IS, 'GrossIncome') - c.num(IS, 'SellingGeneralAdministrative') - c.num(IS, 'Depreciation'))
+    f[(IS, 'NetNonOperatingInterestIncome')] = ((), lambda c: -c.num(IS, 'InterestExpense') + c.num(IS, 'InterestIncome') + c.num(IS, 'OtherIncome'))
+    f[(IS, 'PretaxIncome')] = ((), lambda c: c.num(IS, 'OperatingIncome') - c.num(IS, 'InterestExpense') + c.num(IS, 'InterestIncome') + c.num(IS, 'OtherIncome'))
+    f[(IS, 'ProfitLossControlling')] = ((), lambda c: c.num(IS, 'PretaxIncome') - c.num(IS, 'TaxProvision'))
+    f[(IS, 'NetIncome')] = ((), lambda c: c.num(IS, 'ProfitLossControlling') + c.num(IS, 'NetIncomeNoncontrolling'))
+
+    # Balance sheet
+    def strict_sum(*names: str):
+        return lambda c: _sum(*[c.strict(BS, name) for name in names])
+
+    def num_sum(*names: str):
+        return lambda c: _sum(*[c.num(BS, name) for name in names])
+
+    f[(BS, 'TotalAssets')] = ((), strict_sum('AssetsCurrent', 'AssetsNoncurrent'))
+    f[(BS, 'AssetsCurrent')] = ((), strict_sum('CashAndCashEquivalents', 'Receivables', 'Inventory', 'DeferredTaxesAssetsCurrent', 'OtherAssetsCurrent'))
+    f[(BS, 'AssetsNoncurrent')] = ((), strict_sum('PropertyPlantAndEquipmentNet', 'OperatingLeaseRightOfUseAsset', 'LeaseFinanceAssetsNoncurrent', 'Goodwill', 'DeferredIncomeTaxAssetsNoncurrent', 'OtherAssetsNoncurrent'))
+    f[(BS, 'TotalLiabilities')] = ((), strict_sum('LiabilitiesCurrent', 'LiabilitiesNoncurrent'))
+    f[(BS, 'LiabilitiesCurrent')] = ((), num_sum('AccountsPayableCurrent', 'EmployeeRelatedLiabilitiesCurrent', 'AccruedLiabilitiesCurrent', 'DeferredRevenueCurrent', 'LongTermDebtCurrent', 'OperatingLeaseLiabilitiesCurrent', 'FinanceLeaseLiabilitiesCurrent', 'OtherLiabilitiesCurrent'))
+    f[(BS, 'LiabilitiesNoncurrent')] = ((), num_sum('LongTermDebtNoncurrent', 'OperatingLeaseLiabilityNoncurrent', 'FinanceLeaseLiabilitiesNonCurrent', 'DeferredIncomeTaxLiabilitiesNonCurrent', 'OtherLiabilitiesNoncurrent'))
+    f[(BS, 'StockholdersEquity')] = ((), lambda c: c.strict(BS, 'TotalAssets') - c.strict(BS, 'TotalLiabilities'))
+    f[(BS, 'LiabilitiesAndStockholdersEquity')] = ((), strict_sum('TotalLiabilities', 'StockholdersEquity'))
+
+    # Capital table
+    f[(CAP, 'CurrentAssetsAggregate')] = ((BS,), lambda c: _sum(*[c.num(BS, n) for n in ('OperatingCash', 'ReceivablesCurrent', 'Inventory', 'OtherAssetsCurrent')]))
+    f[(CAP, 'CurrentLiabilitiesAggregate')] = ((BS,), lambda c: _sum(*[c.num(BS, n) for n in ('AccountsPayableCurrent', 'EmployeeLiabilitiesCurrent', 'AccruedLiabilitiesCurrent', 'DeferredRevenueCurrent', 'OtherLiabilitiesCurrent')]))
+    f[(CAP, 'NetOperatingAssetsCurrent')] = ((BS,), lambda c: c.num(BS, 'OperatingAssetsCurrent') - c.num(BS, 'OperatingLiabilitiesCurrent'))
+    f[(CAP, 'ScaledOperatingLeaseAssets')] = ((BS, IS), lambda c: c.num(BS, 'OperatingLeaseAssets') * 1.0)
+    f[(CAP, 'NetOtherNoncurrentAssets')] = ((BS,), lambda c: c.num(BS, 'OtherAssetsNoncurrent') - c.num(BS, 'OtherLiabilitiesNoncurrent'))
+    f[(CAP, 'TotalInvestedCapitalComponents')] = ((BS, CAP), lambda c: _sum(
+        c.num(CAP, 'OperatingWorkingCapital'), c.num(BS, 'PropertyPlantAndEquipment'), c.num(BS, 'OperatingLeaseAssets'),
+        c.num(CAP, 'VariableLeaseAssets'), c.num(BS, 'FinanceLeaseAssets'), c.num(CAP, 'OtherAssetsNetOtherLiabilities'),
+    ))
+    f[(CAP, 'InvestedCapitalWithGoodwill')] = ((BS, CAP), lambda c: c.num(CAP, 'InvestedCapitalExcludingGoodwill') + c.num(BS, 'Goodwill'))
+    f[(CAP, 'BroaderInvestedCapital')] = ((BS, CAP), lambda c: c.num(CAP, 'InvestedCapitalIncludingGoodwill') + c.num(BS, 'ExcessCash') + c.num(BS, 'ForeignTaxCreditCarryForward'))
+    f[(CAP, 'TotalLongTermDebt')] = ((BS,), lambda c: c.num(BS, 'LongTermDebtCurrent') + c.num(BS, 'LongTermDebtNoncurrent'))
+    f[(CAP, 'TotalOperatingLeaseLiabilities')] = ((BS,), lambda c: c.num(BS, 'OperatingLeaseLiabilitiesCurrent') + c.num(BS, 'OperatingLeaseLiabilitiesNoncurrent'))
+    f[(CAP, 'TotalFinanceLeaseLiabilities')] = ((BS,), lambda c: c.num(BS, 'FinanceLeaseLiabilitiesCurrent') + c.num(BS, 'FinanceLeaseLiabilitiesNoncurrent'))
+    f[(CAP, 'TotalDebtAndLeaseLiabilities')] = ((BS, CAP), lambda c: _sum(*[c.num(CAP, n) for n in ('Debt', 'OperatingLeaseLiabilities', 'VariableLeaseLiabilities', 'FinanceLeaseLiabilities')]))
+    f[(CAP, 'NetDeferredIncomeTaxes')] = ((BS,), lambda c: -1 * (c.num(BS, 'DeferredIncomeTaxes') - c.num(BS, 'ForeignTaxCreditCarryForward')))
+    f[(CAP, 'TotalCapitalFunds')] = ((BS, CAP), lambda c: _sum(
+        c.num(CAP, 'DebtAndDebtEquivalents'), -1 * (c.num(BS, 'DeferredIncomeTaxes') - c.num(BS, 'ForeignTaxCreditCarryForward')),
+        c.num(BS, 'NoncontrollingInterests'), c.num(BS, 'Equity'),
+    ))
+
+    # NOPAT (pass-through fields are graph links and copied verbatim)
+    f[(NOPAT, 'EBITA_Unadjusted')] = ((), lambda c: c.strict(NOPAT, 'Revenue') - c.strict(NOPAT, 'CostOfRevenue') - c.strict(NOPAT, 'SellingGeneralAndAdministration') - c.strict(NOPAT, 'Depreciation'))
+    f[(NOPAT, 'OperatingLeaseInterest')] = ((), _operating_lease_interest)
+    f[(NOPAT, 'VariableLeaseInterest')] = ((), _variable_lease_interest)
+    f[(NOPAT, 'EBITAAdjusted')] = ((), _ebita_adjusted)
+    f[(NOPAT, 'NOPAT')] = ((), lambda c: _ebita_adjusted(c) - c.strict(NOPAT, 'TaxProvision'))
+
+    # PPE changes
+    f[(PPE, 'PPEBeginningOfYear')] = ((BS,), lambda c: c.num(BS, 'PropertyPlantAndEquipment', -1))
+    f[(PPE, 'CapitalExpenditures')] = ((BS,), lambda c: c.num(BS, 'CapitalExpenditures'))
+    f[(PPE, 'Depreciation')] = ((IS,), lambda c: -1 * c.num(IS, 'Depreciation'))
+    f[(PPE, 'UnexplainedChangesInPPE')] = ((BS, IS), lambda c: c.num(BS, 'PropertyPlantAndEquipment') - c.num(BS, 'PropertyPlantAndEquipment', -1) - c.num(BS, 'CapitalExpenditures') + -1 * c.num(IS, 'Depreciation'))
+    f[(PPE, 'PPEEndOfYear')] = ((BS,), lambda c: c.num(BS, 'PropertyPlantAndEquipment'))
+
+    # Free cash flow
+    for name in ('NOPAT', 'Depreciation', 'EBITAAdjusted'):
+        f[(FCF, name)] = ((), lambda c, name=name: c.num(NOPAT, name))
+    for name in ('InterestIncome', 'OtherIncome', 'ForeignCurrencyAdjustment'):
+        f[(FCF, name)] = ((), lambda c, name=name: c.num(IS, name))
+    for name, source in (('OperatingLeaseAssets', BS), ('VariableLeaseAssets', BS), ('FinanceLeaseAssets', BS), ('Goodwill', BS), ('OperatingWorkingCapital', CAP)):
+        f[(FCF, 'ChangeIn' + name)] = ((source,), lambda c, name=name, source=source: _change(c, source, name))
+    f[(FCF, 'ChangeInNetOtherNoncurrentAssets')] = ((BS,), _net_other_noncurrent_change)
+    f[(FCF, 'ChangeInExcessCash')] = ((CAP,), lambda c: _decrease(c, CAP, 'ExcessCash'))
+    f[(FCF, 'ChangeInForeignTaxCreditCarryForward')] = ((CAP,), lambda c: _decrease(c, CAP, 'ForeignTaxCreditCarryForward'))
+    f[(FCF, 'UnexplainedChangesInPPE')] = ((), lambda c: c.num(PPE, 'UnexplainedChangesInPPE'))
+    f[(FCF, 'GrossCashFlow')] = ((NOPAT,), _gross_cash_flow)
+    f[(FCF, 'FreeCashFlow')] = ((), _free_cash_flow)
+    f[(FCF, 'DiscountFactor')] = ((), _discount_factor)
+    f[(FCF, 'PresentValueOfFreeCashFlow')] = ((), _present_value)
+
+    # ROIC performance
+    f[(ROIC, 'CostOfRevenueAsPercentOfRevenue')] = ((IS,), pct(IS, 'CostOfRevenue', IS, 'Revenue'))
+    f[(ROIC, 'SellingGeneralAndAdministrationAsPercentOfRevenue')] = ((IS,), pct(IS, 'SellingGeneralAdministrative', IS, 'Revenue'))
+    f[(ROIC, 'OperatingProfitAsPercentOfRevenue')] = ((IS,), pct(IS, 'OperatingIncome', IS, 'Revenue'))
+    f[(ROIC, 'WorkingCapitalAsPercentOfRevenue')] = ((IS, CAP), pct(CAP, 'OperatingWorkingCapital', IS, 'Revenue'))
+    f[(ROIC, 'FixedAssetsAsPercentOfRevenue')] = ((IS, CAP), lambda c: _ratio(
+        _sum(*[c.num(CAP, n) for n in ('PropertyPlantAndEquipment', 'OperatingLeaseAssets', 'VariableLeaseAssets', 'FinanceLeaseAssets')]),
+        c.num(IS, 'Revenue'), 100.0,
+    ))
+    f[(ROIC, 'OtherAssetsAsPercentOfRevenue')] = ((IS, CAP), pct(CAP, 'OtherAssetsNetOtherLiabilities', IS, 'Revenue'))
+    f[(ROIC, 'PretaxReturnOnInvestedCapital')] = ((IS, CAP), pct(IS, 'OperatingIncome', CAP, 'InvestedCapitalExcludingGoodwill'))
+
+    def over_average(num_statement: str, num_field: str, capital_field: str):
+        return lambda c: _ratio(c.num(num_statement, num_field), (c.num(CAP, capital_field) + c.num(CAP, capital_field, -1)) / 2, 100.0)
+
+    f[(ROIC, 'ReturnOnInvestedCapitalExcludingGoodwill')] = ((NOPAT, CAP), over_average(NOPAT, 'NOPAT', 'InvestedCapitalExcludingGoodwill'))
+    f[(ROIC, 'GoodwillAsPercentOfInvestedCapital')] = ((CAP,), over_average(CAP, 'Goodwill', 'InvestedCapitalExcludingGoodwill'))
+    f[(ROIC, 'ReturnOnInvestedCapitalIncludingGoodwill')] = ((NOPAT, CAP), over_average(NOPAT, 'NOPAT', 'InvestedCapitalIncludingGoodwill'))
+
+    # Financing health
+    f[(FH, 'AdjustedEBITDA')] = ((NOPAT,), lambda c: c.num(NOPAT, 'EBITAAdjusted') + c.num(NOPAT, 'Depreciation'))
+    f[(FH, 'TotalInterestExpense')] = ((IS, NOPAT), lambda c: c.num(IS, 'InterestExpense') + c.num(NOPAT, 'OperatingLeaseInterest') + c.num(NOPAT, 'VariableLeaseInterest'))
+    f[(FH, 'EBITAInterestCoverageRatio')] = ((NOPAT,), pct(NOPAT, 'EBITAAdjusted', FH, 'TotalInterestExpense', 1.0))
+    f[(FH, 'AdjustedEBITDAInterestCoverageRatio')] = ((NOPAT,), lambda c: _ratio(c.num(NOPAT, 'EBITAAdjusted') + c.num(NOPAT, 'Depreciation'), c.num(FH, 'TotalInterestExpense'), 1.0))
+    f[(FH, 'DebtToEBITARatio')] = ((CAP, NOPAT), pct(CAP, 'Debt', NOPAT, 'EBITAAdjusted', 1.0))
+    f[(FH, 'DebtToAdjustedEBITDARatio')] = ((CAP,), pct(CAP, 'Debt', FH, 'AdjustedEBITDA', 1.0))
+    f[(FH, 'DebtToEquityRatio')] = ((CAP, BS), pct(CAP, 'Debt', BS, 'Equity', 1.0))
+
+    # Income statement common size
+    for name, refs in calculator_graph.specs[ISCS].calculator.field_inputs.items():
+        if name.endswith('AsPercentOfRevenue') and name != 'RevenueAsPercentOfRevenue':
+            (num_statement, num_field), (den_statement, den_field) = refs
+            requires = (IS, PPE) if num_statement == PPE else (IS,)
+            f[(ISCS, name)] = (requires, pct(num_statement, num_field, den_statement, den_field))
+    f[(ISCS, 'RevenueAsPercentOfRevenue')] = ((), lambda c: np.full(len(c.years), 100.0))
+    f[(ISCS, 'DepreciationAsPercentOfLastYearPPE')] = ((IS, PPE), pct(IS, 'Depreciation', PPE, 'PPEBeginningOfYear'))
+    f[(ISCS, 'TaxProvisionAsPercentOfPretaxIncome')] = ((IS,), pct(IS, 'TaxProvision', IS, 'PretaxIncome'))
+    f[(ISCS, 'InterestExpenseAsPercentOfTotalLongTermDebt')] = ((IS, BS), lambda c: _ratio(
+        c.num(IS, 'InterestExpense'), c.num(BS, 'LongTermDebtCurrent', -1) + c.num(BS, 'LongTermDebtNoncurrent', -1), 100.0,
+    ))
+    f[(ISCS, 'InterestIncomeAsPercentOfExcessCash')] = ((IS, BS), lambda c: _ratio(c.num(IS, 'InterestIncome'), c.num(BS, 'ExcessCash', -1), 100.0))
+    f[(ISCS, 'CommonStockDividendPaymentAsPercentOfNetIncome')] = ((IS, CF), pct(CF, 'CommonStockDividendPayment', IS, 'NetIncome'))
+
+    # Balance sheet common size
+    for name, refs in calculator_graph.specs[BSCS].calculator.field_inputs.items():
+        (num_statement, num_field), _ = refs
+        scale = 365.0 if name.endswith('365DayTurnover') else 100.0
+        if scale == 365.0:
+            f[(BSCS, name)] = ((), lambda c, s=num_statement, n=num_field: np.where(
+                c.num(IS, 'Revenue') == 0, 0.0, 365 * (c.num(s, n) / np.where(c.num(IS, 'Revenue') == 0, 1.0, c.num(IS, 'Revenue'))),
+            ))
+        else:
+            f[(BSCS, name)] = ((), pct(num_statement, num_field, IS, 'Revenue'))
+    return f
+
+
+VECTOR_FORMULAS: Dict[Tuple[str, str], Formula] = _build_formulas()
+
+
+class VectorizedEngine:
+    """Evaluates the whole model for all years at once, in graph order."""
+
+    def __init__(self, graph: CalculatorGraph, formulas: Dict[Tuple[str, str], Formula]):
+        missing = [node for node in graph.order if node not in formulas and node not in graph.links]
+        if missing:
+            raise ValueError(f"No vectorized formula for: {', '.join(f'{s}.{n}' for s, n in missing)}")
+        self.graph = graph
+        self.formulas = formulas
+        # Only cells some formula reads or writes are loaded into the matrices
+        self.fields: Dict[str, set] = {}
+        for (statement, field_name), refs in graph.inputs.items():
+            self.fields.setdefault(statement, set()).add(field_name)
+            for (source, source_field), _ in refs:
+                self.fields.setdefault(source, set()).add(source_field)
+
+    def recalculate_all(self, model: Dict[str, Dict[Any, Dict[str, Any]]], years: Optional[Iterable[Any]] = None) -> Dict[str, Dict[Any, Dict[str, Any]]]:
+        """Drop-in replacement for ``CalculatorGraph.recalculate_all``."""
+        all_years = set()
+        for dataset in model.values():
+            if isinstance(dataset, Mapping):
+                all_years.update(dataset.keys())
+        requested = set(all_years) if years is None else set(years)
+        if any(not isinstance(year, int) for year in all_years | requested):
+            # Prior-year arithmetic needs integer years; use the per-cell path
+            logger.debug("Vectorized engine needs integer years; falling back to scalar graph evaluation")
+            return self.graph.recalculate_all(model, years)
+        if not requested:
+            return model
+
+        axis = sorted(all_years | requested)
+        write = np.isin(np.array(axis, dtype=np.int64), np.array(sorted(requested), dtype=np.int64))
+        frame = ModelFrame(model, axis, write, self.fields)
+
+        for node in self.graph.order:
+            statement, field_name = node
+            dataset = model.get(statement)
+            if not isinstance(dataset, Mapping):
+                continue
+            if node in self.graph.links:
+                self._copy_link(model, frame, node, axis, write)
+                continue
+            requires, formula = self.formulas[node]
+            if any(not frame.present(source) for source in requires):
+                continue
+            try:
+                with np.errstate(invalid='ignore', over='ignore'):
+                    result = formula(frame)
+            except Exception as e:
+                logger.error(f"Error calculating {statement}.{field_name}: {e}")
+                continue
+            frame.store(statement, field_name, np.asarray(result, dtype=np.float64))
+
+        for statement, matrix in frame.matrices.items():
+            matrix.write_back(model[statement], axis)
+        return model
+
+    def _copy_link(self, model, frame: ModelFrame, node: Tuple[str, str], axis: List[int], write: np.ndarray) -> None:
+        statement, field_name = node
+        source_statement, source_field = self.graph.links[node]
+        source = model.get(source_statement) or {}
+        matrix = frame.matrices[statement]
+        source_matrix = frame.matrices.get(source_statement)
+        j = matrix.fields[field_name]
+        dataset = model[statement]
+        for i in np.flatnonzero(write).tolist():
+            value = source.get(axis[i], {}).get(source_field)
+            if value is None:
+                continue
+            dataset.setdefault(axis[i], {})[field_name] = value
+            matrix.rows_written[i] = True
+            k = source_matrix.fields[source_field]
+            matrix.values[i, j] = source_matrix.values[i, k]
+            matrix.numbers[i, j] = source_matrix.numbers[i, k]
+            matrix.state[i, j] = source_matrix.state[i, k]
+
+
+vectorized_engine = VectorizedEngine(calculator_graph, VECTOR_FORMULAS)
+
+
+def update_model_calculations_vectorized(model: Dict[str, Dict[Any, Dict[str, Any]]], years: Optional[Iterable[Any]] = None) -> Dict[str, Dict[Any, Dict[str, Any]]]:
+    return vectorized_engine.recalculate_all(model, years)
@@ -0,0 +1,106 @@
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
+
+# Calculators and model sessions are imported on the first message, so
+# loading the websocket routing at ASGI start-up does not import them.
+
+logger = logging.getLogger(__name__)
+
+
+class ValuationModelConsumer(AsyncWebsocketConsumer):
+    """Live valuation model over a WebSocket: ``ws/valuation-model/<ticker>/``.
+
+    The connection keeps one model session open.  Client messages:
+
+    ``{"type": "load", "statements"?: {...}, "model_id"?: str}``
+        Open the model: resume ``model_id`` if the server still has it for
+        this user and ticker, else seed a new session from ``statements`` or
+        the ticker's stored metrics.
+        Replies ``{"type": "model", model_id, version, statements}``.
+    ``{"type": "edit", "edits": [{statement?, year, field, value}], "request_id"?}``
+        Apply edits in place; replies ``{"type": "changes", version, changes}``
+        with only the derived cells whose values changed.
+
+    Errors reply ``{"type": "error", "error": ...}`` and keep the socket open.
+    """
+
+    async def connect(self):
+        self.ticker = self.scope["url_route"]["kwargs"]["ticker"].upper()
+        self.session = None
+        await self.accept()
+
+    async def disconnect(self, close_code):
+        # The session stays in the store until TTL/LRU eviction so a reconnect can resume it
+        self.session = None
+
+    async def receive(self, text_data=None, bytes_data=None):
+        from .model_sessions import SessionConflict
+
+        request_id = None
+        try:
+            message = json.loads(text_data or "{}")
+            request_id = message.get("request_id")
+            message_type = message.get("type")
+            if message_type == "load":
+                reply = await sync_to_async(self._load)(message)
+            elif message_type == "edit":
+                if self.session is None:
+                    raise ValueError("No model loaded; send a load message first")
+                reply = await sync_to_async(self._edit)(message)
+            else:
+                raise ValueError(f"Unknown message type: {message_type}")
+        except (TypeError, ValueError, AttributeError, SessionConflict) as e:
+            reply = {"type": "error", "error": str(e)}
+        except Exception as e:
+            logger.exception(f"Error in valuation model socket for {self.ticker}")
+            reply = {"type": "error", "error": str(e)}
+        if request_id is not None:
+            reply["request_id"] = request_id
+        await self.send(json.dumps(reply))
+
+    def _load(self, message):
+        from .calculators.valuation_model import recompute_model, serialize_model
+        from .model_sessions import get_session_store, seed_model_from_metrics, session_owner
+        from .views import build_request_model
+
+        self.store = get_session_store()
+        model_id = message.get("model_id")
+        statements = message.get("statements")
+        owner = session_owner(self.scope.get("user"), self.scope.get("session"))
+        session = self.store.open(model_id, owner, self.ticker) if model_id and statements is None else None
+        if session is None:
+            if statements is not None:
+                model = recompute_model(build_request_model(statements))
+            else:
+                model = seed_model_from_metrics(self.ticker)
+            session = self.store.create(model, self.ticker, owner)
+        self.session = session
+        return {
+            "type": "model",
+            "model_id": session.session_id,
+            "version": session.version,
+            "statements": serialize_model(session.model),
+        }
+
+    def _edit(self, message):
+        from .calculators.valuation_model import serialize_changes
+        from .views import normalize_edits
+
+        edits = normalize_edits(message.get("edits", []), "income_statement")
+        with self.store.lock(self.session.session_id):
+            # Re-read under the lock: another worker may have edited the same session
+            session = self.store.open(self.session.session_id, self.session.owner, self.ticker)
+            if session is None:
+                raise ValueError("Model session expired; send a load message")
+            changed = session.apply(edits)
+            self.store.commit(session)
+        self.session = session
+        return {
+            "type": "changes",
+            "model_id": session.session_id,
+            "version": session.version,
+            "changes": serialize_changes(changed),
+        }
@@ -0,0 +1,141 @@
+"""Materialized calculator outputs (``sec_app.DerivedMetric``).
+
+Ingest commands record the ``(company, period)`` pairs whose raw metrics
+they wrote and call ``refresh_dirty_pairs``; ``compute_derived_metrics``
+rebuilds whole companies.  API reads then hit the table instead of
+running the calculators.
+
+A refresh recomputes the company's model (prior years are inputs) but
+rewrites only the affected years: each dirty year and the one after it
+(year-over-year changes read the prior year), or every year when the
+earliest year changed, since discount factors are anchored on it.
+
+Every row carries ``DERIVED_METRICS_VERSION``; bump it whenever a formula
+changes so stale rows can be found and rebuilt.
+"""
+
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import logging
+
+from django.db import transaction
+
+from sec_app.models import DerivedMetric, FinancialMetric, FinancialPeriod
+from .calculators.valuation_model import (
+    STATEMENTS_BY_INPUT,
+    build_model,
+    derived_cells,
+    recompute_model,
+    statements_from_metrics,
+)
+from .periods import period_position, quarter_number, ttm_frames
+
+logger = logging.getLogger(__name__)
+
+DERIVED_METRICS_VERSION = 1
+
+
+def compute_company(company_id: int, period_type: str = 'annual') -> Tuple[Dict[int, int], List[Tuple[int, str, str, float]]]:
+    """Run the full calculator chain for one company.
+
+    Returns ``(period_ids, cells)``: year -> period id, and
+    ``(year, statement, metric_name, value)`` for every derived cell.
+    Quarterly and TTM periods are keyed by quarter number instead.  Quarters
+    run as one model on that axis, so prior-period lookups read the previous
+    quarter; TTM periods are computed one frame (fiscal quarter) at a time.
+    """
+    rows = (
+        FinancialMetric.objects.filter(
+            company_id=company_id,
+            period__period_type=period_type,
+            metric_name__in=list(STATEMENTS_BY_INPUT),
+        )
+        .values_list('period_id', 'period__period', 'metric_name', 'value')
+    )
+    period_ids: Dict[int, int] = {}
+    metrics = []
+    for period_id, period, metric_name, value in rows.iterator():
+        position = period_position(period, period_type)
+        if isinstance(position, int):
+            period_ids[position] = period_id
+            metrics.append((position, metric_name, value))
+    if not metrics:
+        return period_ids, []
+
+    if period_type != 'ttm':
+        model = recompute_model(build_model(statements_from_metrics(metrics)))
+        cells = [(year, statement, field_name, value) for statement, year, field_name, value in derived_cells(model, period_ids)]
+        return period_ids, cells
+
+    cells = []
+    for quarter, frame in ttm_frames(metrics).items():
+        model = recompute_model(build_model(statements_from_metrics(frame)))
+        cells.extend(
+            (quarter_number(year, quarter), statement, field_name, value)
+            for statement, year, field_name, value in derived_cells(model, {year for year, _, _ in frame})
+        )
+    return period_ids, cells
+
+
+def affected_years(dirty_years: Iterable[int], all_years: Iterable[int]) -> Set[int]:
+    all_years = set(all_years)
+    dirty_years = set(dirty_years) & all_years
+    if not dirty_years:
+        return set()
+    if min(dirty_years) <= min(all_years):
+        return all_years
+    return (dirty_years | {year + 1 for year in dirty_years}) & all_years
+
+
+def refresh_company(company_id: int, period_ids: Optional[Iterable[int]] = None, period_type: str = 'annual', batch_size: int = 5000) -> int:
+    """Recompute one company and rewrite its derived rows.
+
+    With ``period_ids`` only the years they affect are rewritten; otherwise
+    every ``period_type`` row is replaced.  Returns the rows written.
+    """
+    years_to_ids, cells = compute_company(company_id, period_type)
+    # TTM periods depend on the same quarter a year earlier, so they are always rewritten together
+    if period_ids is None or period_type == 'ttm':
+        years = set(years_to_ids)
+        stale = DerivedMetric.objects.filter(company_id=company_id, period__period_type=period_type)
+    else:
+        dirty = set(period_ids)
+        years = affected_years((year for year, pid in years_to_ids.items() if pid in dirty), years_to_ids)
+        stale = DerivedMetric.objects.filter(company_id=company_id, period_id__in=[years_to_ids[year] for year in years] + list(dirty))
+
+    objects = [
+        DerivedMetric(
+            company_id=company_id,
+            period_id=years_to_ids[year],
+            statement=statement,
+            metric_name=metric_name,
+            value=value,
+            version=DERIVED_METRICS_VERSION,
+        )
+        for year, statement, metric_name, value in cells
+        if year in years
+    ]
+    with transaction.atomic():
+        stale.delete()
+        DerivedMetric.objects.bulk_create(objects, batch_size=batch_size)
+    return len(objects)
+
+
+def refresh_dirty_pairs(pairs: Iterable[Tuple[int, int]], batch_size: int = 5000) -> int:
+    """Refresh derived rows for the ``(company_id, period_id)`` pairs an ingest touched."""
+    by_company: Dict[int, Set[int]] = {}
+    for company_id, period_id in pairs:
+        by_company.setdefault(company_id, set()).add(period_id)
+    if not by_company:
+        return 0
+
+    period_types = dict(
+        FinancialPeriod.objects.filter(id__in={pid for pids in by_company.values() for pid in pids}).values_list('id', 'period_type')
+    )
+    written = 0
+    for company_id, pids in by_company.items():
+        for period_type in {period_types.get(pid, 'annual') for pid in pids}:
+            try:
+                written += refresh_company(company_id, [pid for pid in pids if period_types.get(pid, 'annual') == period_type], period_type, batch_size)
+            except Exception as e:
+                logger.error(f"Error refreshing derived metrics for company {company_id}: {e}")
+    return written
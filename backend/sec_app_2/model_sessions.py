@@ -0,0 +1,417 @@
+"""Server-side valuation model sessions.
+
+Each session holds one user's working copy of a ticker's statements, keyed
+by a server-generated session ID and tied to its owner (see
+``session_owner``); ``open`` only hands a session back to that owner, for
+that ticker.  Edits are applied to the session's model in place and only
+their downstream cells are recomputed, so an edit costs O(changed cells)
+rather than O(model size).
+
+Two backends, selected by ``settings.VALUATION_MODEL_SESSIONS['BACKEND']``:
+
+``memory``
+    Live models in an LRU ordered dict, bounded by session count and total
+    cell count, with an idle TTL.  Sessions are per process.
+``redis``
+    One hash per session (``cell -> JSON value``), so a commit writes only
+    the dirty cells.  Shared across workers; idle sessions expire by TTL
+    and the oldest are evicted past ``MAX_SESSIONS``.  Each worker caches
+    the models it has loaded and catches up on other workers' commits by
+    reading just the cells they wrote.
+
+Callers hold ``store.lock(session_id)`` around open, apply and commit; the
+lock is shared by every worker of the backend, and a commit against a
+version that moved on raises ``SessionConflict``.
+"""
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, ContextManager, Dict, Iterable, Iterator, Optional, Set
+import json
+import logging
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+from .calculators.frame import compact_model
+from .calculators.graph import calculator_graph, Cell
+from .calculators.valuation_model import (
+    Model,
+    MODEL_STATEMENTS,
+    STATEMENTS_BY_INPUT,
+    apply_edits,
+    build_model,
+    coerce_year,
+    recompute_model,
+    statements_from_metrics,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _count_cells(model: Model) -> int:
+    return sum(len(fields) for dataset in model.values() for fields in dataset.values())
+
+
+class SessionConflict(Exception):
+    """The session was changed by another request, or is locked by one for too long."""
+
+
+def session_owner(user: Any = None, session: Any = None) -> str:
+    """Who a model session belongs to: the signed-in ``user``, else the Django ``session``."""
+    if user is not None and user.is_authenticated:
+        return f'user:{user.pk}'
+    if session is None:
+        raise ValueError("Model sessions need a signed-in user or a browser session")
+    if session.session_key is None:
+        # Anonymous visitors get a session (and its cookie) on their first model
+        session.save()
+    return f'session:{session.session_key}'
+
+
+class ModelSession:
+    __slots__ = ('session_id', 'ticker', 'owner', 'version', 'model', 'cells', 'dirty', 'last_used')
+
+    def __init__(self, session_id: str, ticker: str, model: Model, version: int = 1, owner: str = ''):
+        self.session_id = session_id
+        self.ticker = ticker
+        self.owner = owner
+        self.version = version
+        # Held as array-backed frames: a cached model costs ~8 bytes per cell
+        self.model = compact_model(model)
+        self.cells = _count_cells(model)
+        # Cells modified since the last commit; the Redis backend writes only these
+        self.dirty: Set[Cell] = set()
+        self.last_used = time.monotonic()
+
+    def apply(self, edits: Iterable[Dict[str, Any]], default_statement: str = 'income_statement') -> Dict[Cell, Any]:
+        """Apply edits in place and recompute their dependents; return the changed cells."""
+        edited = apply_edits(self.model, edits, default_statement)
+        changed = calculator_graph.recalculate(self.model, edited)
+        self.dirty.update(edited)
+        self.dirty.update(changed)
+        return changed
+
+
+class BaseSessionStore:
+    def get(self, session_id: str) -> Optional[ModelSession]:
+        raise NotImplementedError
+
+    def open(self, session_id: str, owner: str, ticker: Optional[str] = None) -> Optional[ModelSession]:
+        """``session_id`` if it belongs to ``owner`` (and models ``ticker``), else None."""
+        session = self.get(session_id)
+        if session is None or session.owner != owner or (ticker is not None and session.ticker != ticker):
+            return None
+        return session
+
+    def create(self, model: Model, ticker: str, owner: str) -> ModelSession:
+        """A new session for ``owner`` under a fresh ID from ``new_session_id``."""
+        raise NotImplementedError
+
+    def commit(self, session: ModelSession) -> None:
+        """Persist the session's dirty cells and bump its version.
+
+        Raises ``SessionConflict`` when the stored session is no longer at
+        ``session.version``.
+        """
+        raise NotImplementedError
+
+    def lock(self, session_id: str) -> ContextManager:
+        """Exclusive access to ``session_id`` across every user of the store."""
+        raise NotImplementedError
+
+    def discard(self, session_id: str) -> None:
+        raise NotImplementedError
+
+    @staticmethod
+    def new_session_id() -> str:
+        return uuid.uuid4().hex
+
+
+class InProcessSessionStore(BaseSessionStore):
+    def __init__(self, max_sessions: int = 500, max_cells: int = 2_000_000, ttl_seconds: int = 30 * 60):
+        self.max_sessions = max_sessions
+        self.max_cells = max_cells
+        self.ttl_seconds = ttl_seconds
+        self._sessions: 'OrderedDict[str, ModelSession]' = OrderedDict()
+        self._cells = 0
+        self._lock = threading.Lock()
+        self._session_locks: Dict[str, threading.Lock] = {}
+
+    def get(self, session_id: str) -> Optional[ModelSession]:
+        with self._lock:
+            self._expire()
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.last_used = time.monotonic()
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def create(self, model: Model, ticker: str, owner: str) -> ModelSession:
+        session = ModelSession(self.new_session_id(), ticker, model, owner=owner)
+        with self._lock:
+            self._sessions[session.session_id] = session
+            self._cells += session.cells
+            self._evict()
+        return session
+
+    def commit(self, session: ModelSession) -> None:
+        with self._lock:
+            if self._sessions.get(session.session_id) is not session:
+                raise SessionConflict(f"Model session {session.session_id} was replaced or expired")
+            session.dirty.clear()
+            session.version += 1
+            session.last_used = time.monotonic()
+            cells = _count_cells(session.model)
+            self._cells += cells - session.cells
+            session.cells = cells
+            self._evict()
+
+    def lock(self, session_id: str) -> ContextManager:
+        with self._lock:
+            return self._session_locks.setdefault(session_id, threading.Lock())
+
+    def discard(self, session_id: str) -> None:
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is not None:
+                self._cells -= session.cells
+            self._session_locks.pop(session_id, None)
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - self.ttl_seconds
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session.last_used >= cutoff:
+                break
+            self._pop_oldest()
+
+    def _evict(self) -> None:
+        self._expire()
+        # Keep the most recently used session even if it alone exceeds the cell budget
+        while len(self._sessions) > 1 and (len(self._sessions) > self.max_sessions or self._cells > self.max_cells):
+            self._pop_oldest()
+
+    def _pop_oldest(self) -> None:
+        session_id, session = self._sessions.popitem(last=False)
+        self._cells -= session.cells
+        self._session_locks.pop(session_id, None)
+        logger.debug(f"Evicted valuation model session {session_id} ({session.ticker})")
+
+
+class RedisSessionStore(BaseSessionStore):
+    _PREFIX = 'valuation_session:'
+    _INDEX = 'valuation_session:index'
+    _SEP = '\x1f'
+    # Versions whose written cells are kept for other workers to catch up from
+    _CHANGE_LOG = 100
+
+    def __init__(
+        self,
+        host: str = '127.0.0.1',
+        port: int = 6379,
+        password: Optional[str] = None,
+        max_sessions: int = 500,
+        ttl_seconds: int = 30 * 60,
+        cache_sessions: int = 100,
+        lock_timeout: int = 30,
+    ):
+        import redis
+
+        self.client = redis.Redis(host=host, port=port, password=password)
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.cache_sessions = cache_sessions
+        self.lock_timeout = lock_timeout
+        self._cache: 'OrderedDict[str, ModelSession]' = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def _keys(self, session_id: str):
+        return f'{self._PREFIX}{session_id}:cells', f'{self._PREFIX}{session_id}:meta', f'{self._PREFIX}{session_id}:changes'
+
+    def get(self, session_id: str) -> Optional[ModelSession]:
+        cells_key, meta_key, changes_key = self._keys(session_id)
+        meta = self.client.hgetall(meta_key)
+        if not meta:
+            self._uncache(session_id)
+            return None
+        version = int(meta[b'version'])
+        with self._cache_lock:
+            session = self._cache.get(session_id)
+        # A cached copy with uncommitted cells is from a failed edit; reload it
+        if session is None or session.dirty or session.version > version or not self._catch_up(session, version):
+            model: Model = {statement: {} for statement in MODEL_STATEMENTS}
+            for key, value in self.client.hgetall(cells_key).items():
+                statement, year, field_name = key.decode().split(self._SEP)
+                model.setdefault(statement, {}).setdefault(coerce_year(year), {})[field_name] = json.loads(value)
+            session = ModelSession(session_id, meta.get(b'ticker', b'').decode(), model, version, meta.get(b'owner', b'').decode())
+        self._cache_put(session)
+        self._touch(session_id)
+        return session
+
+    def _catch_up(self, session: ModelSession, version: int) -> bool:
+        """Read just the cells committed since ``session.version``; False when the log has a gap."""
+        if session.version == version:
+            return True
+        _, _, changes_key = self._keys(session.session_id)
+        versions = range(session.version + 1, version + 1)
+        logged = self.client.hmget(changes_key, [str(v) for v in versions])
+        if any(entry is None for entry in logged):
+            return False
+        keys = sorted({key for entry in logged for key in json.loads(entry)})
+        cells_key = self._keys(session.session_id)[0]
+        for key, value in zip(keys, self.client.hmget(cells_key, keys) if keys else []):
+            if value is None:
+                return False
+            statement, year, field_name = key.split(self._SEP)
+            if statement not in session.model:
+                return False
+            session.model[statement].setdefault(coerce_year(year), {})[field_name] = json.loads(value)
+        session.version = version
+        return True
+
+    def create(self, model: Model, ticker: str, owner: str) -> ModelSession:
+        session = ModelSession(self.new_session_id(), ticker, model, owner=owner)
+        session_id = session.session_id
+        cells_key, meta_key, _ = self._keys(session_id)
+        mapping = {
+            self._SEP.join((statement, str(year), field_name)): json.dumps(value)
+            for statement, dataset in model.items()
+            for year, fields in dataset.items()
+            for field_name, value in fields.items()
+        }
+        pipe = self.client.pipeline()
+        if mapping:
+            pipe.hset(cells_key, mapping=mapping)
+        pipe.hset(meta_key, mapping={'ticker': ticker, 'owner': owner, 'version': session.version})
+        pipe.execute()
+        self._cache_put(session)
+        self._touch(session_id)
+        self._evict()
+        return session
+
+    def commit(self, session: ModelSession) -> None:
+        from redis.exceptions import WatchError
+
+        cells_key, meta_key, changes_key = self._keys(session.session_id)
+        mapping = {}
+        for statement, year, field_name in session.dirty:
+            fields = session.model.get(statement, {}).get(year, {})
+            if field_name in fields:
+                mapping[self._SEP.join((statement, str(year), field_name))] = json.dumps(fields[field_name])
+        version = session.version + 1
+        with self.client.pipeline() as pipe:
+            try:
+                # Compare-and-set on the version: the write only lands if no one committed since our read
+                pipe.watch(meta_key)
+                current = pipe.hget(meta_key, 'version')
+                if current is None or int(current) != session.version:
+                    self._uncache(session.session_id)
+                    raise SessionConflict(f"Model session {session.session_id} is no longer at version {session.version}; reload it")
+                pipe.multi()
+                if mapping:
+                    pipe.hset(cells_key, mapping=mapping)
+                pipe.hset(meta_key, 'version', version)
+                pipe.hset(changes_key, str(version), json.dumps(sorted(mapping)))
+                pipe.hdel(changes_key, str(version - self._CHANGE_LOG))
+                pipe.execute()
+            except WatchError:
+                self._uncache(session.session_id)
+                raise SessionConflict(f"Model session {session.session_id} changed during the edit; reload it")
+        session.version = version
+        session.dirty.clear()
+        self._touch(session.session_id)
+
+    @contextmanager
+    def lock(self, session_id: str) -> Iterator[None]:
+        from redis.exceptions import LockError
+
+        lock = self.client.lock(f'{self._PREFIX}{session_id}:lock', timeout=self.lock_timeout, blocking_timeout=self.lock_timeout)
+        if not lock.acquire():
+            raise SessionConflict(f"Model session {session_id} is busy; retry the edit")
+        try:
+            yield
+        finally:
+            try:
+                lock.release()
+            except LockError:
+                # Held past lock_timeout; the version check in commit still guards the write
+                logger.warning(f"Valuation model session lock {session_id} expired before release")
+
+    def discard(self, session_id: str) -> None:
+        self.client.delete(*self._keys(session_id))
+        self.client.zrem(self._INDEX, session_id)
+        self._uncache(session_id)
+
+    def _cache_put(self, session: ModelSession) -> None:
+        with self._cache_lock:
+            self._cache[session.session_id] = session
+            self._cache.move_to_end(session.session_id)
+            while len(self._cache) > self.cache_sessions:
+                self._cache.popitem(last=False)
+
+    def _uncache(self, session_id: str) -> None:
+        with self._cache_lock:
+            self._cache.pop(session_id, None)
+
+    def _touch(self, session_id: str) -> None:
+        pipe = self.client.pipeline()
+        for key in self._keys(session_id):
+            pipe.expire(key, self.ttl_seconds)
+        pipe.zadd(self._INDEX, {session_id: time.time()})
+        pipe.execute()
+
+    def _evict(self) -> None:
+        # Drop index entries whose hashes already expired, then the least recently used overflow
+        self.client.zremrangebyscore(self._INDEX, 0, time.time() - self.ttl_seconds)
+        overflow = self.client.zcard(self._INDEX) - self.max_sessions
+        if overflow > 0:
+            for session_id in self.client.zrange(self._INDEX, 0, overflow - 1):
+                self.discard(session_id.decode())
+
+
+_store: Optional[BaseSessionStore] = None
+_store_lock = threading.Lock()
+
+
+def get_session_store() -> BaseSessionStore:
+    """Process-wide store built from ``settings.VALUATION_MODEL_SESSIONS``."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                config = getattr(settings, 'VALUATION_MODEL_SESSIONS', {})
+                if config.get('BACKEND', 'memory') == 'redis':
+                    _store = RedisSessionStore(
+                        host=config.get('REDIS_HOST', '127.0.0.1'),
+                        port=config.get('REDIS_PORT', 6379),
+                        password=config.get('REDIS_PASSWORD'),
+                        max_sessions=config.get('MAX_SESSIONS', 500),
+                        ttl_seconds=config.get('TTL_SECONDS', 30 * 60),
+                        cache_sessions=config.get('CACHE_SESSIONS', 100),
+                        lock_timeout=config.get('LOCK_TIMEOUT_SECONDS', 30),
+                    )
+                else:
+                    _store = InProcessSessionStore(
+                        max_sessions=config.get('MAX_SESSIONS', 500),
+                        max_cells=config.get('MAX_CELLS', 2_000_000),
+                        ttl_seconds=config.get('TTL_SECONDS', 30 * 60),
+                    )
+    return _store
+
+
+def seed_model_from_metrics(ticker: str, period_type: str = 'annual') -> Model:
+    """Build a recomputed model from the stored ``FinancialMetric`` rows of ``ticker``."""
+    from sec_app.models.metric import FinancialMetric
+
+    rows = (
+        FinancialMetric.objects.filter(
+            company__ticker__iexact=ticker,
+            period__period_type=period_type,
+            metric_name__in=list(STATEMENTS_BY_INPUT),
+        )
+        .values_list('period__period', 'metric_name', 'value')
+    )
+    return recompute_model(build_model(statements_from_metrics(rows.iterator())))
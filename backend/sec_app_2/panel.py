@@ -0,0 +1,80 @@
+"""Stored metrics as dense NumPy arrays for universe-wide passes.
+
+``MetricPanel.load`` reads ``FinancialMetric`` rows for every company in
+one query and lays them out as a ``fields x companies x periods`` float
+array, NaN where a metric is missing.  The period axis is years for
+annual panels and quarter numbers (``periods.quarter_number``) for
+quarterly and TTM panels; rows whose period does not fit the axis
+(``Last5Y_AVG`` and the like) are dropped.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from sec_app.models import FinancialMetric
+from .periods import period_position
+
+
+class MetricPanel:
+    """Stored metrics as a dense ``fields x companies x periods`` array."""
+
+    def __init__(self, company_ids: np.ndarray, periods: np.ndarray, fields: List[str], values: np.ndarray):
+        self.company_ids = company_ids
+        self.periods = periods
+        self.names = fields
+        self.fields = {name: i for i, name in enumerate(fields)}
+        self.values = values
+
+    @classmethod
+    def load(cls, fields: Optional[Iterable[str]] = None, period_type: str = 'annual', company_ids: Optional[Iterable[int]] = None) -> 'MetricPanel':
+        """Load ``fields`` (every stored metric when None) for ``company_ids`` (all when None)."""
+        rows = FinancialMetric.objects.filter(period__period_type=period_type)
+        if fields is not None:
+            rows = rows.filter(metric_name__in=sorted(set(fields)))
+        if company_ids is not None:
+            rows = rows.filter(period__company_id__in=list(company_ids))
+
+        field_index: Dict[str, int] = {name: i for i, name in enumerate(sorted(set(fields or ())))}
+        positions: Dict[str, Any] = {}
+        companies, periods, names, values = [], [], [], []
+        for company_id, period, metric_name, value in rows.values_list('period__company_id', 'period__period', 'metric_name', 'value').iterator(chunk_size=20000):
+            if period not in positions:
+                positions[period] = period_position(period, period_type)
+            position = positions[period]
+            if position is None or value is None:
+                continue
+            j = field_index.get(metric_name)
+            if j is None:
+                j = field_index[metric_name] = len(field_index)
+            companies.append(company_id)
+            periods.append(position)
+            names.append(j)
+            values.append(value)
+
+        company_axis, company_pos = np.unique(np.array(companies, dtype=np.int64), return_inverse=True)
+        period_array = np.array(periods, dtype=np.int64)
+        first = int(period_array.min()) if len(period_array) else 0
+        period_axis = np.arange(first, int(period_array.max()) + 1 if len(period_array) else first, dtype=np.int64)
+        panel = np.full((len(field_index), len(company_axis), len(period_axis)), np.nan)
+        panel[np.array(names, dtype=np.int64), company_pos, period_array - first] = np.array(values, dtype=np.float64)
+        return cls(company_axis, period_axis, list(field_index), panel)
+
+    def field(self, name: str) -> np.ndarray:
+        """``companies x periods`` values of ``name``."""
+        return self.values[self.fields[name]]
+
+    def prior(self, name: str) -> np.ndarray:
+        """``name`` one period earlier (NaN for each company's first period on the axis)."""
+        current = self.field(name)
+        shifted = np.full_like(current, np.nan)
+        shifted[:, 1:] = current[:, :-1]
+        return shifted
+
+    def last_period_index(self) -> np.ndarray:
+        """Per company, the index of the latest period holding any metric (-1 when none)."""
+        present = ~np.isnan(self.values).all(axis=0)
+        if not present.shape[1]:
+            return np.full(present.shape[0], -1)
+        last = present.shape[1] - 1 - np.argmax(present[:, ::-1], axis=1)
+        return np.where(present.any(axis=1), last, -1)
@@ -0,0 +1,174 @@
+"""Throughput benchmark for the ``data_financials`` CSV parsing.
+
+``python manage.py benchmark_csv_parsing`` writes synthetic
+``{TICKER}_MasterFinancials.csv`` files in the real layout (one row per
+metric, a column per year, the ``LastNY_AVG`` / ``LastNY_CAGR`` window
+columns and ``TableName``), or takes the files of an existing
+``data_financials`` directory, and times parsing all of them with:
+
+* ``serial``: ``read_csv_columnar`` on the calling thread
+* ``threads_N`` / ``processes_N``: the ``parse_executor`` pools with N workers
+* ``pandas_c`` / ``pandas_pyarrow``: ``pandas.read_csv`` with that engine,
+  cleaned to floats the way ``parse_number`` does (skipped when the engine
+  is not installed)
+
+Each result carries files and MB per second and the speed-up over
+``serial``; the report is JSON like ``benchmark_calculators``.
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+import csv
+import glob
+import os
+import platform
+import random
+import tempfile
+import time
+
+from sec_app.ingest import parse_executor, read_csv_columnar
+from .calculators.valuation_model import INPUT_FIELDS
+
+WINDOW_YEARS = (1, 2, 3, 5, 10)
+
+
+def write_master_financials(directory: str, files: int, metrics: int = 300, years: int = 20, seed: int = 0, last_year: int = 2024) -> List[str]:
+    """Write ``files`` synthetic MasterFinancials CSVs under ``directory``; return their paths.
+
+    Rows are the statement input fields padded with generic names up to
+    ``metrics``; values are thousands-separated like the exported sheets,
+    with a few blank cells.
+    """
+    rng = random.Random(seed)
+    names = sorted({name for fields in INPUT_FIELDS.values() for name in fields})
+    names += [f'Metric{n}' for n in range(max(0, metrics - len(names)))]
+    names = names[:metrics]
+    headers = [''] + [str(year) for year in range(last_year - years + 1, last_year + 1)]
+    headers += [f'Last{n}Y_{kind}' for kind in ('AVG', 'CAGR') for n in WINDOW_YEARS] + ['TableName']
+
+    paths = []
+    for n in range(files):
+        ticker = f'SYN{n}'
+        folder = os.path.join(directory, ticker)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f'{ticker}_MasterFinancials.csv')
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(headers)
+            for name in names:
+                scale = rng.lognormvariate(18, 2)
+                row = [name]
+                for _ in headers[1:-1]:
+                    row.append('' if rng.random() < 0.05 else f'{scale * rng.uniform(0.8, 1.2):,.2f}')
+                row.append('MasterFinancials')
+                writer.writerow(row)
+        paths.append(path)
+    return paths
+
+
+def pandas_parse(path: str, engine: str) -> Any:
+    """``read_csv_columnar`` equivalent on ``pandas.read_csv``."""
+    import pandas
+
+    frame = pandas.read_csv(path, index_col=0, dtype=str, engine=engine)
+    frame = frame.drop(columns='TableName', errors='ignore')
+    values = frame.apply(lambda column: pandas.to_numeric(column.str.replace(r'[,$]', '', regex=True), errors='coerce'))
+    return list(frame.index), {header: values[header].to_numpy() for header in values.columns}
+
+
+def _pandas_engine_available(engine: str) -> bool:
+    try:
+        import pandas  # noqa: F401
+        if engine == 'pyarrow':
+            import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _serial(paths: Sequence[str]) -> None:
+    for path in paths:
+        read_csv_columnar(path)
+
+
+def _pooled(kind: str, workers: int) -> Callable[[Sequence[str]], None]:
+    def run(paths: Sequence[str]) -> None:
+        # Pool start-up is part of the cost, as in the ingest commands
+        with parse_executor(kind, workers) as executor:
+            chunksize = max(1, len(paths) // (workers * 4)) if kind == 'processes' else 1
+            for _ in executor.map(read_csv_columnar, paths, chunksize=chunksize):
+                pass
+    return run
+
+
+def _pandas(engine: str) -> Callable[[Sequence[str]], None]:
+    def run(paths: Sequence[str]) -> None:
+        for path in paths:
+            pandas_parse(path, engine)
+    return run
+
+
+def run_parse_benchmarks(
+    files: int = 200,
+    metrics: int = 300,
+    years: int = 20,
+    workers: Iterable[int] = (1, 2, 4, 8),
+    repeat: int = 3,
+    seed: int = 0,
+    data_dir: Optional[str] = None,
+    only: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Time every parsing mode ``repeat`` times over the same files; return the JSON report."""
+    with tempfile.TemporaryDirectory() as scratch:
+        if data_dir:
+            paths = sorted(glob.glob(os.path.join(data_dir, '*', '*_MasterFinancials.csv')))[:files]
+        else:
+            paths = write_master_financials(scratch, files, metrics, years, seed)
+        total_bytes = sum(os.path.getsize(path) for path in paths)
+
+        cases: Dict[str, Callable[[Sequence[str]], None]] = {'serial': _serial}
+        for kind in ('threads', 'processes'):
+            for n in workers:
+                cases[f'{kind}_{n}'] = _pooled(kind, n)
+        for engine in ('c', 'pyarrow'):
+            if _pandas_engine_available(engine):
+                cases[f'pandas_{engine}'] = _pandas(engine)
+
+        results: Dict[str, Any] = {}
+        for name, run in cases.items():
+            if only and only not in name and name != 'serial':
+                continue
+            samples = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                run(paths)
+                samples.append(time.perf_counter() - started)
+            samples.sort()
+            median = samples[len(samples) // 2]
+            results[name] = {
+                'samples': len(samples),
+                'best_s': samples[0],
+                'p50_s': median,
+                'files_per_sec': len(paths) / median if median else None,
+                'mb_per_sec': total_bytes / 1e6 / median if median else None,
+            }
+
+    serial = results.get('serial', {}).get('p50_s')
+    for result in results.values():
+        result['speedup'] = serial / result['p50_s'] if serial and result['p50_s'] else None
+
+    return {
+        'meta': {
+            'files': len(paths),
+            'bytes': total_bytes,
+            'source': data_dir or 'synthetic',
+            'metrics': None if data_dir else metrics,
+            'years': None if data_dir else years,
+            'repeat': repeat,
+            'seed': seed,
+            'cpus': os.cpu_count(),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'benchmarks': results,
+    }
@@ -0,0 +1,109 @@
+"""Period labels for annual, quarterly and trailing-twelve-month rows.
+
+``FinancialPeriod.period`` holds ``'2024'`` for a fiscal year, ``'2024Q1'``
+for a fiscal quarter and ``'TTM2024Q1'`` for the four quarters ending with
+2024Q1.  CSV headers spell quarters several ways (``Q1 2024``, ``2024-Q1``);
+``parse_period`` accepts them all and the ingest commands store the
+canonical label.
+
+Quarters and TTM periods are positioned on a single integer axis,
+``year * 4 + quarter - 1``, so consecutive quarters are consecutive
+numbers and the same quarter a year earlier is four less.
+"""
+
+from calendar import monthrange
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import re
+
+from .calculators.valuation_model import coerce_year
+
+QUARTER_LABEL = re.compile(r'^(?:(\d{4})\s*[-_ ]?\s*Q([1-4])|Q([1-4])\s*[-_ ]?\s*(\d{4}))$', re.IGNORECASE)
+TTM_LABEL = re.compile(r'^TTM(\d{4})Q([1-4])$', re.IGNORECASE)
+
+# (period_type, year, quarter); quarter is None for annual periods
+ParsedPeriod = Tuple[str, int, Optional[int]]
+
+
+def quarter_label(year: int, quarter: int) -> str:
+    return f'{year}Q{quarter}'
+
+
+def ttm_label(year: int, quarter: int) -> str:
+    return f'TTM{year}Q{quarter}'
+
+
+def quarter_number(year: int, quarter: int) -> int:
+    return year * 4 + quarter - 1
+
+
+def quarter_from_number(number: int) -> Tuple[int, int]:
+    """Inverse of ``quarter_number``: ``(year, quarter)``."""
+    year, offset = divmod(int(number), 4)
+    return year, offset + 1
+
+
+def parse_period(label: Any) -> Optional[ParsedPeriod]:
+    """``'2024'`` -> ``('annual', 2024, None)``, ``'Q1 2024'`` -> ``('quarterly', 2024, 1)``,
+    ``'TTM2024Q1'`` -> ``('ttm', 2024, 1)``; None for anything else (``Last5Y_AVG``...)."""
+    text = str(label or '').strip()
+    if len(text) == 4 and text.isdigit():
+        return 'annual', int(text), None
+    match = TTM_LABEL.match(text)
+    if match:
+        return 'ttm', int(match.group(1)), int(match.group(2))
+    match = QUARTER_LABEL.match(text)
+    if match:
+        if match.group(1):
+            return 'quarterly', int(match.group(1)), int(match.group(2))
+        return 'quarterly', int(match.group(4)), int(match.group(3))
+    return None
+
+
+def _quarter_start(year: int, quarter: int) -> date:
+    return date(year, 3 * quarter - 2, 1)
+
+
+def _quarter_end(year: int, quarter: int) -> date:
+    month = 3 * quarter
+    return date(year, month, monthrange(year, month)[1])
+
+
+def period_attributes(label: Any) -> Optional[Dict[str, Any]]:
+    """``FinancialPeriod`` fields (canonical label, type and dates) for a period header, or None."""
+    parsed = parse_period(label)
+    if parsed is None:
+        return None
+    period_type, year, quarter = parsed
+    if period_type == 'annual':
+        return {'period': str(year), 'period_type': 'annual', 'start_date': date(year, 1, 1), 'end_date': date(year, 12, 31)}
+    if period_type == 'quarterly':
+        return {'period': quarter_label(year, quarter), 'period_type': 'quarterly', 'start_date': _quarter_start(year, quarter), 'end_date': _quarter_end(year, quarter)}
+    first_year, first_quarter = quarter_from_number(quarter_number(year, quarter) - 3)
+    return {'period': ttm_label(year, quarter), 'period_type': 'ttm', 'start_date': _quarter_start(first_year, first_quarter), 'end_date': _quarter_end(year, quarter)}
+
+
+def period_position(label: Any, period_type: str = 'annual') -> Optional[int]:
+    """Axis position of a ``period_type`` label: the year for annual periods,
+    ``quarter_number`` for quarters and TTM periods; None when it does not match."""
+    if period_type == 'annual':
+        year = coerce_year(label)
+        return year if isinstance(year, int) else None
+    parsed = parse_period(label)
+    if parsed is None or parsed[0] != period_type:
+        return None
+    return quarter_number(parsed[1], parsed[2])
+
+
+def ttm_frames(rows: Iterable[Tuple[int, str, Any]]) -> Dict[int, List[Tuple[int, str, Any]]]:
+    """Split ``(quarter_number, metric_name, value)`` TTM rows into calculator frames.
+
+    Each frame holds the TTM periods ending in one fiscal quarter, keyed by
+    year, so the calculators' prior-year lookups (``year - 1``) read the
+    TTM period four quarters earlier.  Returns quarter -> rows.
+    """
+    frames: Dict[int, List[Tuple[int, str, Any]]] = {}
+    for position, metric_name, value in rows:
+        year, quarter = quarter_from_number(position)
+        frames.setdefault(quarter, []).append((year, metric_name, value))
+    return frames
@@ -0,0 +1,112 @@
+"""Trailing N-year averages and CAGRs of the stored raw metrics.
+
+Replaces the ``LastNY_AVG`` / ``LastNY_CAGR`` columns that used to be
+precomputed upstream and stored as extra ``FinancialPeriod`` rows.  The
+windows are computed here for every company and metric at once from a
+``MetricPanel``: averages come from prefix sums over the year axis, so
+any window length costs two gathers, and CAGRs compare each company's
+latest year with the year ``N`` before it.
+
+Windows end at the company's latest year holding any metric.  An average
+uses the years in the window that have a value; a CAGR needs both
+endpoints and both must be positive.  ``STANDARD_WINDOWS`` are persisted
+to ``WindowMetric`` at ingest; other lengths are computed on demand.
+"""
+
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+import logging
+import re
+
+import numpy as np
+from django.db import transaction
+
+from sec_app.models import WindowMetric
+from .panel import MetricPanel
+
+logger = logging.getLogger(__name__)
+
+STANDARD_WINDOWS: Tuple[int, ...] = (1, 2, 3, 4, 5, 10, 15)
+KINDS: Tuple[str, ...] = ('AVG', 'CAGR')
+
+WINDOW_LABEL = re.compile(r'^Last(\d+)Y_(AVG|CAGR)$')
+
+# (company_id, metric_name, window, kind, end_year, value)
+WindowRow = Tuple[int, str, int, str, int, float]
+
+
+def window_label(window: int, kind: str) -> str:
+    return f'Last{window}Y_{kind}'
+
+
+def parse_window_label(label: str) -> Optional[Tuple[int, str]]:
+    """``'Last5Y_CAGR'`` -> ``(5, 'CAGR')``; None for anything else."""
+    match = WINDOW_LABEL.match(label or '')
+    if not match or int(match.group(1)) < 1:
+        return None
+    return int(match.group(1)), match.group(2)
+
+
+def compute_windows(panel: MetricPanel, windows: Iterable[int] = STANDARD_WINDOWS, kinds: Iterable[str] = KINDS) -> Iterator[WindowRow]:
+    """Yield every finite window value in ``panel``."""
+    last = panel.last_period_index()
+    companies = np.flatnonzero(last >= 0)
+    if not len(companies) or not panel.values.shape[0]:
+        return
+    end = last[companies]
+    values = panel.values[:, companies, :]
+    present = ~np.isnan(values)
+    # Prefix sums with a leading zero column: sum over years (a, b] is cum[..., b] - cum[..., a]
+    totals = np.concatenate([np.zeros(values.shape[:2] + (1,)), np.cumsum(np.where(present, values, 0.0), axis=2)], axis=2)
+    counts = np.concatenate([np.zeros(values.shape[:2] + (1,), dtype=np.int64), np.cumsum(present, axis=2)], axis=2)
+    rows = np.arange(len(companies))
+    latest = values[:, rows, end]
+
+    for window in sorted(set(windows)):
+        for kind in kinds:
+            if kind == 'AVG':
+                start = np.maximum(end + 1 - window, 0)
+                n = counts[:, rows, end + 1] - counts[:, rows, start]
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    result = (totals[:, rows, end + 1] - totals[:, rows, start]) / n
+                result[n == 0] = np.nan
+            elif kind == 'CAGR':
+                start = end - window
+                first = np.where(start >= 0, values[:, rows, np.maximum(start, 0)], np.nan)
+                valid = (first > 0) & (latest > 0)
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    result = np.where(valid, (latest / np.where(valid, first, 1.0)) ** (1.0 / window) - 1.0, np.nan)
+            else:
+                raise ValueError(f"Unknown window kind: {kind}")
+
+            field_pos, company_pos = np.nonzero(np.isfinite(result))
+            for j, c, value in zip(field_pos.tolist(), company_pos.tolist(), result[field_pos, company_pos].tolist()):
+                yield int(panel.company_ids[companies[c]]), panel.names[j], window, kind, int(panel.periods[end[c]]), value
+
+
+def company_windows(company_id: int, windows: Iterable[int], kinds: Iterable[str] = KINDS, metrics: Optional[Iterable[str]] = None, period_type: str = 'annual') -> Tuple[Optional[int], Dict[str, Dict[str, float]]]:
+    """One company's windows computed from its raw metrics: ``(end_year, label -> metric -> value)``."""
+    panel = MetricPanel.load(metrics, period_type, [company_id])
+    end_year = None
+    result: Dict[str, Dict[str, float]] = {}
+    for _, metric_name, window, kind, end_year, value in compute_windows(panel, windows, kinds):
+        result.setdefault(window_label(window, kind), {})[metric_name] = value
+    return end_year, result
+
+
+def refresh_window_metrics(company_ids: Optional[Iterable[int]] = None, windows: Iterable[int] = STANDARD_WINDOWS, period_type: str = 'annual', batch_size: int = 5000) -> int:
+    """Recompute and rewrite ``WindowMetric`` rows for ``company_ids`` (every company when None)."""
+    windows = sorted(set(windows))
+    company_ids = None if company_ids is None else sorted(set(company_ids))
+    panel = MetricPanel.load(None, period_type, company_ids)
+    objects = [
+        WindowMetric(company_id=company_id, metric_name=metric_name, window=window, kind=kind, end_year=end_year, value=value)
+        for company_id, metric_name, window, kind, end_year, value in compute_windows(panel, windows)
+    ]
+    stale = WindowMetric.objects.filter(window__in=windows)
+    if company_ids is not None:
+        stale = stale.filter(company_id__in=company_ids)
+    with transaction.atomic():
+        stale.delete()
+        WindowMetric.objects.bulk_create(objects, batch_size=batch_size)
+    logger.info(f"Wrote {len(objects)} window metrics for {len(panel.company_ids)} companies")
+    return len(objects)
@@ -0,0 +1,6 @@
+from django.urls import re_path
+from sec_app_2.consumers import ValuationModelConsumer
+
+websocket_urlpatterns = [
+    re_path(r"ws/valuation-model/(?P<ticker>[A-Za-z0-9.\-]+)/$", ValuationModelConsumer.as_asgi()),
+]
@@ -1,3 +1,1121 @@
-from django.test import TestCase
+import copy
+import io
+import json
+import logging
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+from unittest import mock, skipIf, skipUnless
 
-# Create your tests here.
+import numpy as np
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from sec_app.ingest import (
+    FlushError,
+    IngestJournal,
+    IngestManifest,
+    MetricWriter,
+    UpsertResult,
+    parse_executor,
+    parse_income_statement,
+    parse_master_financials,
+    read_csv_columnar,
+    read_statement_csv,
+    upsert_metrics,
+)
+from sec_app.models import Company, DerivedMetric, FinancialMetric, FinancialPeriod, IngestedFile, IngestRun, WindowMetric
+
+from .calculators.frame import StatementFrame, compact_model, expand_model
+from .calculators.graph import CalculatorGraph, StatementSpec, calculator_graph
+from .calculators.valuation_model import build_model, recompute_model
+from .calculators.vectorized import vectorized_engine
+from .derived_metrics import DERIVED_METRICS_VERSION, compute_company, refresh_company, refresh_dirty_pairs
+from .validation import run_checks
+from .panel import MetricPanel
+from .parse_benchmarks import run_parse_benchmarks, write_master_financials
+from .periods import quarter_number, ttm_label
+from .rolling import compute_windows, parse_window_label, refresh_window_metrics
+from .ttm import compute_ttm, refresh_ttm
+from .model_sessions import InProcessSessionStore, SessionConflict, get_session_store
+from .views import model_delta_response
+
+# Fields that are rates rather than amounts
+RATE_FIELDS = {'LeasesDiscountRate': (0.03, 0.07), 'WeightedAverageCostOfCapital': (0.06, 0.12)}
+
+
+def _same(a, b):
+    if isinstance(a, float) and isinstance(b, float):
+        return (a != a and b != b) or math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-9)
+    return a == b
+
+
+def sample_statements(years=5, seed=0, last_year=2024):
+    """Raw inputs for every statement in the calculator graph, each a jittered ratio of one revenue path."""
+    rng = random.Random(seed)
+    inputs = sorted({source for refs in calculator_graph.inputs.values() for source, _ in refs if source not in calculator_graph.inputs})
+    revenue = rng.lognormvariate(21, 1.5)
+    ratios = {node: rng.uniform(0.005, 0.35) for node in inputs}
+    statements = {statement: {} for statement in calculator_graph.specs}
+    for year in range(last_year - years + 1, last_year + 1):
+        for statement, field_name in inputs:
+            row = statements.setdefault(statement, {}).setdefault(year, {})
+            if field_name in RATE_FIELDS:
+                row[field_name] = rng.uniform(*RATE_FIELDS[field_name])
+            elif field_name == 'Revenue':
+                row[field_name] = revenue
+            else:
+                row[field_name] = revenue * ratios[(statement, field_name)] * rng.uniform(0.95, 1.05)
+        revenue *= 1 + rng.gauss(0.05, 0.03)
+    return statements
+
+
+def seed_company(ticker, period_type, periods):
+    """A company with ``{period label: {metric_name: value}}`` stored as ``FinancialMetric`` rows."""
+    company = Company.objects.create(name=ticker, ticker=ticker)
+    for label, metrics in periods.items():
+        period = FinancialPeriod.objects.create(company=company, period=label, period_type=period_type)
+        FinancialMetric.objects.bulk_create(
+            FinancialMetric(company=company, period=period, metric_name=name, value=value) for name, value in metrics.items()
+        )
+    return company
+
+
+class QuietCalculatorsMixin:
+    """The calculator facades log every update at INFO and every skipped cell at ERROR."""
+
+    def setUp(self):
+        super().setUp()
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+
+
+class CalculatorGraphTests(QuietCalculatorsMixin, SimpleTestCase):
+    def test_inputs_come_before_their_dependents(self):
+        for node, refs in calculator_graph.inputs.items():
+            for source, _ in refs:
+                if source in calculator_graph.rank:
+                    self.assertLess(calculator_graph.rank[source], calculator_graph.rank[node], f'{source} after {node}')
+
+    def test_cycles_are_rejected(self):
+        class Cyclic:
+            statement = 'cyclic'
+            calculated_fields = ['A', 'B']
+            field_inputs = {'A': ['B'], 'B': ['A']}
+
+        with self.assertRaisesRegex(ValueError, 'cyclic.A, cyclic.B'):
+            CalculatorGraph([StatementSpec(Cyclic(), lambda *args: None)])
+
+    def test_incremental_recalculation_matches_a_full_recompute(self):
+        statements = sample_statements(5, seed=2)
+        year = sorted(statements['income_statement'])[2]
+        model = calculator_graph.recalculate_all(copy.deepcopy(statements))
+
+        edits = [('income_statement', year, 'Revenue', 98765.0), ('balance_sheet', year, 'Inventory', 4321.0)]
+        for statement, edit_year, field_name, value in edits:
+            model[statement][edit_year][field_name] = value
+            statements[statement][edit_year][field_name] = value
+        changed = calculator_graph.recalculate(model, [cell[:3] for cell in edits])
+        self.assertLessEqual({'income_statement', 'balance_sheet'}, {statement for statement, _, _ in changed})
+        self.assertTrue(all(cell_year >= year for _, cell_year, _ in changed))
+
+        full = calculator_graph.recalculate_all(copy.deepcopy(statements))
+        for statement, rows in full.items():
+            for row_year, row in rows.items():
+                for field_name, value in row.items():
+                    self.assertTrue(_same(model[statement][row_year].get(field_name), value), f'{statement} {row_year} {field_name}')
+
+    def test_totals_are_computed_from_fresh_subtotals(self):
+        from .utils import update_balance_sheet_calculations
+
+        row = dict(sample_statements(1)['balance_sheet'][2024], AssetsCurrent=1.0, AssetsNoncurrent=1.0, TotalAssets=2.0)
+        updated = update_balance_sheet_calculations({2024: row}, 2024)[2024]
+        self.assertNotEqual(updated['AssetsCurrent'], 1.0)
+        self.assertTrue(_same(updated['TotalAssets'], updated['AssetsCurrent'] + updated['AssetsNoncurrent']))
+        self.assertTrue(_same(updated['LiabilitiesAndStockholdersEquity'], updated['TotalAssets']))
+
+
+class VectorizedParityTests(QuietCalculatorsMixin, SimpleTestCase):
+    def assertModelsMatch(self, expected, actual):
+        for statement, rows in expected.items():
+            for year in set(rows) | set(actual[statement]):
+                left, right = rows.get(year, {}), actual[statement].get(year, {})
+                for field_name in set(left) | set(right):
+                    self.assertTrue(
+                        _same(left.get(field_name), right.get(field_name)),
+                        f"{statement} {year} {field_name}: scalar {left.get(field_name)!r}, vectorized {right.get(field_name)!r}",
+                    )
+
+    def recompute_both(self, statements):
+        scalar = calculator_graph.recalculate_all(copy.deepcopy(statements))
+        vectorized = vectorized_engine.recalculate_all(copy.deepcopy(statements))
+        return scalar, vectorized
+
+    def test_full_statements(self):
+        for seed in range(3):
+            self.assertModelsMatch(*self.recompute_both(sample_statements(6, seed=seed)))
+
+    def test_sparse_and_invalid_inputs(self):
+        rng = random.Random(7)
+        for seed in range(5):
+            statements = sample_statements(5, seed=seed)
+            for rows in statements.values():
+                for row in rows.values():
+                    for field_name in list(row):
+                        draw = rng.random()
+                        if draw < 0.2:
+                            del row[field_name]
+                        elif draw < 0.25:
+                            row[field_name] = None
+                        elif draw < 0.3:
+                            row[field_name] = 'n/a'
+            self.assertModelsMatch(*self.recompute_both(statements))
+
+    def test_missing_wacc(self):
+        statements = sample_statements(4)
+        for wacc in (None, 'n/a', '0.08'):
+            variant = copy.deepcopy(statements)
+            for row in variant['free_cash_flow'].values():
+                row['WeightedAverageCostOfCapital'] = wacc
+            scalar, vectorized = self.recompute_both(variant)
+            self.assertModelsMatch(scalar, vectorized)
+            factors = [row.get('DiscountFactor') for _, row in sorted(vectorized['free_cash_flow'].items())]
+            self.assertEqual(factors, [1.0, None, None, None])
+
+        # An absent WACC discounts at the 10% default in both engines
+        variant = copy.deepcopy(statements)
+        for row in variant['free_cash_flow'].values():
+            row.pop('WeightedAverageCostOfCapital', None)
+        scalar, vectorized = self.recompute_both(variant)
+        self.assertModelsMatch(scalar, vectorized)
+        second_year = sorted(vectorized['free_cash_flow'])[1]
+        self.assertAlmostEqual(vectorized['free_cash_flow'][second_year]['DiscountFactor'], 1 / 1.1)
+
+
+class ValuationModelRecomputeTests(QuietCalculatorsMixin, SimpleTestCase):
+    def post(self, payload):
+        return APIClient(SERVER_NAME='localhost').post('/api/sec/valuation-model/recompute/', payload, format='json')
+
+    def test_recomputes_every_statement_with_the_edits_applied(self):
+        statements = sample_statements(4, seed=3)
+        payload = {statement: {str(year): row for year, row in rows.items()} for statement, rows in statements.items()}
+        response = self.post({
+            'ticker': 'abc',
+            'statements': payload,
+            'edits': [{'statement': 'income_statement', 'year': '2023', 'field': 'Revenue', 'value': 12345.0}],
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['ticker'], 'ABC')
+
+        statements['income_statement'][2023]['Revenue'] = 12345.0
+        expected = calculator_graph.recalculate_all(copy.deepcopy(statements))
+        for statement, rows in expected.items():
+            for year, row in rows.items():
+                returned = response.data['statements'][statement][str(year)]
+                for field_name, value in row.items():
+                    self.assertTrue(_same(returned.get(field_name), value), f'{statement} {year} {field_name}')
+
+    def test_malformed_payloads_are_rejected(self):
+        for payload in (
+            {'statements': 'income_statement'},
+            {'statements': {'balance_sheet': [2023]}},
+            {'statements': {}, 'edits': ['Revenue']},
+            {'statements': {}, 'edits': [{'statement': 'unknown', 'year': 2023, 'field': 'Revenue', 'value': 1}]},
+        ):
+            self.assertEqual(self.post(payload).status_code, 400, payload)
+
+
+class ValuationModelDeltaTests(QuietCalculatorsMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        # One browser session throughout, so every request reaches the same model sessions
+        self.api = APIClient(SERVER_NAME='localhost')
+
+    def post(self, payload, url='/api/sec/valuation-model/delta/'):
+        return self.api.post(url, payload, format='json')
+
+    def seed(self, statements):
+        payload = {statement: {str(year): row for year, row in rows.items()} for statement, rows in statements.items()}
+        response = self.post({'statements': payload})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['version'], 1)
+        return response.data['model_id']
+
+    def test_edits_return_only_changed_cells_of_a_full_recompute(self):
+        statements = sample_statements(4, seed=4)
+        model_id = self.seed(statements)
+
+        response = self.post({
+            'model_id': model_id,
+            'version': 1,
+            'edits': [{'statement': 'balance_sheet', 'year': 2023, 'field': 'Inventory', 'value': 777.0}],
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['version'], 2)
+        self.assertNotIn('statements', response.data)
+
+        statements['balance_sheet'][2023]['Inventory'] = 777.0
+        expected = calculator_graph.recalculate_all(copy.deepcopy(statements))
+        changes = response.data['changes']
+        self.assertIn('balance_sheet', changes)
+        for statement, rows in changes.items():
+            for year, row in rows.items():
+                self.assertGreaterEqual(int(year), 2023)
+                for field_name, value in row.items():
+                    self.assertTrue(_same(value, expected[statement][int(year)].get(field_name)), f'{statement} {year} {field_name}')
+
+    def test_stale_or_unknown_models_ask_for_a_resync(self):
+        model_id = self.seed(sample_statements(3))
+        edit = [{'year': 2024, 'field': 'revenue', 'value': 1.0}]
+        self.assertEqual(self.post({'model_id': model_id, 'version': 1, 'edits': edit}).status_code, 200)
+
+        for payload in ({'model_id': model_id, 'version': 1, 'edits': edit}, {'model_id': 'missing', 'edits': edit}):
+            response = self.post(payload)
+            self.assertEqual(response.status_code, 409)
+            self.assertTrue(response.data['resync'])
+
+    def test_dependent_field_views_speak_the_delta_protocol(self):
+        statements = sample_statements(3)
+        payload = {statement: {str(year): row for year, row in rows.items()} for statement, rows in statements.items()}
+        response = self.post(
+            {'statements': payload, 'edits': [{'year': 2024, 'field': 'revenue', 'value': 5.0}]},
+            url='/api/sec/dependent-fields/',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['statements']['income_statement']['2024']['Revenue'], 5.0)
+
+
+class ModelSessionTests(QuietCalculatorsMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.statements = sample_statements(4)
+        self.year = sorted(self.statements['income_statement'])[1]
+
+    def test_delta_and_version_conflict(self):
+        opened = model_delta_response({'statements': self.statements}, 'user:1')
+        self.assertEqual(opened.status_code, 200)
+        model_id, version = opened.data['model_id'], opened.data['version']
+
+        edit = {'year': self.year, 'field': 'Revenue', 'value': 12345.0}
+        edited = model_delta_response({'model_id': model_id, 'version': version, 'edits': [edit]}, 'user:1')
+        self.assertEqual(edited.status_code, 200)
+        self.assertEqual(edited.data['version'], version + 1)
+        changes = edited.data['changes']['income_statement'][str(self.year)]
+        self.assertIn('GrossIncome', changes)
+        # Only the edited year and the years that roll forward from it come back
+        self.assertNotIn(str(sorted(self.statements['income_statement'])[0]), edited.data['changes']['income_statement'])
+
+        expected = recompute_model(build_model(copy.deepcopy(self.statements)), edits=[edit])
+        self.assertTrue(_same(changes['GrossIncome'], expected['income_statement'][self.year]['GrossIncome']))
+
+        stale = model_delta_response({'model_id': model_id, 'version': version, 'edits': [edit]}, 'user:1')
+        self.assertEqual(stale.status_code, 409)
+        self.assertTrue(stale.data['resync'])
+        self.assertEqual(stale.data['version'], version + 1)
+
+    def test_rejected_batch_leaves_the_session_untouched(self):
+        opened = model_delta_response({'statements': self.statements}, 'user:1')
+        model_id, version = opened.data['model_id'], opened.data['version']
+        session = get_session_store().get(model_id)
+        revenue = session.model['income_statement'][self.year]['Revenue']
+
+        edits = [{'year': self.year, 'field': 'Revenue', 'value': 999.0}, {'year': self.year}]
+        rejected = model_delta_response({'model_id': model_id, 'version': version, 'edits': edits}, 'user:1')
+        self.assertEqual(rejected.status_code, 400)
+        self.assertEqual(session.model['income_statement'][self.year]['Revenue'], revenue)
+        self.assertEqual((session.version, session.dirty), (version, set()))
+
+    def test_sessions_open_only_for_their_owner_and_ticker(self):
+        opened = model_delta_response({'statements': self.statements, 'ticker': 'T0'}, 'user:1')
+        model_id, version = opened.data['model_id'], opened.data['version']
+        store = get_session_store()
+        self.assertIsNotNone(store.open(model_id, 'user:1', 'T0'))
+        self.assertIsNone(store.open(model_id, 'user:1', 'T1'))
+
+        edit = {'year': self.year, 'field': 'Revenue', 'value': 1.0}
+        foreign = model_delta_response({'model_id': model_id, 'version': version, 'edits': [edit]}, 'user:2')
+        self.assertEqual(foreign.status_code, 409)
+        # Reseeding under someone else's ID opens a new session and leaves theirs alone
+        reseeded = model_delta_response({'model_id': model_id, 'statements': self.statements}, 'user:2')
+        self.assertNotEqual(reseeded.data['model_id'], model_id)
+        self.assertEqual(store.get(model_id).version, version)
+
+    def test_commit_of_discarded_session_conflicts(self):
+        store = InProcessSessionStore()
+        model = recompute_model(build_model(copy.deepcopy(self.statements)))
+        session = store.create(model, 'T0', 'user:1')
+        self.assertNotEqual(store.create(model, 'T0', 'user:1').session_id, session.session_id)
+        self.assertIs(store.lock(session.session_id), store.lock(session.session_id))
+        session.apply([{'year': self.year, 'field': 'Revenue', 'value': 1.0}])
+        store.discard(session.session_id)
+        with self.assertRaises(SessionConflict):
+            store.commit(session)
+
+
+class DependentFieldsSessionTests(QuietCalculatorsMixin, TestCase):
+    def test_dependent_field_views_tie_sessions_to_the_client(self):
+        from django.urls import reverse
+
+        statements = sample_statements(3)
+        year = sorted(statements['balance_sheet'])[1]
+        edit = {'year': year, 'field': 'Inventory', 'statement': 'balance_sheet', 'value': 5.0}
+        owner, other = APIClient(SERVER_NAME='localhost'), APIClient(SERVER_NAME='localhost')
+        for name in ('dependent_fields', 'balance_sheet_dependent_fields'):
+            opened = owner.post(reverse(name), {'statements': statements, 'edits': []}, format='json')
+            self.assertEqual(opened.status_code, 200)
+            delta = {'model_id': opened.data['model_id'], 'version': opened.data['version'], 'edits': [edit]}
+            self.assertEqual(other.post(reverse(name), delta, format='json').status_code, 409)
+            self.assertEqual(owner.post(reverse(name), delta, format='json').status_code, 200)
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class ValuationModelConsumerTests(QuietCalculatorsMixin, TestCase):
+    def communicator(self, ticker='T0'):
+        from channels.auth import AuthMiddlewareStack
+        from channels.routing import URLRouter
+        from channels.testing import WebsocketCommunicator
+
+        from .routing import websocket_urlpatterns
+
+        return WebsocketCommunicator(AuthMiddlewareStack(URLRouter(websocket_urlpatterns)), f'/ws/valuation-model/{ticker}/')
+
+    async def test_load_then_edit_streams_only_the_changed_cells(self):
+        statements = sample_statements(3)
+        year = sorted(statements['income_statement'])[1]
+        socket = self.communicator()
+        connected, _ = await socket.connect()
+        self.assertTrue(connected)
+
+        await socket.send_json_to({'type': 'edit', 'edits': []})
+        self.assertEqual((await socket.receive_json_from())['type'], 'error')
+
+        await socket.send_json_to({'type': 'load', 'statements': statements})
+        loaded = await socket.receive_json_from()
+        self.assertEqual((loaded['type'], loaded['version']), ('model', 1))
+
+        await socket.send_json_to({'type': 'edit', 'request_id': 7, 'edits': [{'year': year, 'field': 'revenue', 'value': 10.0}]})
+        reply = await socket.receive_json_from()
+        self.assertEqual((reply['type'], reply['request_id'], reply['version']), ('changes', 7, 2))
+        self.assertEqual(reply['model_id'], loaded['model_id'])
+
+        statements['income_statement'][year]['Revenue'] = 10.0
+        expected = calculator_graph.recalculate_all(copy.deepcopy(statements))
+        gross_income = reply['changes']['income_statement'][str(year)]['GrossIncome']
+        self.assertTrue(_same(gross_income, expected['income_statement'][year]['GrossIncome']))
+        await socket.disconnect()
+
+
+class BatchDependentFieldsTests(QuietCalculatorsMixin, TestCase):
+    def test_batch_matches_one_edit_at_a_time(self):
+        from .utils import recalculate_balance_sheet_dependent_fields, recalculate_balance_sheet_dependent_fields_batch
+
+        dataset = sample_statements(4, seed=5)['balance_sheet']
+        edits = [(2022, 'Inventory', 10.0), (2023, 'AccountsPayableCurrent', 20.0), (2023, 'Inventory', 30.0)]
+
+        sequential = copy.deepcopy(dataset)
+        for year, field_name, value in edits:
+            sequential[year][field_name] = value
+            sequential = recalculate_balance_sheet_dependent_fields(sequential, year, field_name)
+        batched = recalculate_balance_sheet_dependent_fields_batch(copy.deepcopy(dataset), edits)
+        for year, row in sequential.items():
+            for field_name, value in row.items():
+                self.assertTrue(_same(batched[year].get(field_name), value), f'{year} {field_name}')
+
+    def test_view_reports_each_edited_year_under_api_and_ui_names(self):
+        from django.urls import reverse
+
+        dataset = {str(year): row for year, row in sample_statements(3)['balance_sheet'].items()}
+        changes = [{'year': 2023, 'changed_field': 'Inventory', 'value': 1.0}, {'year': 2024, 'changed_field': 'Inventory', 'value': 2.0}]
+        client = APIClient(SERVER_NAME='localhost')
+        response = client.post(reverse('balance_sheet_dependent_fields'), {'data': dataset, 'changes': changes}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['years'], ['2023', '2024'])
+        for year in ('2023', '2024'):
+            fields = response.data['recalculated_fields'][year]
+            self.assertEqual(fields['Assets'], fields['TotalAssets'])
+            self.assertEqual(fields['CurrentAssets'], fields['AssetsCurrent'])
+
+        for changes in ([], [{'changed_field': 'Inventory'}]):
+            response = client.post(reverse('balance_sheet_dependent_fields'), {'data': dataset, 'changes': changes}, format='json')
+            self.assertEqual(response.status_code, 400)
+
+
+class SensitivityTests(QuietCalculatorsMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.statements = sample_statements(4)
+        self.model = recompute_model(build_model(copy.deepcopy(self.statements)))
+
+    def test_grid_covers_every_combination_and_monte_carlo_is_seeded(self):
+        from .calculators.sensitivity import run_dcf_sensitivity
+
+        grid = run_dcf_sensitivity(self.model, {'wacc': {'grid': [0.08, 0.1]}, 'revenue_growth': {'grid': [0.0, 0.02, 0.04]}})
+        self.assertEqual((grid['mode'], grid['scenarios']), ('grid', 6))
+        self.assertEqual({bar['driver'] for bar in grid['tornado']}, {'wacc', 'revenue_growth'})
+
+        drivers = {'wacc': {'normal': {'mean': 0.09, 'std': 0.01}}}
+        first = run_dcf_sensitivity(self.model, drivers, samples=500, seed=3)
+        self.assertEqual((first['mode'], first['scenarios']), ('monte_carlo', 500))
+        self.assertEqual(first['percentiles'], run_dcf_sensitivity(self.model, drivers, samples=500, seed=3)['percentiles'])
+
+    def test_rejects_bool_and_non_mapping_drivers(self):
+        from .calculators.sensitivity import SensitivityError, run_dcf_sensitivity
+
+        self.assertEqual(run_dcf_sensitivity(self.model, {'wacc': {'grid': [0.08, 0.1]}})['mode'], 'grid')
+        for drivers in ({'wacc': True}, {'wacc': {'value': False}}, {'wacc': {'grid': [0.1, True]}}, {'wacc': {'normal': {'mean': True, 'std': 0.01}}}, [0.1], 'wacc'):
+            with self.assertRaises(SensitivityError, msg=repr(drivers)):
+                run_dcf_sensitivity(self.model, drivers)
+
+    def test_view_runs_on_the_callers_open_session(self):
+        from django.urls import reverse
+
+        owner, other = APIClient(SERVER_NAME='localhost'), APIClient(SERVER_NAME='localhost')
+        opened = owner.post(reverse('valuation_model_delta'), {'statements': self.statements}, format='json')
+        request = {'model_id': opened.data['model_id'], 'drivers': {'wacc': {'grid': [0.08, 0.1]}}}
+        response = owner.post(reverse('valuation_model_sensitivity'), request, format='json')
+        self.assertEqual((response.status_code, response.data['scenarios']), (200, 2))
+        self.assertEqual(other.post(reverse('valuation_model_sensitivity'), request, format='json').status_code, 409)
+        self.assertEqual(owner.post(reverse('valuation_model_sensitivity'), dict(request, drivers={'wacc': True}), format='json').status_code, 400)
+
+
+class ComputeDerivedMetricsTests(QuietCalculatorsMixin, TestCase):
+    def test_selected_companies_get_their_derived_metrics_replaced(self):
+        periods = {'2022': {'Revenue': 100.0, 'CostOfRevenue': 40.0}, '2023': {'Revenue': 120.0, 'CostOfRevenue': 50.0}}
+        company = seed_company('AAA', 'annual', periods)
+        seed_company('BBB', 'annual', periods)
+
+        for _ in range(2):
+            call_command('compute_derived_metrics', tickers=['aaa'], workers=1, stdout=io.StringIO())
+            gross = dict(
+                DerivedMetric.objects.filter(company=company, metric_name='GrossIncome').values_list('period__period', 'value')
+            )
+            self.assertEqual(gross, {'2022': 60.0, '2023': 70.0})
+        self.assertFalse(DerivedMetric.objects.exclude(company=company).exists())
+        self.assertEqual(DerivedMetric.objects.filter(metric_name='GrossIncome').count(), 2)
+
+
+class DerivedMetricsTests(QuietCalculatorsMixin, TestCase):
+    def test_quarterly_periods_are_computed_on_the_quarter_axis(self):
+        company = seed_company('QTR', 'quarterly', {
+            f'2023Q{q}': {'Revenue': 100.0 * q, 'CostOfRevenue': 40.0 * q} for q in range(1, 5)
+        })
+        period_ids, cells = compute_company(company.id, 'quarterly')
+        self.assertEqual(sorted(period_ids), [quarter_number(2023, q) for q in range(1, 5)])
+        gross = {position: value for position, _, name, value in cells if name == 'GrossIncome'}
+        self.assertEqual(gross, {quarter_number(2023, q): 60.0 * q for q in range(1, 5)})
+
+    def test_cells_with_missing_inputs_are_not_persisted(self):
+        company = seed_company('GAP', 'annual', {
+            '2022': {'Revenue': 100.0, 'CostOfRevenue': 40.0},
+            '2023': {'Revenue': 120.0, 'CostOfRevenue': 50.0, 'SellingGeneralAdministrative': 12.0},
+        })
+        _, cells = compute_company(company.id)
+        names = {(year, name): value for year, _, name, value in cells}
+        self.assertEqual(names[(2022, 'GrossIncome')], 60.0)
+        self.assertEqual(names[(2023, 'SGAAsPercentOfRevenue')], 10.0)
+        self.assertNotIn((2022, 'SGAAsPercentOfRevenue'), names)
+        self.assertNotIn(0.0, names.values())
+
+    def test_dirty_periods_rewrite_only_the_years_they_affect(self):
+        company = seed_company('DRT', 'annual', {
+            str(year): {'Revenue': 100.0 + year, 'CostOfRevenue': 40.0} for year in (2021, 2022, 2023, 2024)
+        })
+        refresh_company(company.id)
+        gross = DerivedMetric.objects.filter(company=company, metric_name='GrossIncome')
+        gross.update(value=-1.0)
+
+        period = FinancialPeriod.objects.get(company=company, period='2022')
+        FinancialMetric.objects.filter(period=period, metric_name='Revenue').update(value=500.0)
+        refresh_dirty_pairs([(company.id, period.id)])
+        # 2022 and the year after it are rewritten; the earlier and later years keep their rows
+        self.assertEqual(
+            dict(gross.values_list('period__period', 'value')),
+            {'2021': -1.0, '2022': 460.0, '2023': 2083.0, '2024': -1.0},
+        )
+        self.assertEqual(set(gross.values_list('version', flat=True)), {DERIVED_METRICS_VERSION})
+
+    def test_view_serves_persisted_rows_and_flags_old_versions(self):
+        company = seed_company('LDR', 'annual', {'2023': {'Revenue': 100.0, 'CostOfRevenue': 40.0}})
+        refresh_dirty_pairs(FinancialMetric.objects.filter(company=company).values_list('company_id', 'period_id'))
+        response = APIClient(SERVER_NAME='localhost').get('/api/sec/derived-metrics/ldr/', {'metrics': 'GrossIncome'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data['stale'])
+        self.assertEqual(response.data['statements']['income_statement'], {'2023': {'GrossIncome': 60.0}})
+
+        DerivedMetric.objects.update(version=DERIVED_METRICS_VERSION - 1)
+        self.assertTrue(APIClient(SERVER_NAME='localhost').get('/api/sec/derived-metrics/LDR/').data['stale'])
+        self.assertEqual(APIClient(SERVER_NAME='localhost').get('/api/sec/derived-metrics/NONE/').status_code, 404)
+
+
+class StatementFrameTests(QuietCalculatorsMixin, SimpleTestCase):
+    def test_round_trips_values_that_are_not_plain_numbers(self):
+        dataset = {2020: {'Revenue': 10, 'Note': 'restated', 'CostOfRevenue': None}, 2023: {'Revenue': float('nan')}, 'CAGR': {'Revenue': 0.1}}
+        frame = StatementFrame.from_dict(dataset, 'income_statement')
+        self.assertEqual(sorted(frame, key=str), sorted(dataset, key=str))
+        restored = frame.to_dict()
+        self.assertEqual(restored[2020], {'Revenue': 10.0, 'Note': 'restated', 'CostOfRevenue': None})
+        self.assertTrue(math.isnan(restored[2023]['Revenue']))
+        self.assertEqual(restored['CAGR'], {'Revenue': 0.1})
+        self.assertNotIn(2021, frame)
+        self.assertEqual(frame.get(2021, {}).get('Revenue'), None)
+
+    def test_rows_behave_like_dicts(self):
+        frame = StatementFrame.from_dict({2022: {'Revenue': 1.0}}, 'income_statement')
+        frame.setdefault(2023, {})['Revenue'] = 2.0
+        frame[2023]['NewField'] = 3.0
+        del frame[2022]['Revenue']
+        self.assertEqual(frame.to_dict(), {2022: {}, 2023: {'Revenue': 2.0, 'NewField': 3.0}})
+        self.assertEqual(frame[2023].prior.to_dict(), {})
+
+    def test_calculators_give_the_same_results_on_frames(self):
+        statements = sample_statements(5, seed=6)
+        expected = calculator_graph.recalculate_all(copy.deepcopy(statements))
+        for engine in (calculator_graph, vectorized_engine):
+            model = compact_model(copy.deepcopy(statements))
+            engine.recalculate_all(model)
+            actual = expand_model(model)
+            for statement, rows in expected.items():
+                for year, row in rows.items():
+                    for field_name, value in row.items():
+                        self.assertTrue(_same(actual[statement][year].get(field_name), value), f'{engine} {statement} {year} {field_name}')
+
+
+class RequestNormalizationTests(QuietCalculatorsMixin, SimpleTestCase):
+    def test_aliases_resolve_to_canonical_fields(self):
+        from .calculators.aliases import canonical_field, rename_fields
+
+        self.assertEqual(canonical_field('cost_of_revenue'), 'CostOfRevenue')
+        self.assertEqual(canonical_field('SGA'), 'SellingGeneralAdministrative')
+        self.assertEqual(canonical_field('UnknownField'), 'UnknownField')
+        self.assertEqual(rename_fields({'revenue': 1.0, 'Other': 2.0}), {'Revenue': 1.0, 'Other': 2.0})
+
+    def test_dependent_fields_normalize_each_row_once(self):
+        from django.urls import reverse
+
+        from . import utils
+        from .calculators import aliases
+
+        payload = {
+            'data': {'2023': {'revenue': 100.0, 'cost_of_revenue': 40.0, 'SGA': 10.0}, '2022': {'Revenue': 90.0}},
+            'year': 2023,
+            'changed_field': 'Revenue',
+        }
+        with mock.patch.object(aliases, 'normalize_year_fields', wraps=aliases.normalize_year_fields) as normalize, \
+                mock.patch.object(utils, 'normalize_dataset', wraps=utils.normalize_dataset) as facade:
+            response = APIClient(SERVER_NAME='localhost').post(reverse('dependent_fields'), payload, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(normalize.call_count, 2)
+        # The facade is handed the view's dataset and has nothing left to do
+        self.assertIsInstance(facade.call_args.args[0], aliases.NormalizedDataset)
+        row = response.data['updated_data']['2023']
+        self.assertEqual((row['Revenue'], row['SellingGeneralAdministrative']), (100.0, 10.0))
+        self.assertEqual(response.data['recalculated_fields']['GrossIncome'], 60.0)
+
+    def test_facades_pass_normalized_datasets_through(self):
+        from . import utils
+        from .calculators.aliases import normalize_dataset
+
+        dataset = normalize_dataset({'2023': {'revenue': 100.0, 'cost_of_revenue': 40.0}}, rename=True)
+        self.assertIs(utils.recalculate_dependent_fields(dataset, '2023', 'Revenue'), dataset)
+        self.assertIs(utils.recalculate_dependent_fields_batch(dataset, [('2023', 'CostOfRevenue', 50.0)]), dataset)
+        self.assertEqual(dataset['2023']['GrossIncome'], 50.0)
+
+
+class StartupImportTests(SimpleTestCase):
+    def test_urlconf_and_websocket_routing_do_not_import_the_calculators(self):
+        probe = (
+            'import sys, django; django.setup(); '
+            f'import {settings.ROOT_URLCONF}, sec_app_2.routing; '
+            "print(sorted(name for name in sys.modules if name.startswith(('sec_app_2.calculators.', 'sec_app_2.model_sessions'))))"
+        )
+        result = subprocess.run([sys.executable, '-c', probe], cwd=str(settings.BASE_DIR), capture_output=True, text=True, check=True)
+        loaded = result.stdout.strip().splitlines()[-1]
+        self.assertNotIn('calculators.graph', loaded)
+        self.assertNotIn('model_sessions', loaded)
+
+    def test_registry_builds_calculators_on_first_use(self):
+        from .calculators.registry import calculator_registry
+
+        self.assertIs(calculator_registry.get('nopat'), calculator_registry.get('nopat'))
+        with self.assertRaises(KeyError):
+            calculator_registry.get('unknown_statement')
+
+    def test_importtime_report_lists_the_slowest_modules(self):
+        out = io.StringIO()
+        call_command('importtime_report', 'sec_app_2.views', top=5, filter='sec_app_2', stdout=out)
+        self.assertIn('sec_app_2.views', out.getvalue())
+
+
+class BenchmarkTests(QuietCalculatorsMixin, SimpleTestCase):
+    def test_compare_flags_only_medians_past_the_threshold(self):
+        from .benchmarks import compare
+
+        baseline = {'benchmarks': {'a': {'p50_us': 100.0}, 'b': {'p50_us': 100.0}, 'c': {'p50_us': 0.0}}}
+        current = {'benchmarks': {'a': {'p50_us': 109.0}, 'b': {'p50_us': 150.0}, 'c': {'p50_us': 5.0}, 'd': {'p50_us': 1.0}}}
+        self.assertEqual([item['name'] for item in compare(current, baseline, 10.0)], ['b'])
+
+    def test_command_writes_results_and_gates_on_a_baseline(self):
+        from .benchmarks import synthetic_statements
+
+        (ticker, statements), = synthetic_statements(1, 3)
+        self.assertEqual(sorted(statements['income_statement']), [2022, 2023, 2024])
+
+        with tempfile.TemporaryDirectory() as directory:
+            output, baseline = os.path.join(directory, 'current.json'), os.path.join(directory, 'baseline.json')
+            options = {'tickers': 1, 'years': 3, 'repeat': 1, 'only': 'income_statement', 'stdout': io.StringIO()}
+            call_command('benchmark_calculators', output=output, **options)
+            with open(output) as f:
+                report = json.load(f)
+            self.assertTrue(report['benchmarks'])
+
+            for result in report['benchmarks'].values():
+                result['p50_us'] /= 1000
+            with open(baseline, 'w') as f:
+                json.dump(report, f)
+            with self.assertRaisesRegex(CommandError, 'regressed'):
+                call_command('benchmark_calculators', baseline=baseline, **options)
+
+
+class CalculatorInstrumentationTests(QuietCalculatorsMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        from .calculators import instrumentation
+
+        self.instrumentation = instrumentation
+        self.addCleanup(instrumentation.reset_calculator_stats)
+        self.addCleanup(instrumentation.disable_instrumentation)
+        instrumentation.reset_calculator_stats()
+
+    def test_counts_each_field_without_changing_results(self):
+        statements = sample_statements(4, seed=8)
+        expected = calculator_graph.recalculate_all(copy.deepcopy(statements))
+        self.instrumentation.enable_instrumentation()
+        actual = calculator_graph.recalculate_all(copy.deepcopy(statements))
+        for statement, rows in expected.items():
+            for year, row in rows.items():
+                for field_name, value in row.items():
+                    self.assertTrue(_same(actual[statement][year].get(field_name), value), f'{statement} {year} {field_name}')
+
+        rows = self.instrumentation.calculator_stats(sort='calls', statement='income_statement')
+        gross = next(row for row in rows if row['field'] == 'GrossIncome')
+        self.assertEqual(gross['calls'], 4)
+        self.assertEqual({row['statement'] for row in rows}, {'income_statement'})
+        with self.assertRaises(ValueError):
+            self.instrumentation.calculator_stats(sort='name')
+
+        self.instrumentation.disable_instrumentation()
+        calculator_graph.recalculate_all(copy.deepcopy(statements))
+        self.assertEqual(next(row for row in self.instrumentation.calculator_stats() if row['field'] == 'GrossIncome')['calls'], 4)
+
+    def test_view_is_for_staff_only(self):
+        from django.contrib.auth import get_user_model
+        from django.urls import reverse
+
+        client = APIClient(SERVER_NAME='localhost')
+        self.assertIn(client.get(reverse('calculator_stats')).status_code, (401, 403))
+
+        client.force_authenticate(get_user_model()(email='staff@example.com', is_staff=True))
+        self.assertEqual(client.post(reverse('calculator_stats'), {'enabled': 'yes'}, format='json').status_code, 400)
+        self.assertTrue(client.post(reverse('calculator_stats'), {'enabled': True}, format='json').data['enabled'])
+        calculator_graph.recalculate_all(sample_statements(2))
+        response = client.get(reverse('calculator_stats'), {'sort': 'calls', 'top': 3})
+        self.assertEqual((response.status_code, len(response.data['fields'])), (200, 3))
+        self.assertEqual(client.delete(reverse('calculator_stats')).status_code, 204)
+        self.assertEqual(client.get(reverse('calculator_stats')).data['fields'], [])
+
+
+class ValidationCheckTests(SimpleTestCase):
+    def panel(self, fields, rows):
+        """One company; ``rows`` is ``{field: [value per year]}``."""
+        years = len(next(iter(rows.values())))
+        values = np.array([[rows.get(name, [np.nan] * years)] for name in fields], dtype=np.float64)
+        return MetricPanel(np.array([1]), np.arange(2022, 2022 + years), list(fields), values)
+
+    def test_ppe_rollforward(self):
+        fields = ('PropertyPlantAndEquipment', 'CapitalExpenditures', 'Depreciation')
+        consistent = self.panel(fields, {'PropertyPlantAndEquipment': [100.0, 110.0], 'CapitalExpenditures': [0.0, 30.0], 'Depreciation': [0.0, 20.0]})
+        result = run_checks(consistent, ['ppe_rollforward'])['ppe_rollforward']
+        self.assertEqual((result['checked'], result['failed'], result['skipped']), (1, 0, 1))
+
+        broken = self.panel(fields, {'PropertyPlantAndEquipment': [100.0, 150.0], 'CapitalExpenditures': [0.0, 30.0], 'Depreciation': [0.0, 20.0]})
+        result = run_checks(broken, ['ppe_rollforward'])['ppe_rollforward']
+        self.assertEqual(result['failed'], 1)
+        self.assertEqual(result['worst'][0]['residual'], 40.0)
+        self.assertEqual(result['worst'][0]['year'], 2023)
+
+    def test_balance_sheet_identity(self):
+        fields = ('Assets', 'Liabilities', 'Equity', 'NoncontrollingInterests')
+        panel = self.panel(fields, {'Assets': [100.0, 200.0], 'Liabilities': [60.0, 120.0], 'Equity': [35.0, 50.0], 'NoncontrollingInterests': [5.0, 5.0]})
+        result = run_checks(panel, ['balance_sheet_identity'])['balance_sheet_identity']
+        self.assertEqual((result['checked'], result['failed']), (2, 1))
+        self.assertEqual(result['worst'][0]['residual'], 25.0)
+
+
+class ValidateFinancialsCommandTests(TestCase):
+    def test_breaks_are_reported_per_ticker(self):
+        seed_company('GOOD', 'annual', {'2023': {'Assets': 100.0, 'Liabilities': 60.0, 'Equity': 40.0, 'NoncontrollingInterests': 0.0}})
+        seed_company('BAD', 'annual', {'2023': {'Assets': 100.0, 'Liabilities': 60.0, 'Equity': 10.0, 'NoncontrollingInterests': 0.0}})
+        out = io.StringIO()
+        with self.assertRaisesRegex(CommandError, '1 reconciliation breaks'):
+            call_command('validate_financials', '--checks', 'balance_sheet_identity', '--fail-on-breaks', stdout=out)
+        self.assertIn('balance_sheet_identity: 1 of 2 failed', out.getvalue())
+        self.assertIn('BAD', out.getvalue())
+
+        call_command('validate_financials', '--checks', 'balance_sheet_identity', '--tickers', 'GOOD', '--fail-on-breaks', stdout=io.StringIO())
+        with self.assertRaises(CommandError):
+            call_command('validate_financials', '--tickers', 'MISSING', stdout=io.StringIO())
+
+
+class WindowMetricsTests(TestCase):
+    def test_averages_and_cagrs_end_at_the_latest_year(self):
+        # Revenue doubles over 2020-2022; 2023 holds only another metric, which still sets the window end
+        values = np.array([[[100.0, np.nan, 200.0, np.nan]], [[np.nan, np.nan, np.nan, 1.0]]])
+        panel = MetricPanel(np.array([7]), np.arange(2020, 2024), ['Revenue', 'Other'], values)
+        rows = {(name, window, kind): (end_year, value) for _, name, window, kind, end_year, value in compute_windows(panel, [1, 3, 4])}
+        self.assertNotIn(('Revenue', 1, 'AVG'), rows)
+        self.assertEqual(rows[('Revenue', 3, 'AVG')], (2023, 200.0))
+        self.assertEqual(rows[('Revenue', 4, 'AVG')], (2023, 150.0))
+        self.assertNotIn(('Revenue', 3, 'CAGR'), rows)
+        self.assertEqual(rows[('Other', 1, 'AVG')], (2023, 1.0))
+
+        values[1] = np.nan
+        rows = {(name, window, kind): value for _, name, window, kind, _, value in compute_windows(panel, [2])}
+        self.assertAlmostEqual(rows[('Revenue', 2, 'CAGR')], 2 ** 0.5 - 1)
+
+    def test_window_labels(self):
+        self.assertEqual(parse_window_label('Last12Y_CAGR'), (12, 'CAGR'))
+        self.assertIsNone(parse_window_label('Last0Y_AVG'))
+        self.assertIsNone(parse_window_label('2023'))
+
+    def test_view_serves_stored_and_on_demand_windows(self):
+        from django.urls import reverse
+
+        company = seed_company('WIN', 'annual', {str(year): {'Revenue': 100.0 * 2 ** (year - 2020)} for year in range(2020, 2025)})
+        self.assertGreater(refresh_window_metrics([company.id], [2]), 0)
+        self.assertTrue(WindowMetric.objects.filter(company=company, window=2, kind='CAGR').exists())
+
+        client = APIClient(SERVER_NAME='localhost')
+        response = client.get(reverse('window_metrics', args=['win']), {'windows': '2,3Y', 'metrics': 'Revenue'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['end_year'], 2024)
+        self.assertAlmostEqual(response.data['windows']['Last2Y_CAGR']['Revenue'], 1.0)
+        self.assertAlmostEqual(response.data['windows']['Last3Y_AVG']['Revenue'], 2800.0 / 3)
+        self.assertEqual(client.get(reverse('window_metrics', args=['win']), {'windows': 'x'}).status_code, 400)
+        self.assertEqual(client.get(reverse('window_metrics', args=['none'])).status_code, 404)
+
+
+class TTMTests(TestCase):
+    def test_flows_sum_four_quarters_and_everything_else_takes_the_quarter_end(self):
+        fields = ['NetIncome', 'Revenue', 'Assets', 'AssetsCurrent', 'DaysReceivables']
+        values = np.array([
+            [[25.0, 30.0, 38.0, 37.0, 40.0]],
+            [[100.0, 110.0, np.nan, 120.0, 130.0]],
+            [[500.0, 510.0, 520.0, 530.0, 540.0]],
+            [[200.0, 205.0, 210.0, 215.0, 220.0]],
+            [[40.0, 42.0, 44.0, 46.0, 48.0]],
+        ])
+        quarters = np.array([quarter_number(2023, 1) + i for i in range(5)])
+        rows = {(quarter, name): value for _, quarter, name, value in compute_ttm(MetricPanel(np.array([1]), quarters, fields, values))}
+
+        q4, q1 = quarter_number(2023, 4), quarter_number(2024, 1)
+        self.assertEqual(rows[(q4, 'NetIncome')], 130.0)
+        self.assertEqual(rows[(q1, 'NetIncome')], 145.0)
+        # Balance sheet totals and subtotals, ratios and unknown metrics are point-in-time
+        self.assertEqual(rows[(q4, 'Assets')], 530.0)
+        self.assertEqual(rows[(q1, 'AssetsCurrent')], 220.0)
+        self.assertEqual(rows[(q1, 'DaysReceivables')], 48.0)
+        # A flow missing a quarter has no TTM value until four complete quarters follow
+        self.assertNotIn((q4, 'Revenue'), rows)
+        # Nothing before four quarters of history, point-in-time metrics included
+        self.assertEqual({quarter for quarter, _ in rows}, {q4, q1})
+
+    def test_refresh_writes_ttm_periods_and_drops_unbacked_ones(self):
+        company = seed_company('TTM', 'quarterly', {f'2023Q{q}': {'NetIncome': 10.0 * q} for q in range(1, 5)})
+        self.assertEqual(refresh_ttm([company.id], derived=False), 1)
+        period = FinancialPeriod.objects.get(company=company, period_type='ttm')
+        self.assertEqual(period.period, ttm_label(2023, 4))
+        self.assertEqual(FinancialMetric.objects.get(period=period, metric_name='NetIncome').value, 100.0)
+
+        FinancialPeriod.objects.filter(company=company, period='2023Q1').delete()
+        self.assertEqual(refresh_ttm([company.id], derived=False), 0)
+        self.assertFalse(FinancialPeriod.objects.filter(company=company, period_type='ttm').exists())
+
+
+class IngestFinancialsTests(TestCase):
+    def setUp(self):
+        scratch = tempfile.TemporaryDirectory()
+        self.addCleanup(scratch.cleanup)
+        self.root = scratch.name
+        self.write('AAA', 'MasterFinancials', b',2023,Last5Y_AVG\nRevenue,90,80\nNetIncome,9,8\n')
+        self.write('AAA', 'IncomeStatementExpanded', b',2023\nRevenue,100\n')
+        self.write('BBB', 'BalanceSheetExpanded', b',2023\nAssets,\xff\n')
+
+    def write(self, ticker, kind, content):
+        os.makedirs(os.path.join(self.root, ticker), exist_ok=True)
+        with open(os.path.join(self.root, ticker, f'{ticker}_{kind}.csv'), 'wb') as f:
+            f.write(content)
+
+    def ingest(self, **options):
+        stdout = io.StringIO()
+        with mock.patch('sec_app.management.commands.ingest_financials.find_data_financials_dir', return_value=self.root):
+            call_command('ingest_financials', executor='threads', workers=2, skip_derived=True, stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def test_later_kinds_win_and_reloads_overwrite(self):
+        output = self.ingest()
+        self.assertIn('Failed to read 1 files', output)
+        values = dict(FinancialMetric.objects.filter(company__ticker='AAA', period__period='2023').values_list('metric_name', 'value'))
+        self.assertEqual(values, {'Revenue': 100.0, 'NetIncome': 9.0})
+        self.assertFalse(FinancialPeriod.objects.filter(period='Last5Y_AVG').exists())
+        self.assertTrue(Company.objects.filter(ticker='BBB').exists())
+
+        self.write('AAA', 'IncomeStatementExpanded', b',2023\nRevenue,110\n')
+        self.ingest(only=['IncomeStatementExpanded'])
+        self.assertEqual(FinancialMetric.objects.get(company__ticker='AAA', metric_name='Revenue').value, 110.0)
+
+    def test_statement_columns(self):
+        path = os.path.join(self.root, 'AAA', 'AAA_MasterFinancials.csv')
+        self.assertEqual(sorted(parse_master_financials(path)), [('2023', 'NetIncome', 9.0), ('2023', 'Revenue', 90.0)])
+        self.assertIn(('Last5Y_AVG', 'Revenue', 80.0), parse_master_financials(path, keep_window_columns=True))
+        self.write('CCC', 'IncomeStatementExpanded', b',2023Q2,TableName\nRevenue,2,3\nTableName,4,5\n')
+        self.assertEqual(parse_income_statement(os.path.join(self.root, 'CCC', 'CCC_IncomeStatementExpanded.csv')), [('2023Q2', 'Revenue', 2.0)])
+
+    def test_failed_flush_skips_only_the_tickers_it_lost(self):
+        self.write('BBB', 'BalanceSheetExpanded', b',2023\nAssets,500\n')
+
+        def failing_for_aaa(rows, *args):
+            rows = list(rows)
+            if Company.objects.get(ticker='AAA').id in {company_id for company_id, _, _, _ in rows}:
+                raise RuntimeError('constraint violated')
+            return upsert_metrics(rows, *args)
+
+        with mock.patch('sec_app.ingest.upsert_metrics', side_effect=failing_for_aaa):
+            output = self.ingest(flush_rows=1)
+        self.assertIn('Error writing AAA: constraint violated', output)
+        self.assertEqual([ticker for batch in IngestRun.objects.get().batches.all() for ticker in batch.tickers], ['BBB'])
+        self.assertFalse(FinancialMetric.objects.filter(company__ticker='AAA').exists())
+        self.assertEqual(FinancialMetric.objects.get(company__ticker='BBB').value, 500.0)
+        self.assertEqual(list(IngestedFile.objects.values_list('path', flat=True)), ['BBB/BBB_BalanceSheetExpanded.csv'])
+
+    def test_unchanged_tickers_are_skipped(self):
+        self.ingest()
+        output = self.ingest(changed_only=True)
+        self.assertEqual(output.splitlines()[1:], ['BBB/BBB_BalanceSheetExpanded.csv', '1 of 3 files changed since their last load'])
+        self.assertEqual(IngestRun.objects.count(), 1)
+
+        self.write('BBB', 'BalanceSheetExpanded', b',2023\nAssets,500\n')
+        output = self.ingest()
+        self.assertIn('Skipping 1 tickers whose files are unchanged since their last load', output)
+        self.assertIn('Skipping 2 tickers', self.ingest())
+        self.assertEqual(FinancialMetric.objects.get(company__ticker='BBB').value, 500.0)
+
+    def test_ticker_with_an_unreadable_file_is_not_journaled_as_done(self):
+        output = self.ingest()
+        run = IngestRun.objects.get()
+        self.assertEqual([ticker for batch in run.batches.all() for ticker in batch.tickers], ['AAA'])
+        self.assertEqual(sorted(IngestedFile.objects.values_list('path', flat=True)), ['AAA/AAA_IncomeStatementExpanded.csv', 'AAA/AAA_MasterFinancials.csv'])
+        # --skip-derived leaves the refresh pending for the next load
+        self.assertIn('stay pending until the next load without --skip-derived', output)
+        self.assertEqual(run.status, 'loaded')
+
+    def test_year_range(self):
+        self.write('AAA', 'IncomeStatementExpanded', b',2021,2023\nRevenue,80,100\n')
+        self.ingest(only=['IncomeStatementExpanded'], first_year=2022)
+        self.assertEqual(list(FinancialPeriod.objects.values_list('period', flat=True)), ['2023'])
+
+
+class UpsertMetricsTests(TestCase):
+    def assert_counts(self, loader):
+        company = seed_company('UPS', 'annual', {'2022': {}, '2023': {}})
+        first, second = FinancialPeriod.objects.filter(company=company).order_by('period').values_list('id', flat=True)
+        rows = [(company.id, first, 'Revenue', 100.0), (company.id, first, 'NetIncome', 10.0), (company.id, second, 'Revenue', 120.0)]
+
+        result = upsert_metrics(rows, loader=loader)
+        self.assertEqual((result.created, result.updated, result.unchanged), (3, 0, 0))
+        self.assertEqual(result.changed_pairs, {(company.id, first), (company.id, second)})
+
+        rows[2] = (company.id, second, 'Revenue', 125.0)
+        result = upsert_metrics(rows, loader=loader)
+        self.assertEqual((result.created, result.updated, result.unchanged), (0, 1, 2))
+        self.assertEqual(result.changed_pairs, {(company.id, second)})
+        self.assertEqual(FinancialMetric.objects.get(period_id=second, metric_name='Revenue').value, 125.0)
+
+        result = upsert_metrics([(company.id, first, 'Revenue', 999.0)], update=False, loader=loader)
+        self.assertEqual((result.created, result.updated, result.unchanged), (0, 0, 1))
+        self.assertEqual(FinancialMetric.objects.get(period_id=first, metric_name='Revenue').value, 100.0)
+
+    def test_insert_loader_counts_created_updated_and_unchanged_cells(self):
+        self.assert_counts('insert')
+
+    @skipUnless(connection.vendor == 'postgresql', 'COPY loading needs PostgreSQL')
+    def test_copy_loader_counts_created_updated_and_unchanged_cells(self):
+        self.assert_counts('copy')
+
+    @skipIf(connection.vendor == 'postgresql', 'COPY loading works on PostgreSQL')
+    def test_copy_loader_needs_postgresql(self):
+        with self.assertRaisesRegex(ValueError, 'needs PostgreSQL'):
+            upsert_metrics([(1, 1, 'Revenue', 1.0)], loader='copy')
+
+
+class MetricWriterTests(TestCase):
+    def test_failed_flush_loses_only_its_own_buffer(self):
+        good, bad = seed_company('GOOD', 'annual', {}), seed_company('BAD', 'annual', {})
+        writer = MetricWriter()
+        writer.add(bad.id, [('2023', 'Revenue', 1.0)])
+        with mock.patch('sec_app.ingest.upsert_metrics', side_effect=RuntimeError('disk full')):
+            with self.assertRaises(FlushError) as raised:
+                writer.flush()
+        self.assertEqual(raised.exception.company_ids, {bad.id})
+        self.assertEqual((writer.periods, writer.dirty_pairs), ({}, set()))
+
+        writer.add(good.id, [('2023', 'Revenue', 2.0)])
+        writer.flush()
+        period_id = FinancialPeriod.objects.get(company=good).id
+        self.assertEqual(writer.dirty_pairs, {(good.id, period_id)})
+        self.assertFalse(FinancialMetric.objects.filter(company=bad).exists())
+
+
+class StatementYearRangeTests(SimpleTestCase):
+    def test_statements_load_every_year_unless_limited(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write(',1998,2023,2040\nRevenue,1,2,3\n')
+        self.addCleanup(os.remove, f.name)
+        self.assertEqual([period for period, _, _ in parse_income_statement(f.name)], ['1998', '2023', '2040'])
+        self.assertEqual([period for period, _, _ in parse_income_statement(f.name, years=(2000, 2030))], ['2023'])
+        # MasterFinancials keeps its index-column guard
+        self.assertEqual([period for period, _, _ in parse_master_financials(f.name)], ['2023'])
+
+
+class CSVParsingTests(SimpleTestCase):
+    def setUp(self):
+        scratch = tempfile.TemporaryDirectory()
+        self.addCleanup(scratch.cleanup)
+        self.paths = write_master_financials(scratch.name, 2, metrics=20, years=5)
+
+    def test_columnar_reader_matches_the_row_reader(self):
+        for path in self.paths:
+            metrics, columns = read_csv_columnar(path)
+            columnar = {
+                (header, metric_name): value
+                for header, values in columns.items() for metric_name, value in zip(metrics, values) if not math.isnan(value)
+            }
+            rows = {(period, metric_name): value for period, metric_name, value in read_statement_csv(path, keep_window_columns=True)}
+            self.assertEqual(columnar, rows)
+
+    def test_process_pool_parses_like_a_serial_read(self):
+        with parse_executor('processes', 2) as executor:
+            pooled = list(executor.map(parse_master_financials, self.paths))
+        self.assertEqual(pooled, [parse_master_financials(path) for path in self.paths])
+
+    def test_benchmark_report(self):
+        report = run_parse_benchmarks(files=2, metrics=10, years=3, workers=[1], repeat=1, only='threads')
+        self.assertEqual(set(report['benchmarks']), {'serial', 'threads_1'})
+        self.assertEqual(report['meta']['files'], 2)
+
+
+class IngestManifestTests(TestCase):
+    def setUp(self):
+        scratch = tempfile.TemporaryDirectory()
+        self.addCleanup(scratch.cleanup)
+        self.root = scratch.name
+        self.path = os.path.join(self.root, 'AAA', 'AAA_IncomeStatement.csv')
+        os.makedirs(os.path.dirname(self.path))
+        self.write('Revenue,100\n')
+
+    def write(self, content, mtime=None):
+        with open(self.path, 'w') as f:
+            f.write(content)
+        if mtime is not None:
+            os.utime(self.path, (mtime, mtime))
+
+    def test_recorded_files_are_skipped_until_their_content_changes(self):
+        manifest = IngestManifest(self.root)
+        self.assertEqual(manifest.select([self.path]), [self.path])
+        manifest.record([self.path])
+
+        manifest = IngestManifest(self.root)
+        self.assertEqual(manifest.select([self.path]), [])
+        self.assertEqual(IngestManifest(self.root, force=True).select([self.path]), [self.path])
+
+        self.write('Revenue,200\n', mtime=1e9)
+        self.assertEqual(IngestManifest(self.root).select([self.path]), [self.path])
+
+    def test_changed_writes_nothing(self):
+        IngestManifest(self.root).record([self.path])
+        entry = IngestedFile.objects.get()
+        # Same content under a new mtime is unchanged, and only restamped by the next record
+        self.write('Revenue,100\n', mtime=1e9)
+        manifest = IngestManifest(self.root)
+        self.assertFalse(manifest.changed(self.path))
+        self.assertEqual(IngestedFile.objects.get().mtime, entry.mtime)
+        manifest.record([])
+        self.assertEqual(IngestedFile.objects.get().mtime, 1e9)
+
+
+class IngestJournalTests(TestCase):
+    def load(self, command, tickers, pairs, refreshed=True, resume=False):
+        """One journaled batch of ``tickers`` that wrote ``pairs``, left running unless ``refreshed`` is given."""
+        journal = IngestJournal.open(command, resume=resume, derived=True)
+        journal.checkpoint(tickers, len(tickers), UpsertResult(created=len(pairs), changed_pairs=set(pairs)))
+        if refreshed is not None:
+            journal.finish(refreshed=refreshed)
+        return journal
+
+    def test_resume_skips_done_tickers_and_keeps_their_pairs(self):
+        interrupted = self.load('load_balance_sheets', ['AAA'], {(1, 10)}, refreshed=None)
+        resumed = IngestJournal.open('load_balance_sheets', resume=True, derived=True)
+        self.assertEqual(resumed.run.id, interrupted.run.id)
+        self.assertTrue(resumed.resumed)
+        self.assertEqual(resumed.done_tickers, {'AAA'})
+        self.assertEqual(resumed.dirty_pairs, {(1, 10)})
+        self.assertEqual(resumed.next_number, 2)
+
+    def test_flushed_pairs_are_journaled_before_the_checkpoint(self):
+        company = seed_company('FLU', 'annual', {})
+        journal = IngestJournal.open('load_income_statements', derived=True)
+        writer = MetricWriter(journal=journal)
+        writer.add(company.id, [('2023', 'Revenue', 100.0)])
+        writer.flush()
+        period_id = FinancialPeriod.objects.get(company=company).id
+
+        # A run that dies here still hands its pairs to the next one
+        self.assertEqual(IngestJournal.open('load_income_statements', resume=True, derived=True).dirty_pairs, {(company.id, period_id)})
+
+        batch = journal.checkpoint(['FLU'], 1, writer.result)
+        self.assertEqual(journal.run.batches.count(), 1)
+        self.assertEqual((batch.tickers, batch.created, batch.dirty_pairs), (['FLU'], 1, [(company.id, period_id)]))
+
+    def test_unrefreshed_pairs_carry_over_to_the_next_run(self):
+        self.load('load_balance_sheets', ['AAA'], {(1, 10)}, refreshed=False)
+        self.load('load_cash_flows', ['BBB'], {(2, 20)}, refreshed=None)
+        self.assertEqual(IngestRun.objects.get(command='load_balance_sheets').status, 'loaded')
+
+        # Another loader's pending refresh is taken over, another loader's interrupted run is not
+        journal = IngestJournal.open('load_income_statements', derived=True)
+        self.assertEqual(journal.dirty_pairs, {(1, 10)})
+        self.assertFalse(journal.resumed)
+        journal.finish()
+        self.assertEqual(IngestRun.objects.get(command='load_balance_sheets').status, 'finished')
+        self.assertEqual(IngestRun.objects.get(command='load_cash_flows').status, 'running')
+
+        # A fresh run of the interrupted command refreshes its pairs too
+        self.assertEqual(IngestJournal.open('load_cash_flows', derived=True).dirty_pairs, {(2, 20)})
+        self.assertEqual(IngestJournal.open('load_valuation_summaries').dirty_pairs, set())
+
+    def test_failed_flush_leaves_the_open_batch_as_it_was(self):
+        company = seed_company('BAD', 'annual', {})
+        journal = IngestJournal.open('load_income_statements', derived=True)
+        writer = MetricWriter(journal=journal)
+        writer.add(company.id, [('2023', 'Revenue', 1.0)])
+        with mock.patch('sec_app.ingest.upsert_metrics', side_effect=RuntimeError('disk full')):
+            with self.assertRaises(FlushError):
+                writer.flush()
+        self.assertIsNone(journal.open_batch)
+        self.assertEqual(journal.dirty_pairs, set())
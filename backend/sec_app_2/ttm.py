@@ -0,0 +1,175 @@
+"""Trailing-twelve-month (TTM) metrics built from quarterly filings.
+
+``compute_ttm`` works on a quarterly ``MetricPanel`` (``fields x companies
+x quarters``) for the whole universe at once:
+
+* flow metrics (the income statement, cash flow, NOPAT and free cash
+  flow lines listed in ``FLOW_METRICS``) are summed over the four quarters
+  ending at each quarter, using prefix sums along the quarter axis; a flow
+  needs all four quarters
+* every other metric (balance sheet and capital table lines, rates,
+  ratios, ``Days*`` and ``*AsPercentOfRevenue`` figures, and anything not
+  known to be a flow) is point-in-time and takes the value at the quarter
+  end
+
+A TTM period is only emitted where the company filed each of the four
+quarters it covers.
+
+``refresh_ttm`` stores the results as ``FinancialMetric`` rows under
+``period_type='ttm'`` periods (``TTM2024Q3``), then refreshes their
+derived metrics: the calculators read TTM frames, one per fiscal quarter
+keyed by year (see ``periods.ttm_frames``), so year-over-year lookups
+compare with the TTM a year earlier.
+"""
+
+from typing import Dict, FrozenSet, Iterable, Iterator, Optional, Set, Tuple
+import logging
+
+import numpy as np
+from django.db import transaction
+
+from sec_app.models import FinancialMetric, FinancialPeriod
+from .derived_metrics import refresh_company
+from .panel import MetricPanel
+from .periods import period_attributes, quarter_from_number, ttm_label
+
+logger = logging.getLogger(__name__)
+
+# Period amounts, as named in the MasterFinancials sheets and by the calculators
+FLOW_METRICS: FrozenSet[str] = frozenset({
+    # Income statement
+    'Revenue', 'CostOfRevenue', 'GrossMargin', 'GrossIncome', 'SellingGeneralAndAdministration',
+    'SellingGeneralAdministrative', 'Depreciation', 'OtherOperatingExpense', 'OperatingExpense',
+    'OperatingIncome', 'InterestExpense', 'InterestIncome', 'NetNonOperatingInterestIncome', 'OtherIncome',
+    'PretaxIncome', 'TaxProvision', 'ProfitLossControlling', 'NetIncomeControlling', 'NetIncomeNoncontrolling',
+    'NetIncome', 'OperatingLeaseCost', 'VariableLeaseCost', 'ForeignCurrencyAdjustment',
+    # Cash flow statement
+    'CapitalExpenditures', 'DepreciationDepletionAndAmortization', 'OtherNoncashChanges',
+    'DeferredTax', 'AssetImpairmentCharge', 'ShareBasedCompensation', 'ChangeInWorkingCapital',
+    'ChangeInReceivables', 'ChangeInInventory', 'ChangeInPayable', 'ChangeInOtherCurrentAssets',
+    'ChangeInOtherCurrentLiabilities', 'ChangeInOtherWorkingCapital', 'InvestingCashFlow', 'PurchaseOfPPE',
+    'SaleOfPPE', 'PurchaseOfBusiness', 'SaleOfBusiness', 'PurchaseOfInvestment', 'SaleOfInvestment',
+    'OtherInvestingChanges', 'FinancingCashFlow', 'ShortTermDebtIssuance', 'ShortTermDebtPayment',
+    'LongTermDebtIssuance', 'LongTermDebtPayment', 'CommonStockIssuance', 'CommonStockRepurchasePayment',
+    'CommonStockDividendPayment', 'TaxWithholdingPayment', 'FinancingLeasePayment', 'MinorityDividendPayment',
+    'MinorityShareholderPayment',
+    # NOPAT
+    'EBITAUnadjusted', 'EBITA_Unadjusted', 'OperatingLeaseInterest', 'VariableLeaseInterest', 'EBITAAdjusted',
+    'EBITDAAdjusted', 'NetOperatingProfitAfterTaxes', 'NOPAT',
+    # Changes in PPE and free cash flow
+    'UnexplainedChangesInPPE', 'GrossCashFlow', 'DecreaseInWorkingCapital', 'DecreaseInOperatingLeases',
+    'DecreaseInVariableLeases', 'DecreaseInFinanceLeases', 'DecreaseInGoodwill',
+    'DecreaseInOtherAssetsNetOfOtherLiabilities', 'DecreaseInExcessCash', 'DecreaseInForeignTaxCreditCarryForward',
+    'ChangeInExcessCash', 'ChangeInFinanceLeaseAssets', 'ChangeInForeignTaxCreditCarryForward', 'ChangeInGoodwill',
+    'ChangeInNetOtherNoncurrentAssets', 'ChangeInOperatingLeaseAssets', 'ChangeInOperatingWorkingCapital',
+    'ChangeInVariableLeaseAssets', 'FreeCashFlow', 'TaxesNonoperating', 'CashFlowToInvestors',
+})
+
+# (company_id, quarter_number, metric_name, value)
+TTMRow = Tuple[int, int, str, float]
+
+
+def _trailing_four(present: np.ndarray) -> np.ndarray:
+    """True where ``present`` holds for the four quarters ending at each position (last axis)."""
+    # Prefix counts with a leading zero column: quarters (t - 4, t] are counts[..., t + 1] - counts[..., t - 3]
+    counts = np.concatenate([np.zeros(present.shape[:-1] + (1,), dtype=np.int64), np.cumsum(present, axis=-1)], axis=-1)
+    complete = np.zeros(present.shape, dtype=bool)
+    complete[..., 3:] = (counts[..., 4:] - counts[..., :-4]) == 4
+    return complete
+
+
+def compute_ttm(panel: MetricPanel, flows: Iterable[str] = FLOW_METRICS) -> Iterator[TTMRow]:
+    """Yield every finite TTM value in a quarterly ``panel``."""
+    if not panel.values.size:
+        return
+    flows = set(flows)
+    is_flow = np.array([name in flows for name in panel.names], dtype=bool)
+    result = panel.values.copy()
+
+    if is_flow.any():
+        values = panel.values[is_flow]
+        present = ~np.isnan(values)
+        totals = np.concatenate([np.zeros(values.shape[:2] + (1,)), np.cumsum(np.where(present, values, 0.0), axis=2)], axis=2)
+        sums = np.full(values.shape, np.nan)
+        sums[..., 3:] = totals[..., 4:] - totals[..., :-4]
+        result[is_flow] = np.where(_trailing_four(present), sums, np.nan)
+
+    # Point-in-time metrics too: no TTM period without the company's four quarters behind it
+    filed = ~np.isnan(panel.values).all(axis=0)
+    result[:, ~_trailing_four(filed)] = np.nan
+
+    field_pos, company_pos, quarter_pos = np.nonzero(np.isfinite(result))
+    company_ids = panel.company_ids[company_pos].tolist()
+    quarters = panel.periods[quarter_pos].tolist()
+    for j, company_id, quarter, value in zip(field_pos.tolist(), company_ids, quarters, result[field_pos, company_pos, quarter_pos].tolist()):
+        yield company_id, quarter, panel.names[j], value
+
+
+def refresh_ttm(company_ids: Optional[Iterable[int]] = None, flows: Iterable[str] = FLOW_METRICS, batch_size: int = 5000, derived: bool = True) -> int:
+    """Recompute and rewrite TTM periods and metrics for ``company_ids`` (every company when None).
+
+    With ``derived`` the TTM derived metrics are refreshed too.  Returns the
+    TTM metrics written.
+    """
+    company_ids = None if company_ids is None else sorted(set(company_ids))
+    panel = MetricPanel.load(None, 'quarterly', company_ids)
+    rows = list(compute_ttm(panel, flows))
+
+    labels: Dict[Tuple[int, str], int] = {}
+    for company_id, quarter, _, _ in rows:
+        key = (company_id, ttm_label(*quarter_from_number(quarter)))
+        labels.setdefault(key, quarter)
+
+    stale = FinancialPeriod.objects.filter(period_type='ttm')
+    if company_ids is not None:
+        stale = stale.filter(company_id__in=company_ids)
+
+    with transaction.atomic():
+        periods = {(company_id, period): period_id for period_id, company_id, period in stale.values_list('id', 'company_id', 'period')}
+        # Periods no longer backed by four quarters go, with their metrics and derived rows
+        FinancialPeriod.objects.filter(id__in=[pid for key, pid in periods.items() if key not in labels]).delete()
+        FinancialMetric.objects.filter(period_id__in=[pid for key, pid in periods.items() if key in labels]).delete()
+
+        missing = [key for key in labels if key not in periods]
+        FinancialPeriod.objects.bulk_create(
+            [FinancialPeriod(company_id=company_id, **period_attributes(period)) for company_id, period in missing],
+            batch_size=batch_size,
+        )
+        if missing:
+            created = FinancialPeriod.objects.filter(period_type='ttm', company_id__in={company_id for company_id, _ in missing})
+            periods.update({(company_id, period): period_id for period_id, company_id, period in created.values_list('id', 'company_id', 'period')})
+
+        FinancialMetric.objects.bulk_create(
+            [
+                FinancialMetric(
+                    company_id=company_id,
+                    period_id=periods[(company_id, ttm_label(*quarter_from_number(quarter)))],
+                    metric_name=metric_name,
+                    value=value,
+                )
+                for company_id, quarter, metric_name, value in rows
+            ],
+            batch_size=batch_size,
+        )
+    logger.info(f"Wrote {len(rows)} TTM metrics for {len(panel.company_ids)} companies")
+
+    if derived:
+        for company_id in sorted({company_id for company_id, _ in labels}):
+            try:
+                refresh_company(company_id, None, 'ttm', batch_size)
+            except Exception as e:
+                logger.error(f"Error refreshing TTM derived metrics for company {company_id}: {e}")
+    return len(rows)
+
+
+def refresh_dirty_ttm(pairs: Iterable[Tuple[int, int]], batch_size: int = 5000) -> int:
+    """Refresh TTM rows for the companies whose quarterly periods an ingest touched."""
+    period_ids: Set[int] = {period_id for _, period_id in pairs}
+    if not period_ids:
+        return 0
+    company_ids = set(
+        FinancialPeriod.objects.filter(id__in=period_ids, period_type='quarterly').values_list('company_id', flat=True)
+    )
+    if not company_ids:
+        return 0
+    return refresh_ttm(company_ids, batch_size=batch_size)
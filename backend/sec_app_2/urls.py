@@ -4,6 +4,12 @@ from .views import (
     DependentFieldsView,
     BalanceSheetDependentFieldsView,
     BalanceSheetCalculateAllView,
+    ValuationModelRecomputeView,
+    ValuationModelDeltaView,
+    ValuationModelSensitivityView,
+    DerivedMetricsView,
+    WindowMetricsView,
+    CalculatorStatsView,
     serve_multiples_csv,
     ValuationSummaryView,
     MultipleDataView,
@@ -58,6 +64,12 @@ urlpatterns = [
     path('dependent-fields/', DependentFieldsView.as_view(), name='dependent_fields'),
     path('balance-sheet/dependent-fields/', BalanceSheetDependentFieldsView.as_view(), name='balance_sheet_dependent_fields'),
     path('balance-sheet/calculate-all/', BalanceSheetCalculateAllView.as_view(), name='balance_sheet_calculate_all'),
+    path('valuation-model/recompute/', ValuationModelRecomputeView.as_view(), name='valuation_model_recompute'),
+    path('valuation-model/delta/', ValuationModelDeltaView.as_view(), name='valuation_model_delta'),
+    path('valuation-model/sensitivity/', ValuationModelSensitivityView.as_view(), name='valuation_model_sensitivity'),
+    path('derived-metrics/<str:ticker>/', DerivedMetricsView.as_view(), name='derived_metrics'),
+    path('window-metrics/<str:ticker>/', WindowMetricsView.as_view(), name='window_metrics'),
+    path('debug/calculator-stats/', CalculatorStatsView.as_view(), name='calculator_stats'),
     path('data/multiples/<str:filename>', serve_multiples_csv, name='serve_multiples_csv'),
     path('valuation-summary/<str:ticker>/', ValuationSummaryView.as_view(), name='valuation_summary'),
     path('equity-value/<str:ticker>/', ValuationSummaryView.as_view(), name='equity_value'),  # Alias for frontend compatibility
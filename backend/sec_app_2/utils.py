@@ -1,92 +1,12 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterable, List, Tuple
 import logging
 
 # Thin facade re-exporting calculators from modular files.
-# Keeps external API stable while drastically reducing this file size and import time.
+# Keeps external API stable; re-exported names resolve lazily through the calculators
+# package, so importing this module does not import every calculator.
+from . import calculators
 from .calculators.aliases import normalize_dataset
 
-# Income Statement
-from .calculators.income_statement import (
-    income_statement_calculator,
-    calculate_income_statement_field,
-    update_income_statement_calculations,
-    recalculate_income_statement_dependent_fields as recalculate_dependent_fields,
-)
-
-# Balance Sheet
-from .calculators.balance_sheet import (
-    balance_sheet_calculator,
-    calculate_balance_sheet_field,
-    update_balance_sheet_calculations,
-    recalculate_balance_sheet_dependent_fields,
-    update_percentage_based_balance_sheet_field,
-)
-
-# NOPAT
-from .calculators.nopat import (
-    nopat_calculator,
-    calculate_nopat_field,
-    update_nopat_calculations,
-    recalculate_nopat_dependent_fields,
-)
-
-# Capital Table (Financial Breakdown)
-from .calculators.capital_table import (
-    financial_breakdown_calculator,
-    calculate_financial_breakdown_field,
-    update_financial_breakdown_calculations,
-    recalculate_financial_breakdown_dependent_fields,
-)
-
-# PPE Changes
-from .calculators.ppe_changes import (
-    ppe_changes_calculator,
-    calculate_ppe_changes_field,
-    update_ppe_changes_calculations,
-    recalculate_ppe_changes_dependent_fields,
-    validate_ppe_reconciliation,
-)
-
-# Income Statement Common Size
-from .calculators.income_statement_common_size import (
-    income_statement_common_size_calculator,
-    calculate_income_statement_common_size_field,
-    update_income_statement_common_size_calculations,
-    recalculate_income_statement_common_size_dependent_fields,
-)
-
-# ROIC Performance
-from .calculators.roic_performance import (
-    roic_performance_calculator,
-    calculate_roic_performance_field,
-    update_roic_performance_calculations,
-    recalculate_roic_performance_dependent_fields,
-)
-
-# Financing Health
-from .calculators.financing_health import (
-    financing_health_calculator,
-    calculate_financing_health_field,
-    update_financing_health_calculations,
-    recalculate_financing_health_dependent_fields,
-)
-
-# Free Cash Flow
-from .calculators.free_cash_flow import (
-    free_cash_flow_calculator,
-    calculate_free_cash_flow_field,
-    update_free_cash_flow_calculations,
-    recalculate_free_cash_flow_dependent_fields,
-)
-
-# Balance Sheet Common Size
-from .calculators.balance_sheet_common_size import (
-    balance_sheet_common_size_calculator,
-    calculate_balance_sheet_common_size_field,
-    update_balance_sheet_common_size_calculations,
-    recalculate_balance_sheet_common_size_dependent_fields,
-)
-
 logger = logging.getLogger(__name__)
 
 __all__ = [
@@ -142,28 +62,128 @@ __all__ = [
     "calculate_balance_sheet_common_size_field",
     "update_balance_sheet_common_size_calculations",
     "recalculate_balance_sheet_common_size_dependent_fields",
+    # Dependency graph
+    "calculator_graph",
+    "recalculate_model_dependent_fields",
+    "recalculate_model_dependent_fields_batch",
+    "update_model_calculations",
+    "recalculate_dependent_fields_batch",
+    "recalculate_balance_sheet_dependent_fields_batch",
+    "vectorized_engine",
+    "update_model_calculations_vectorized",
+    # Whole-model helpers
+    "MODEL_STATEMENTS",
+    "build_model",
+    "apply_edits",
+    "serialize_model",
+    "serialize_changes",
+    "recalculate_edits",
+    "recompute_model",
+    "statements_from_metrics",
+    "derived_cells",
+    # Compact statement frames
+    "StatementFrame",
+    "YearView",
+    "compact_model",
+    "expand_model",
+    # DCF sensitivity
+    "dcf_sensitivity_engine",
+    "run_dcf_sensitivity",
+    "SensitivityError",
+    # Per-field instrumentation
+    "enable_instrumentation",
+    "disable_instrumentation",
+    "instrumentation_enabled",
+    "reset_calculator_stats",
+    "calculator_stats",
 ]
 
 
-# Normalizing wrappers: keep signatures, normalize datasets before delegating
+def __getattr__(name: str) -> Any:
+    if name in __all__:
+        value = getattr(calculators, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Normalizing wrappers: keep signatures, normalize datasets before delegating.
+# The views normalize request data once at the boundary; the NormalizedDataset they
+# pass in comes straight through normalize_dataset, which only does work for other callers.
+# Evaluation goes through the compiled graph so totals are computed after the subtotals they read.
 
 def update_income_statement_calculations(data: Dict[int, Dict[str, Any]], year: int) -> Dict[int, Dict[str, Any]]:  # type: ignore[override]
+    from .calculators.graph import update_model_calculations
+
     data_norm = normalize_dataset(data)
-    return income_statement_calculator.update_calculated_fields(data_norm, year)
+    update_model_calculations({'income_statement': data_norm}, [year])
+    return data_norm
 
 
 def recalculate_dependent_fields(data: Dict[int, Dict[str, Any]], year: int, changed_field: str) -> Dict[int, Dict[str, Any]]:  # type: ignore[override]
+    from .calculators.graph import recalculate_model_dependent_fields
+
     data_norm = normalize_dataset(data)
-    return income_statement_calculator.recalculate_dependent_fields(data_norm, year, changed_field)
+    data_norm.setdefault(year, {})
+    recalculate_model_dependent_fields({'income_statement': data_norm}, year, 'income_statement', changed_field)
+    return data_norm
 
 
 def update_balance_sheet_calculations(data: Dict[int, Dict[str, Any]], year: int) -> Dict[int, Dict[str, Any]]:  # type: ignore[override]
+    from .calculators.graph import update_model_calculations
+
     data_norm = normalize_dataset(data)
-    return balance_sheet_calculator.update_calculated_fields(data_norm, year)
+    update_model_calculations({'balance_sheet': data_norm}, [year])
+    return data_norm
 
 
 def recalculate_balance_sheet_dependent_fields(data: Dict[int, Dict[str, Any]], year: int, changed_field: str) -> Dict[int, Dict[str, Any]]:  # type: ignore[override]
+    from .calculators.graph import recalculate_model_dependent_fields
+
+    data_norm = normalize_dataset(data)
+    data_norm.setdefault(year, {})
+    recalculate_model_dependent_fields({'balance_sheet': data_norm}, year, 'balance_sheet', changed_field)
+    return data_norm
+
+
+# Batch variants: many (year, changed_field, value) edits, one evaluation pass.
+# An edit may be a tuple or a dict with year, changed_field (or field) and an optional value;
+# without a value the dataset is assumed to already hold the edited cell.
+
+def _apply_dataset_edits(data: Dict[Any, Dict[str, Any]], statement: str, edits: Iterable[Any]) -> List[Tuple[str, Any, str]]:
+    cells = []
+    for edit in edits:
+        if isinstance(edit, dict):
+            year = edit.get("year")
+            field_name = edit.get("changed_field") or edit.get("field")
+            has_value = "value" in edit
+            value = edit.get("value")
+        else:
+            year, field_name, *rest = edit
+            has_value = bool(rest)
+            value = rest[0] if rest else None
+        if year is None or not field_name:
+            raise ValueError("Each edit requires year and changed_field")
+        row = data.setdefault(year, {})
+        if has_value:
+            row[field_name] = value
+        cells.append((statement, year, field_name))
+    return cells
+
+
+def recalculate_dependent_fields_batch(data: Dict[Any, Dict[str, Any]], edits: Iterable[Any]) -> Dict[Any, Dict[str, Any]]:
+    from .calculators.graph import recalculate_model_dependent_fields_batch
+
     data_norm = normalize_dataset(data)
-    return balance_sheet_calculator.recalculate_dependent_fields(data_norm, year, changed_field)
+    cells = _apply_dataset_edits(data_norm, 'income_statement', edits)
+    recalculate_model_dependent_fields_batch({'income_statement': data_norm}, cells)
+    return data_norm
 
 
+def recalculate_balance_sheet_dependent_fields_batch(data: Dict[Any, Dict[str, Any]], edits: Iterable[Any]) -> Dict[Any, Dict[str, Any]]:
+    from .calculators.graph import recalculate_model_dependent_fields_batch
+
+    data_norm = normalize_dataset(data)
+    cells = _apply_dataset_edits(data_norm, 'balance_sheet', edits)
+    recalculate_model_dependent_fields_batch({'balance_sheet': data_norm}, cells)
+    return data_norm
@@ -0,0 +1,140 @@
+"""Universe-wide reconciliation checks on the stored raw metrics.
+
+``validate_universe`` loads the metrics the checks read for every company
+into a ``MetricPanel`` (one query, ``fields x companies x years``, NaN
+where a metric is missing) and evaluates each check as an array
+expression over the whole panel:
+
+* ``ppe_rollforward``: PPE end of year = prior PPE + capex - depreciation
+  (depreciation stored as a positive expense; the residual is the
+  unexplained change in PPE)
+* ``balance_sheet_identity``: assets = liabilities + equity + NCI
+* ``invested_capital_goodwill``: invested capital including goodwill =
+  excluding goodwill + goodwill
+* ``invested_capital_funding``: broader invested capital = total funds
+  invested (the operating and financing sides of the capital table)
+
+A cell is only checked when every input it reads is present, so missing
+data is reported as ``skipped`` rather than as a break.  A cell fails
+when its residual exceeds both the absolute tolerance and the relative
+tolerance times the check's scale.
+"""
+
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+import time
+
+import numpy as np
+
+from sec_app.models import Company
+from .panel import MetricPanel
+
+# (field, prior) accessors -> (residual, scale); ``prior`` reads the year before
+CheckFunc = Callable[[Callable[[str], np.ndarray], Callable[[str], np.ndarray]], Tuple[np.ndarray, np.ndarray]]
+
+# check -> (metrics it reads, check)
+CHECKS: Dict[str, Tuple[Tuple[str, ...], CheckFunc]] = {
+    'ppe_rollforward': (
+        ('PropertyPlantAndEquipment', 'CapitalExpenditures', 'Depreciation'),
+        lambda f, prior: (
+            f('PropertyPlantAndEquipment') - prior('PropertyPlantAndEquipment') - f('CapitalExpenditures') + f('Depreciation'),
+            np.fmax(np.abs(f('PropertyPlantAndEquipment')), np.abs(prior('PropertyPlantAndEquipment'))),
+        ),
+    ),
+    'balance_sheet_identity': (
+        ('Assets', 'Liabilities', 'Equity', 'NoncontrollingInterests'),
+        lambda f, prior: (
+            f('Assets') - f('Liabilities') - f('Equity') - f('NoncontrollingInterests'),
+            np.abs(f('Assets')),
+        ),
+    ),
+    'invested_capital_goodwill': (
+        ('InvestedCapitalIncludingGoodwill', 'InvestedCapitalExcludingGoodwill', 'Goodwill'),
+        lambda f, prior: (
+            f('InvestedCapitalIncludingGoodwill') - f('InvestedCapitalExcludingGoodwill') - f('Goodwill'),
+            np.abs(f('InvestedCapitalIncludingGoodwill')),
+        ),
+    ),
+    'invested_capital_funding': (
+        (
+            'InvestedCapitalIncludingGoodwill', 'ExcessCash', 'ForeignTaxCreditCarryForward',
+            'DebtAndDebtEquivalents', 'DeferredIncomeTaxes', 'NoncontrollingInterests', 'Equity',
+        ),
+        lambda f, prior: (
+            (f('InvestedCapitalIncludingGoodwill') + f('ExcessCash') + f('ForeignTaxCreditCarryForward'))
+            - (f('DebtAndDebtEquivalents') - (f('DeferredIncomeTaxes') - f('ForeignTaxCreditCarryForward')) + f('NoncontrollingInterests') + f('Equity')),
+            np.abs(f('InvestedCapitalIncludingGoodwill') + f('ExcessCash') + f('ForeignTaxCreditCarryForward')),
+        ),
+    ),
+}
+
+
+def run_checks(panel: MetricPanel, checks: Iterable[str], tolerance: float = 0.005, absolute_tolerance: float = 1.0, top: int = 20) -> Dict[str, Dict[str, Any]]:
+    """Evaluate ``checks`` over ``panel``; return counts and the worst offenders per check."""
+    results: Dict[str, Dict[str, Any]] = {}
+    has_any = ~np.isnan(panel.values).all(axis=0)
+    for name in checks:
+        check = CHECKS[name][1]
+        with np.errstate(invalid='ignore'):
+            residual, scale = check(panel.field, panel.prior)
+            checked = ~np.isnan(residual)
+            relative = np.abs(residual) / np.where(scale > 0, scale, np.nan)
+            failed = checked & (np.abs(residual) > absolute_tolerance) & ~(relative <= tolerance)
+
+        # Worst first: largest relative break, absolute size as the tie-break (and for zero scale)
+        flat = np.flatnonzero(failed)
+        rank = np.nan_to_num(relative.ravel()[flat], nan=np.inf)
+        order = flat[np.lexsort((-np.abs(residual.ravel()[flat]), -rank))][:top]
+        company_pos, year_pos = np.unravel_index(order, residual.shape)
+        results[name] = {
+            'checked': int(checked.sum()),
+            'skipped': int((has_any & ~checked).sum()),
+            'failed': int(failed.sum()),
+            'worst': [
+                {
+                    'company_id': int(panel.company_ids[c]),
+                    'year': int(panel.periods[y]),
+                    'residual': float(residual[c, y]),
+                    'relative': float(relative[c, y]) if np.isfinite(relative[c, y]) else None,
+                }
+                for c, y in zip(company_pos.tolist(), year_pos.tolist())
+            ],
+        }
+    return results
+
+
+def validate_universe(
+    checks: Optional[Iterable[str]] = None,
+    period_type: str = 'annual',
+    company_ids: Optional[Iterable[int]] = None,
+    tolerance: float = 0.005,
+    absolute_tolerance: float = 1.0,
+    top: int = 20,
+) -> Dict[str, Any]:
+    """Run the reconciliation checks across every company and year in the DB."""
+    checks = list(checks or CHECKS)
+    unknown = [name for name in checks if name not in CHECKS]
+    if unknown:
+        raise ValueError(f"Unknown checks: {', '.join(unknown)}")
+
+    started = time.perf_counter()
+    panel = MetricPanel.load({field_name for name in checks for field_name in CHECKS[name][0]}, period_type, company_ids)
+    loaded = time.perf_counter()
+    results = run_checks(panel, checks, tolerance, absolute_tolerance, top)
+    finished = time.perf_counter()
+
+    tickers = dict(Company.objects.filter(
+        id__in={row['company_id'] for result in results.values() for row in result['worst']}
+    ).values_list('id', 'ticker'))
+    for result in results.values():
+        for row in result['worst']:
+            row['ticker'] = tickers.get(row['company_id'])
+
+    return {
+        'companies': len(panel.company_ids),
+        'years': [int(panel.periods[0]), int(panel.periods[-1])] if len(panel.periods) else [],
+        'tolerance': tolerance,
+        'absolute_tolerance': absolute_tolerance,
+        'load_seconds': loaded - started,
+        'check_seconds': finished - loaded,
+        'checks': results,
+    }
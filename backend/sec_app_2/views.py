@@ -2,48 +2,224 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework import status
+from contextlib import nullcontext
 import logging
 import os
 from django.http import HttpResponse, HttpResponseNotFound
 from django.conf import settings
 from sec_app.models.multiples import CompanyMultiples
+from sec_app.models.derived_metric import DerivedMetric
+from sec_app.models.window_metric import WindowMetric
+from sec_app.models.company import Company
 from sec_app.serializer import CompanyMultiplesSerializer
 
-from .utils import (
-    calculate_income_statement_field,
-    update_income_statement_calculations,
-    recalculate_dependent_fields,
-    update_balance_sheet_calculations,
-    recalculate_balance_sheet_dependent_fields,
-)
+# Calculators, model sessions and derived metrics are imported in the views
+# that use them, so loading the URLconf does not import every calculator.
+from .calculators.aliases import canonical_field, normalize_dataset, rename_fields
 
 logger = logging.getLogger(__name__)
-FIELD_MAP = {
-    "revenue": "Revenue",
-    "cost_of_revenue": "CostOfRevenue",
-    "sga": "SellingGeneralAdministrative",
-    "selling_general_administrative": "SellingGeneralAdministrative",
-    "depreciation": "Depreciation",
-    "interest_expense": "InterestExpense",
-    "interest_income": "InterestIncome",
-    "other_income": "OtherIncome",
-    "tax_provision": "TaxProvision",
-    "net_income_noncontrolling": "NetIncomeNoncontrolling",
-}
 
 
-def normalize_fields(year_data: dict) -> dict:
-    normalized = {}
-    for key, value in year_data.items():
-        std_key = FIELD_MAP.get(key.lower(), key)  # fallback to original key
-        normalized[std_key] = value
+def build_request_model(statements):
+    """Model from a request's raw ``statements``, with income statement aliases normalized."""
+    from .calculators.valuation_model import build_model
+
+    statements = dict(statements)
+    statements["income_statement"] = {
+        year: rename_fields(fields or {})
+        for year, fields in (statements.get("income_statement") or {}).items()
+    }
+    return build_model(statements)
+
+
+def normalize_edits(edits, default_statement):
+    """Map income statement edit aliases (``revenue``) to canonical field names."""
+    normalized = []
+    for edit in edits or []:
+        if isinstance(edit, dict) and edit.get("statement", default_statement) == "income_statement" and isinstance(edit.get("field"), str):
+            edit = dict(edit, field=canonical_field(edit["field"]))
+        normalized.append(edit)
     return normalized
 
 
+def model_delta_response(data, owner, default_statement="income_statement"):
+    """Delta protocol: ``{model_id, version, edits: [{year, field, value}]}``.
+
+    ``model_id`` names a server-side model session of ``owner`` (see
+    ``model_sessions``), as issued by the server; edits mutate it in place
+    and the reply carries only the cells whose values changed, plus the
+    next version token.  A new session is seeded from ``statements`` or,
+    given just a ``ticker``, from stored metrics.  When the session is
+    missing, held by someone else or at another version the reply is 409
+    with ``resync: true``; the client then resends ``statements``
+    (optionally with the same edits) to rehydrate, and gets the full
+    recomputed model once, under a new ``model_id``.
+    """
+    from .calculators.valuation_model import recompute_model, serialize_changes, serialize_model
+    from .model_sessions import SessionConflict, get_session_store, seed_model_from_metrics
+
+    model_id = data.get("model_id")
+    version = data.get("version")
+    edits = normalize_edits(data.get("edits", []), default_statement)
+    seed = data.get("statements")
+    ticker = (data.get("ticker") or "").upper()
+
+    store = get_session_store()
+    try:
+        # The store lock spans workers: get, version check, apply and commit run as one step
+        with store.lock(model_id) if model_id else nullcontext():
+            session = store.open(model_id, owner, ticker or None) if model_id else None
+            try:
+                current = session is not None and (version is None or int(version) == session.version)
+            except (TypeError, ValueError):
+                current = False
+
+            if not current:
+                if seed is not None:
+                    model = recompute_model(build_request_model(seed))
+                elif ticker and not model_id:
+                    model = seed_model_from_metrics(ticker)
+                else:
+                    return Response(
+                        {
+                            "error": "Model is not loaded or version is stale; resend statements",
+                            "resync": True,
+                            "model_id": model_id,
+                            "version": session.version if session else None,
+                        },
+                        status=status.HTTP_409_CONFLICT,
+                    )
+                if session is not None:
+                    # The stale copy is replaced by one under a new ID
+                    store.discard(session.session_id)
+                session = store.create(model, ticker, owner)
+                if edits:
+                    session.apply(edits, default_statement)
+                    store.commit(session)
+                return Response(
+                    {
+                        "success": True,
+                        "model_id": session.session_id,
+                        "version": session.version,
+                        "statements": serialize_model(session.model),
+                    }
+                )
+
+            changed = session.apply(edits, default_statement)
+            store.commit(session)
+    except SessionConflict as e:
+        return Response(
+            {"error": str(e), "resync": True, "model_id": model_id, "version": None},
+            status=status.HTTP_409_CONFLICT,
+        )
+    except (TypeError, ValueError, AttributeError) as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(
+        {
+            "success": True,
+            "model_id": session.session_id,
+            "version": session.version,
+            "changes": serialize_changes(changed),
+        }
+    )
+
+
+INCOME_STATEMENT_CALCULATED_FIELDS = [
+    "GrossIncome",
+    "OperatingExpense",
+    "OperatingIncome",
+    "NetNonOperatingInterestIncome",
+    "PretaxIncome",
+    "ProfitLossControlling",
+    "NetIncome",
+]
+BALANCE_SHEET_CALCULATED_FIELDS = [
+    "AssetsCurrent",
+    "AssetsNoncurrent",
+    "TotalAssets",
+    "LiabilitiesCurrent",
+    "LiabilitiesNoncurrent",
+    "TotalLiabilities",
+    "StockholdersEquity",
+    "LiabilitiesAndStockholdersEquity",
+]
+# API result keys also reported under the UI's names
+BALANCE_SHEET_UI_ALIASES = {
+    "TotalAssets": "Assets",
+    "TotalLiabilities": "Liabilities",
+    "AssetsCurrent": "CurrentAssets",
+    "AssetsNoncurrent": "TotalNonCurrentAssets",
+    "LiabilitiesCurrent": "CurrentLiabilities",
+}
+
+
+def batch_dependent_fields_response(data, statement):
+    """Batch edits: ``{data, changes: [{year, changed_field, value}]}``.
+
+    All edits are written first and their dirty sets merged, so each
+    dependent field is recomputed once however many cells a paste touched.
+    """
+    from .utils import recalculate_balance_sheet_dependent_fields_batch, recalculate_dependent_fields_batch
+
+    dataset = data.get("data", {})
+    changes = data.get("changes") or []
+    if not isinstance(changes, list) or not changes:
+        return Response(
+            {"error": "changes must be a non-empty list of {year, changed_field, value}"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    edits = []
+    for change in changes:
+        if not isinstance(change, dict) or change.get("year") is None:
+            return Response(
+                {"error": "Each change must be an object with year and changed_field"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        edit = dict(change, year=str(change.get("year")))
+        field_name = edit.get("changed_field") or edit.get("field")
+        if statement == "income_statement" and isinstance(field_name, str):
+            edit["changed_field"] = canonical_field(field_name)
+        edits.append(edit)
+    years = sorted({edit["year"] for edit in edits})
+
+    if statement == "income_statement":
+        dataset = normalize_dataset(dataset, rename=True)
+        updated_data = recalculate_dependent_fields_batch(dataset, edits)
+        calculated_field_names = INCOME_STATEMENT_CALCULATED_FIELDS
+    else:
+        dataset = normalize_dataset(dataset)
+        updated_data = recalculate_balance_sheet_dependent_fields_batch(dataset, edits)
+        calculated_field_names = BALANCE_SHEET_CALCULATED_FIELDS
+
+    recalculated_fields = {}
+    for year in years:
+        year_data = updated_data.get(year, {})
+        fields = {}
+        for field in calculated_field_names:
+            if field in year_data:
+                if statement == "balance_sheet" and field in BALANCE_SHEET_UI_ALIASES:
+                    fields[BALANCE_SHEET_UI_ALIASES[field]] = year_data[field]
+                fields[field] = year_data[field]
+        recalculated_fields[year] = fields
+
+    return Response(
+        {
+            "success": True,
+            "years": years,
+            "recalculated_fields": recalculated_fields,
+            "updated_data": updated_data,
+        }
+    )
+
+
 class IncomeStatementView(APIView):
     permission_classes = [AllowAny]
 
     def post(self, request):
+        from .utils import calculate_income_statement_field, update_income_statement_calculations
+
         try:
             income_data = request.data.get("data", {})
             year = str(request.data.get("year"))
@@ -57,7 +233,7 @@ class IncomeStatementView(APIView):
             if year not in income_data:
                 income_data = {year: income_data}
 
-            income_data[year] = normalize_fields(income_data.get(year, {}))
+            income_data = normalize_dataset(income_data, rename=True)
 
             if field_name:
                 result = calculate_income_statement_field(income_data, year, field_name)
@@ -114,6 +290,13 @@ class DependentFieldsView(APIView):
 
     def post(self, request):
         try:
+            if "model_id" in request.data or "edits" in request.data:
+                from .model_sessions import session_owner
+
+                return model_delta_response(request.data, session_owner(request.user, request.session), "income_statement")
+            if "changes" in request.data:
+                return batch_dependent_fields_response(request.data, "income_statement")
+
             income_data = request.data.get("data", {})
             year = str(request.data.get("year"))
             changed_field = request.data.get("changed_field")
@@ -127,7 +310,9 @@ class DependentFieldsView(APIView):
             if year not in income_data:
                 income_data = {year: income_data}
 
-            income_data[year] = normalize_fields(income_data.get(year, {}))
+            income_data = normalize_dataset(income_data, rename=True)
+
+            from .utils import recalculate_dependent_fields
 
             updated_data = recalculate_dependent_fields(
                 income_data, year, changed_field
@@ -172,6 +357,13 @@ class BalanceSheetDependentFieldsView(APIView):
 
     def post(self, request):
         try:
+            if "model_id" in request.data or "edits" in request.data:
+                from .model_sessions import session_owner
+
+                return model_delta_response(request.data, session_owner(request.user, request.session), "balance_sheet")
+            if "changes" in request.data:
+                return batch_dependent_fields_response(request.data, "balance_sheet")
+
             bs_data = request.data.get("data", {})
             year = str(request.data.get("year"))
             changed_field = request.data.get("changed_field")
@@ -185,7 +377,9 @@ class BalanceSheetDependentFieldsView(APIView):
             if year not in bs_data:
                 bs_data = {year: bs_data}
 
-            # No normalization schema yet; use as-is
+            bs_data = normalize_dataset(bs_data)
+
+            from .utils import recalculate_balance_sheet_dependent_fields
 
             updated_data = recalculate_balance_sheet_dependent_fields(
                 bs_data, year, changed_field
@@ -254,6 +448,10 @@ class BalanceSheetCalculateAllView(APIView):
             if year not in bs_data:
                 bs_data = {year: bs_data}
 
+            bs_data = normalize_dataset(bs_data)
+
+            from .utils import update_balance_sheet_calculations
+
             updated_data = update_balance_sheet_calculations(bs_data, year)
 
             calculated_field_names = [
@@ -285,6 +483,307 @@ class BalanceSheetCalculateAllView(APIView):
             )
 
 
+class ValuationModelRecomputeView(APIView):
+    """Recompute every derived statement for one ticker in a single request.
+
+    Body: ``{"ticker", "statements": {statement: {year: {field: value}}},
+    "edits": [{"statement", "year", "field", "value"}], "years"?}``.
+    Replaces the per-statement round trips (income statement, dependent
+    fields, balance sheet, ...) with one pass over the dependency graph.
+    """
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        from .calculators.valuation_model import recompute_model, serialize_model
+
+        try:
+            ticker = (request.data.get("ticker") or "").upper()
+            statements = request.data.get("statements", {})
+            edits = request.data.get("edits", [])
+            years = request.data.get("years")
+
+            try:
+                model = build_request_model(statements)
+                recompute_model(model, edits, years)
+            except (TypeError, ValueError, AttributeError) as e:
+                return Response(
+                    {"error": str(e)},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            return Response(
+                {
+                    "success": True,
+                    "ticker": ticker,
+                    "statements": serialize_model(model),
+                }
+            )
+
+        except Exception as e:
+            logger.exception("Error in valuation_model_recompute_api")
+            return Response(
+                {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class ValuationModelDeltaView(APIView):
+    """Delta edits against a server-held model; see ``model_delta_response``."""
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        from .model_sessions import session_owner
+
+        try:
+            return model_delta_response(request.data, session_owner(request.user, request.session))
+        except Exception as e:
+            logger.exception("Error in valuation_model_delta_api")
+            return Response(
+                {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class ValuationModelSensitivityView(APIView):
+    """Monte Carlo / grid DCF sensitivity for one model.
+
+    Body: the model as ``model_id`` (an open session), ``statements``, or
+    just ``ticker`` (seeded from stored metrics), plus ``drivers``
+    (see ``calculators.sensitivity``), ``horizon``, ``samples``, ``seed``
+    and ``percentiles``.
+    """
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        # numpy-backed engine; imported here to keep it out of startup
+        from .calculators.sensitivity import run_dcf_sensitivity
+        from .calculators.valuation_model import recompute_model
+        from .model_sessions import SessionConflict, get_session_store, seed_model_from_metrics, session_owner
+
+        try:
+            model_id = request.data.get("model_id")
+            statements = request.data.get("statements")
+            ticker = (request.data.get("ticker") or "").upper()
+            options = {
+                key: request.data[key]
+                for key in ("horizon", "samples", "seed", "percentiles")
+                if request.data.get(key) is not None
+            }
+
+            try:
+                if model_id:
+                    store = get_session_store()
+                    with store.lock(model_id):
+                        session = store.open(model_id, session_owner(request.user, request.session), ticker or None)
+                        if session is None:
+                            return Response(
+                                {"error": "Model is not loaded; resend statements", "resync": True},
+                                status=status.HTTP_409_CONFLICT,
+                            )
+                        result = run_dcf_sensitivity(session.model, request.data.get("drivers"), **options)
+                else:
+                    if statements is not None:
+                        model = recompute_model(build_request_model(statements))
+                    elif ticker:
+                        model = seed_model_from_metrics(ticker)
+                    else:
+                        return Response(
+                            {"error": "model_id, statements or ticker is required"},
+                            status=status.HTTP_400_BAD_REQUEST,
+                        )
+                    result = run_dcf_sensitivity(model, request.data.get("drivers"), **options)
+            except SessionConflict as e:
+                return Response({"error": str(e), "resync": True}, status=status.HTTP_409_CONFLICT)
+            except (TypeError, ValueError, AttributeError) as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            return Response({"success": True, "ticker": ticker, **result})
+
+        except Exception as e:
+            logger.exception("Error in valuation_model_sensitivity_api")
+            return Response(
+                {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class DerivedMetricsView(APIView):
+    """Persisted calculator outputs for one ticker, as written at ingest.
+
+    Query params: ``statement`` and ``metrics`` (comma separated) narrow the
+    result; ``period_type`` defaults to ``annual``.  ``stale`` is true when
+    any row was produced by an older calculator version.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request, ticker):
+        from .derived_metrics import DERIVED_METRICS_VERSION
+
+        try:
+            ticker = ticker.upper()
+            rows = DerivedMetric.objects.filter(
+                company__ticker=ticker,
+                period__period_type=request.query_params.get("period_type", "annual"),
+            )
+            statement = request.query_params.get("statement")
+            if statement:
+                rows = rows.filter(statement=statement)
+            metrics = [m.strip() for m in request.query_params.get("metrics", "").split(",") if m.strip()]
+            if metrics:
+                rows = rows.filter(metric_name__in=metrics)
+
+            statements = {}
+            stale = False
+            for period, statement_name, metric_name, value, version in rows.values_list(
+                "period__period", "statement", "metric_name", "value", "version"
+            ).iterator():
+                statements.setdefault(statement_name, {}).setdefault(period, {})[metric_name] = value
+                stale = stale or version != DERIVED_METRICS_VERSION
+
+            if not statements:
+                return Response(
+                    {"error": f"No derived metrics found for ticker {ticker}"},
+                    status=status.HTTP_404_NOT_FOUND,
+                )
+            return Response({
+                "ticker": ticker,
+                "version": DERIVED_METRICS_VERSION,
+                "stale": stale,
+                "statements": statements,
+            })
+
+        except Exception as e:
+            logger.exception("Error in derived_metrics_api")
+            return Response(
+                {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class WindowMetricsView(APIView):
+    """Trailing N-year averages and CAGRs of one ticker's raw metrics.
+
+    Query params: ``windows`` (comma separated years, default the standard
+    1-15Y set), ``kind`` (AVG or CAGR, default both) and ``metrics``.
+    Standard windows are read from the persisted rows; any other length
+    (7Y, 12Y, ...) is computed on the fly.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request, ticker):
+        from .rolling import KINDS, STANDARD_WINDOWS, company_windows, window_label
+
+        try:
+            ticker = ticker.upper()
+            company = Company.objects.filter(ticker=ticker).first()
+            if company is None:
+                return Response(
+                    {"error": f"Company {ticker} not found"},
+                    status=status.HTTP_404_NOT_FOUND,
+                )
+            try:
+                windows = sorted({int(w.strip().upper().rstrip("Y")) for w in request.query_params.get("windows", "").split(",") if w.strip()}) or list(STANDARD_WINDOWS)
+            except ValueError:
+                return Response(
+                    {"error": "windows must be comma separated year counts, e.g. 5,7Y,12"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            kind = request.query_params.get("kind", "").upper()
+            if (kind and kind not in KINDS) or min(windows) < 1:
+                return Response(
+                    {"error": f"kind must be one of {', '.join(KINDS)} and windows at least 1"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            kinds = [kind] if kind else list(KINDS)
+            metrics = [m.strip() for m in request.query_params.get("metrics", "").split(",") if m.strip()] or None
+
+            result = {}
+            end_year = None
+            stored = WindowMetric.objects.filter(company=company, window__in=[w for w in windows if w in STANDARD_WINDOWS], kind__in=kinds)
+            if metrics:
+                stored = stored.filter(metric_name__in=metrics)
+            for metric_name, window, window_kind, year, value in stored.values_list("metric_name", "window", "kind", "end_year", "value"):
+                result.setdefault(window_label(window, window_kind), {})[metric_name] = value
+                end_year = year
+            missing = [w for w in windows if w not in STANDARD_WINDOWS or not any(window_label(w, k) in result for k in kinds)]
+            if missing:
+                computed_end_year, computed = company_windows(company.id, missing, kinds, metrics)
+                result.update(computed)
+                end_year = end_year or computed_end_year
+
+            return Response({
+                "ticker": ticker,
+                "end_year": end_year,
+                "windows": result,
+            })
+
+        except Exception as e:
+            logger.exception("Error in window_metrics_api")
+            return Response(
+                {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class CalculatorStatsView(APIView):
+    """Per-field calculator call counts, timings and errors for this process.
+
+    GET query params: ``sort`` (total_ms, calls, mean_us, errors,
+    none_results), ``top`` and ``statement``.  POST ``{"enabled": bool}``
+    turns instrumentation on or off; DELETE clears the counters.  Only
+    served when DEBUG is on or to staff users.
+    """
+    permission_classes = [AllowAny]
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if not (settings.DEBUG or request.user.is_staff):
+            self.permission_denied(request, message="Calculator stats are only available to staff")
+
+    def get(self, request):
+        from .calculators import instrumentation
+
+        try:
+            top = request.query_params.get("top")
+            fields = instrumentation.calculator_stats(
+                sort=request.query_params.get("sort", "total_ms"),
+                top=int(top) if top else None,
+                statement=request.query_params.get("statement"),
+            )
+            return Response({"enabled": instrumentation.instrumentation_enabled(), "fields": fields})
+
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.exception("Error in calculator_stats_api")
+            return Response(
+                {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    def post(self, request):
+        from .calculators import instrumentation
+
+        try:
+            enabled = request.data.get("enabled")
+            if not isinstance(enabled, bool):
+                return Response(
+                    {"error": "enabled must be true or false"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            if enabled:
+                instrumentation.enable_instrumentation()
+            else:
+                instrumentation.disable_instrumentation()
+            return Response({"enabled": instrumentation.instrumentation_enabled()})
+
+        except Exception as e:
+            logger.exception("Error in calculator_stats_api")
+            return Response(
+                {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    def delete(self, request):
+        from .calculators import instrumentation
+
+        instrumentation.reset_calculator_stats()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 def serve_multiples_csv(request, filename):
     """Serve multiples CSV files from the data directory"""
     try: